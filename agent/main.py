@@ -9,6 +9,8 @@ import json
 import textwrap
 from typing import Any, Optional
 
+from openai.types.responses import ResponseOutputItem
+
 from agent.memory.compressor import (
 	update_user_summarisation,
 )
@@ -22,8 +24,10 @@ from agent.tools.main import (
 	generate_resume,
 )
 from agent.tools.tool_definitions import agent_tools
+from api.common.socket_registry import send_message_ws
 from common.utils import (
 	TerminalColors,
+	get_timestamp,
 	handle_exceptions_async,
 )
 
@@ -32,7 +36,10 @@ from monitoring.main import (
 	check_usage_limit,
 	inform_user_usage_limit,
 )
-from openai_client.main import agent_response
+from openai_client.main import (
+	agent_response,
+	agent_response_stream,
+)
 
 # Tools
 from rag.main import fetch_context
@@ -205,6 +212,42 @@ async def _get_system_prompt(user_id: str, verbose: bool = False) -> str:
 	return system_prompt
 
 
+@handle_exceptions_async('agent.main: Streaming agent response')
+async def _stream_agent_response(
+	user_id: str,
+	message_id: str,
+	system_prompt: str,
+	input: str,
+) -> ResponseOutputItem:
+	"""
+	Streams final answer tokens to the client
+	under the id the message is stored with,
+	returning the completed output item once
+	the response finishes.
+	"""
+	response: Optional[ResponseOutputItem] = None
+
+	async for event in agent_response_stream(
+		system_prompt=system_prompt,
+		user_input=input,
+		tools=agent_tools,
+		model=_agent_model,
+	):
+		if isinstance(event, str):
+			await send_message_ws(
+				user_id=user_id,
+				type='agent_stream',
+				data={'id': message_id, 'delta': event},
+			)
+		else:
+			response = event
+
+	if response is None:
+		raise ValueError('Agent response stream ended without output.')
+
+	return response
+
+
 @handle_exceptions_async('agent.main: Chat')
 async def chat(
 	user_id: str,
@@ -213,6 +256,7 @@ async def chat(
 	input: str,
 	recursive_prompt: Optional[str] = None,
 	recursion_count: int = 0,
+	stream: bool = False,
 	verbose: bool = False,
 ) -> str:
 	"""
@@ -225,9 +269,12 @@ async def chat(
 		input (str): The user's input message.
 		recursion_count (int, optional): The current
 		recursion depth.
+		stream (bool, optional): Whether to stream final
+		answer tokens over the user's WebSocket.
 
 	Returns:
-		str: The agent's response message.
+		str: The agent's response message, empty when
+		it was streamed or sent by a tool.
 	"""
 	if recursion_count >= _RECURSION_LIMIT:
 		return """
@@ -250,23 +297,48 @@ async def chat(
 	if recursive_prompt:
 		system_prompt += f'\n\n{recursive_prompt}'
 
-	# Call OpenAI API
-	response = await agent_response(
-		system_prompt=system_prompt,
-		user_input=input,
-		tools=agent_tools,
-		model=_agent_model,
-	)
+	# Call OpenAI API, streamed answers are
+	# stored under the id they are streamed with
+	message_id = f'{user_id}_agent_{get_timestamp()}'
+	if stream:
+		response = await _stream_agent_response(
+			user_id=user_id,
+			message_id=message_id,
+			system_prompt=system_prompt,
+			input=input,
+		)
+	else:
+		response = await agent_response(
+			system_prompt=system_prompt,
+			user_input=input,
+			tools=agent_tools,
+			model=_agent_model,
+		)
 
 	if response.type == 'message':
 		message = response.content[0].text.strip()  # type: ignore
 
-		await push_memory(user_id=user_id, source='agent', content=message)
+		await push_memory(
+			user_id=user_id,
+			source='agent',
+			content=message,
+			memory_id=message_id,
+		)
 
 		# Update user summarisation in background
 		# DO NOT AWAIT
 		asyncio.create_task(update_user_summarisation(user_id))
 
+		# The streamed message is complete, the
+		# client already has its content
+		if stream:
+			await send_message_ws(
+				user_id=user_id,
+				type='agent_stream',
+				data={'id': message_id, 'delta': '', 'done': True},
+			)
+			return ''
+
 		return message
 	elif response.type == 'function_call':
 		# function call response
@@ -296,6 +368,7 @@ async def chat(
 			input=input,
 			recursive_prompt=tool_result,
 			recursion_count=recursion_count + 1,
+			stream=stream,
 			verbose=verbose,
 		)
 	else:
@@ -0,0 +1,122 @@
+"""
+This module contains the conversation cache
+for agent memory. A cache is opened for a user
+when their WebSocket session connects, loaded
+from the database once, kept up to date by
+memory writes and closed on disconnect.
+"""
+
+from typing import Optional
+
+from agent.memory.schemas import AgentMemory
+from database.mongodb.main import get_collection
+
+
+class ConversationCache:
+	"""
+	Holds the conversation history of a user
+	in memory, in creation order.
+	"""
+
+	def __init__(self, user_id: str):
+		self.user_id = user_id
+		self.sessions = 0
+		self._memories: Optional[list[AgentMemory]] = None
+		# Bumped when the history changes outside the
+		# cache, so loads started before are discarded
+		self._generation = 0
+
+	@property
+	def loaded(self) -> bool:
+		return self._memories is not None
+
+	async def load(self) -> list[AgentMemory]:
+		"""
+		Read the user's history from the database.
+		The history is only cached if it was not
+		invalidated or written to during the read.
+
+		Returns:
+			list[AgentMemory]: The history read.
+		"""
+		generation = self._generation
+
+		collection = get_collection('messages')
+		cursor = collection.find({'user_id': self.user_id}, {'_id': 0}).sort(
+			'created_at', 1
+		)
+		data = await cursor.to_list(length=None)
+		memories = [AgentMemory(**item) for item in data]
+
+		if generation == self._generation:
+			self._memories = memories
+			return self.memories()
+
+		return memories
+
+	def append(self, memory: AgentMemory):
+		"""
+		Add a memory written to the database. Until
+		the cache is loaded, a load in progress may
+		have missed the write and is discarded.
+		"""
+		if self._memories is not None:
+			self._memories.append(memory)
+		else:
+			self._generation += 1
+
+	def memories(self) -> list[AgentMemory]:
+		"""
+		Return copies of the cached memories.
+		"""
+		return [memory.model_copy(deep=True) for memory in self._memories or []]
+
+	def invalidate(self):
+		"""
+		Drop the cached history, it is read
+		again on next use.
+		"""
+		self._memories = None
+		self._generation += 1
+
+
+# --- Registry ---
+
+_conversation_caches: dict[str, ConversationCache] = {}
+
+
+async def open_conversation_cache(user_id: str) -> ConversationCache:
+	"""
+	Open the cache for a user session and load
+	the history, sessions of the same user share
+	one cache.
+	"""
+	cache = _conversation_caches.setdefault(user_id, ConversationCache(user_id))
+	cache.sessions += 1
+
+	if not cache.loaded:
+		await cache.load()
+
+	return cache
+
+
+def close_conversation_cache(user_id: str):
+	"""
+	Close the cache for a user session, the
+	cache is dropped with the last session.
+	"""
+	cache = _conversation_caches.get(user_id)
+	if cache is None:
+		return
+
+	cache.sessions -= 1
+	if cache.sessions <= 0:
+		del _conversation_caches[user_id]
+
+
+def get_conversation_cache(user_id: str) -> Optional[ConversationCache]:
+	"""
+	Returns the cache for a user, or None if
+	the user has no open session.
+	"""
+	return _conversation_caches.get(user_id)
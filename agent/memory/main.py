@@ -4,8 +4,9 @@ memory management
 """
 
 import json
-from typing import Literal, overload
+from typing import Literal, Optional, overload
 
+from agent.memory.cache import get_conversation_cache
 from agent.memory.schemas import AgentCanvas, AgentMemory
 from common.utils import (
 	get_timestamp,
@@ -17,21 +18,29 @@ from database.mongodb.main import get_collection
 
 
 @handle_exceptions_async('agent.memory: Pushing Agent Memory')
-async def push_memory(user_id: str, source: str, content: str):
+async def push_memory(
+	user_id: str,
+	source: str,
+	content: str,
+	memory_id: Optional[str] = None,
+):
 	"""
 	Pushes agent memory to the database, note this
 	is explicitly for instances without canvas
-	content
+	content. Written through to the open
+	conversation cache.
 
 	Args:
 		user_id: The unique identifier for the user
 		source: The source of the memory (user | agent)
 		content: The content of the memory
+		memory_id: The memory id, when it was already
+		sent to the client, generated otherwise
 	"""
 
 	# Package memory
 	memory = AgentMemory(
-		id=f'{user_id}_{source}_{get_timestamp()}',
+		id=memory_id or f'{user_id}_{source}_{get_timestamp()}',
 		user_id=user_id,
 		source=source,
 		content=content,
@@ -41,6 +50,10 @@ async def push_memory(user_id: str, source: str, content: str):
 	collection = get_collection('messages')
 	await collection.insert_one(memory.model_dump())
 
+	cache = get_conversation_cache(user_id)
+	if cache:
+		cache.append(memory)
+
 	return None
 
 
@@ -52,7 +65,9 @@ async def push_canvas_memory(
 	canvas_content: str,
 ):
 	"""
-	Pushes canvas memory to the database.
+	Pushes canvas memory to the database,
+	written through to the open conversation
+	cache.
 
 	Args:
 		user_id: The unique identifier for the user
@@ -80,6 +95,10 @@ async def push_canvas_memory(
 	collection = get_collection('messages')
 	await collection.insert_one(agent_memory.model_dump())
 
+	cache = get_conversation_cache(user_id)
+	if cache:
+		cache.append(agent_memory)
+
 	return None
 
 
@@ -109,7 +128,9 @@ async def retrieve_memory(
 	drop_canvas: bool = False,
 ) -> list[AgentMemory] | str:
 	"""
-	Retrieves agent memory from the database.
+	Retrieves agent memory, from the conversation
+	cache while the user has an open session and
+	from the database otherwise.
 
 	Args:
 		user_id: The unique identifier for the user
@@ -119,14 +140,19 @@ async def retrieve_memory(
 	Returns:
 		A list of AgentMemory objects
 	"""
-	collection = get_collection('messages')
+	cache = get_conversation_cache(user_id)
 
-	cursor = collection.find({'user_id': user_id}, {'_id': 0}).sort(
-		'created_at', 1
-	)
+	if cache:
+		results = cache.memories() if cache.loaded else await cache.load()
+	else:
+		collection = get_collection('messages')
+
+		cursor = collection.find({'user_id': user_id}, {'_id': 0}).sort(
+			'created_at', 1
+		)
 
-	data = await cursor.to_list(length=None)
-	results = [AgentMemory(**item) for item in data]
+		data = await cursor.to_list(length=None)
+		results = [AgentMemory(**item) for item in data]
 
 	if drop_canvas:
 		for r in results:
@@ -148,7 +174,8 @@ async def retrieve_memory(
 @handle_exceptions_async('agent.memory: Deleting chat history')
 async def delete_memory(user_id: str) -> bool:
 	"""
-	Deletes all agent memory for a specific user.
+	Deletes all agent memory for a specific user
+	and invalidates their conversation cache.
 
 	Args:
 		user_id: The unique identifier for the user
@@ -166,6 +193,12 @@ async def delete_memory(user_id: str) -> bool:
 	# Delete original messages
 	result = await collection.delete_many({'user_id': user_id})
 
+	# Invalidate once deleted, so the cache is
+	# not reloaded with the deleted history
+	cache = get_conversation_cache(user_id)
+	if cache:
+		cache.invalidate()
+
 	# Clear user summarisation
 	collection = get_collection('users')
 	await collection.update_one(
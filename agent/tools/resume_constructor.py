@@ -27,7 +27,7 @@ from openai_client.main import (
 )
 from rag.query_executor import (
 	refine_context,
-	retrieve_documents_sequential,
+	retrieve_documents,
 )
 from rag.query_planner import query_planner
 
@@ -267,7 +267,7 @@ class ResumeConstructor:
 		the specific section.
 		"""
 		plan = await query_planner(section_query)
-		context = await retrieve_documents_sequential(
+		context = await retrieve_documents(
 			user_id=self.user_id,
 			query_plan=plan,
 			streaming_context='agent_writing_thinking',
@@ -276,6 +276,7 @@ class ResumeConstructor:
 		refined_context = await refine_context(
 			user_input=section_query,
 			retrieval_results=context,
+			verbose=self.verbose,
 		)
 
 		if self.verbose:
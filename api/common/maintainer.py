@@ -11,6 +11,11 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from agent.memory.main import delete_memory
 from common.utils import TerminalColors, get_datetime
 from database.mongodb.main import get_collection
+from rag.config import CORPUS_REFRESH_MINUTES
+from rag.retrieval_params import load_retrieval_params
+from rag.semantic_cache import semantic_cache
+from rag.vector_index import load_vector_index_name
+from rag.vector_store import get_corpus_version, load_corpus_store
 from users.database import delete_user
 
 
@@ -19,12 +24,18 @@ class Maintainer:
 	A class that handles the maintenance
 	tasks for the application, this includes:
 	- Cleaning up old data
+	- Refreshing the corpus store
 	"""
 
 	def __init__(self):
 		# Scheduler setup
 		self.scheduler = AsyncIOScheduler(timezone=timezone.utc)
 		self.scheduler.add_job(self.clean_up, 'interval', days=1)
+		self.scheduler.add_job(
+			self.refresh_corpus,
+			'interval',
+			minutes=CORPUS_REFRESH_MINUTES,
+		)
 		# Logging
 		self.start_time = get_datetime()
 		# Constants
@@ -81,3 +92,35 @@ class Maintainer:
 				f'{TerminalColors.reset}'
 				f' Error: {e}'
 			)
+
+	async def refresh_corpus(self):
+		try:
+			# Pick up vector index switches, rollbacks
+			# and newly tuned retrieval parameters
+			await load_vector_index_name()
+			load_retrieval_params()
+
+			previous_version = get_corpus_version()
+			store = await load_corpus_store()
+
+			# Drop cached contexts built from the old corpus
+			if store.version != previous_version:
+				semantic_cache.invalidate(store.version)
+				print(
+					f'{TerminalColors.green}'
+					f'Corpus changed, semantic cache invalidated'
+					f'{TerminalColors.reset}'
+					f'{TerminalColors.yellow}'
+					f' Version: {previous_version} -> {store.version}'
+					f'{TerminalColors.reset}'
+				)
+		except Exception as e:
+			print(
+				f'{TerminalColors.red}'
+				f'Error occurred during corpus refresh'
+				f'{TerminalColors.reset}'
+				f'{TerminalColors.yellow}'
+				f' Timestamp: {datetime.now(timezone.utc)}'
+				f'{TerminalColors.reset}'
+				f' Error: {e}'
+			)
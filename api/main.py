@@ -35,6 +35,9 @@ from database.mongodb.config import (
 	close_mongo,
 	connect_mongo,
 )
+from openai_client.embedding_cache import embedding_cache
+from rag.vector_index import load_vector_index_name
+from rag.vector_store import load_corpus_store
 
 # --- Lifecycle Management ---
 
@@ -58,7 +61,48 @@ async def lifespan(app: FastAPI):
 	if not await connect_mongo():
 		exit(1)
 
-	# 2. Start the maintainer
+	# 2. Load the corpus into the local vector store,
+	# retrieval falls back to $vectorSearch on failure
+	try:
+		await load_corpus_store()
+	except Exception:
+		print(
+			f'{TerminalColors.yellow}'
+			f'Corpus store unavailable, using $vectorSearch'
+			f'{TerminalColors.reset}'
+		)
+
+	# Read the active $vectorSearch index, the
+	# default index is used until one is activated
+	try:
+		await load_vector_index_name()
+	except Exception:
+		print(
+			f'{TerminalColors.yellow}'
+			f'Active vector index unavailable, using default'
+			f'{TerminalColors.reset}'
+		)
+
+	# 3. Warm up the embedding cache with the
+	# most frequently embedded recent queries
+	try:
+		await embedding_cache.ensure_indexes()
+		warmed = await embedding_cache.warm_up()
+		print(
+			f'{TerminalColors.green}'
+			f'Embedding cache warmed up'
+			f'{TerminalColors.reset}'
+			f' entries: {warmed}'
+		)
+	except Exception as e:
+		print(
+			f'{TerminalColors.yellow}'
+			f'Embedding cache warm up failed: '
+			f'{TerminalColors.reset}'
+			f'{e}'
+		)
+
+	# 4. Start the maintainer
 	_ = Maintainer()
 
 	print(
@@ -82,6 +126,11 @@ async def lifespan(app: FastAPI):
 		f'...'
 	)
 
+	print(f'Embedding cache stats: {embedding_cache.stats()}')
+
+	# Finish pending embedding cache writes
+	await embedding_cache.flush()
+
 	# 1. Close MongoDB connection
 	if not await close_mongo():
 		exit(1)
@@ -12,6 +12,10 @@ from fastapi import (
 )
 
 from agent.main import chat
+from agent.memory.cache import (
+	close_conversation_cache,
+	open_conversation_cache,
+)
 from agent.memory.main import delete_memory, retrieve_memory
 from api.common.authentication import (
 	validate_frontend_token,
@@ -69,6 +73,10 @@ async def agent_chat_ws(ws: WebSocket):
 	await add_connection_registry(user_id=user_id, ws=ws)
 
 	try:
+		# History is read once per session, prompts
+		# are then built from the conversation cache
+		await open_conversation_cache(user_id)
+
 		while True:
 			data: dict = await ws.receive_json()
 			socket_message = SocketMessage(**data)
@@ -94,7 +102,11 @@ async def agent_chat_ws(ws: WebSocket):
 				)
 				continue
 
-			# Chat responses
+			# Chat responses, final answer tokens are
+			# streamed as 'agent_stream' messages under
+			# the stored message id, ending with a 'done'
+			# event. Responses that are not streamed,
+			# such as usage limits, are sent in full
 			user_input = socket_message.data
 
 			response = await chat(
@@ -102,6 +114,7 @@ async def agent_chat_ws(ws: WebSocket):
 				ip=ip,
 				ua=user_agent,
 				input=str(user_input),
+				stream=True,
 			)
 
 			# Handle streamed responses
@@ -115,6 +128,8 @@ async def agent_chat_ws(ws: WebSocket):
 			)
 	except WebSocketDisconnect:
 		await delete_connection_registry(user_id=user_id)
+	finally:
+		close_conversation_cache(user_id)
 
 
 # --- HTTP Based Routes ---
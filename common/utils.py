@@ -103,6 +103,39 @@ def handle_exceptions_async(context: str):
 	return decorator
 
 
+def handle_exceptions_async_gen(context: str):
+	"""
+	Async generator version of the handle_exceptions
+	decorator. It wraps async generators with exception
+	handling while items are being yielded.
+
+	Args:
+		context (str): A string describing the context
+		in which the function is called.
+	"""
+
+	def decorator(func: T) -> T:
+		@wraps(func)
+		async def wrapper(*args: Any, **kwargs: Any) -> Any:
+			try:
+				async for item in func(*args, **kwargs):
+					yield item
+			except Exception as e:
+				print(
+					f'{TerminalColors.red}'
+					f'Error in {context}:'
+					f'{TerminalColors.reset}'
+					f' {e}'
+				)
+				raise Exception(
+					f"Error in application with context '{context}': {e}"
+				) from e
+
+		return wrapper  # type: ignore
+
+	return decorator
+
+
 # --- Time Utilities ---
 
 
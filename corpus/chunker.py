@@ -0,0 +1,161 @@
+"""
+This module contains the chunker for corpus
+sections. Long documents are split into
+overlapping token-bounded chunks, each embedded
+on its own and linked to its parent section so
+retrieval can return either the matched chunk
+or the whole section.
+"""
+
+import os
+from functools import cache
+
+import tiktoken
+
+from corpus.schemas import CorpusItem
+
+# --- Constants ---
+
+CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', '128'))
+CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', '24'))
+
+# --- Utils ---
+
+
+@cache
+def _get_encoding() -> tiktoken.Encoding:
+	"""
+	Load the tokeniser on first use, the
+	encoding is downloaded if not cached.
+	"""
+	return tiktoken.get_encoding('o200k_base')
+
+
+def embedding_text(item: CorpusItem) -> str:
+	"""
+	Return the text embedded for a corpus item.
+	Whole sections are embedded on their context,
+	chunks on their context and chunk text so each
+	chunk is matched on its own content.
+	"""
+	if item.parent_id is None:
+		return item.context
+	return f'{item.context}\n{item.document}'
+
+
+# --- Chunker ---
+
+
+def split_document(
+	document: str,
+	max_tokens: int = CHUNK_MAX_TOKENS,
+	overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> list[str]:
+	"""
+	Split a document on word boundaries into
+	chunks of at most `max_tokens`, each starting
+	with up to `overlap_tokens` from the end of
+	the previous chunk. Tokens are counted per
+	word, a single longer word becomes its own
+	chunk.
+
+	Returns:
+		list[str]: The chunks, or the document alone
+		if it fits in one chunk.
+	"""
+	words = document.split()
+	counts = [
+		len(tokens)
+		for tokens in _get_encoding().encode_ordinary_batch(
+			[f' {word}' for word in words]
+		)
+	]
+
+	if sum(counts) <= max_tokens:
+		return [document]
+
+	chunks: list[str] = []
+	start = 0
+
+	while True:
+		end = start
+		tokens = 0
+		while end < len(words) and (
+			end == start or tokens + counts[end] <= max_tokens
+		):
+			tokens += counts[end]
+			end += 1
+
+		chunks.append(' '.join(words[start:end]))
+		if end == len(words):
+			return chunks
+
+		# Step back into the chunk for the overlap,
+		# always moving forward by at least a word
+		next_start = end
+		overlap = 0
+		while (
+			next_start > start + 1
+			and overlap + counts[next_start - 1] <= overlap_tokens
+		):
+			next_start -= 1
+			overlap += counts[next_start]
+		start = next_start
+
+
+def chunk_item(
+	item: CorpusItem,
+	max_tokens: int = CHUNK_MAX_TOKENS,
+	overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> list[CorpusItem]:
+	"""
+	Split a section into chunks carrying the
+	section id as their parent id.
+
+	Returns:
+		list[CorpusItem]: The chunks, empty if the
+		document fits in one chunk.
+	"""
+	chunks = split_document(item.document, max_tokens, overlap_tokens)
+	if len(chunks) == 1:
+		return []
+
+	return [
+		item.model_copy(
+			update={
+				'id': f'{item.id}#{index}',
+				'document': chunk,
+				'parent_id': item.id,
+			}
+		)
+		for index, chunk in enumerate(chunks)
+	]
+
+
+def chunk_corpus(
+	items: list[CorpusItem],
+) -> tuple[list[CorpusItem], list[CorpusItem]]:
+	"""
+	Chunk every section of a corpus.
+
+	Args:
+		items (list[CorpusItem]): The parsed sections.
+
+	Returns:
+		tuple[list[CorpusItem], list[CorpusItem]]: The
+		items to embed, whole sections and chunks, and
+		the chunked parent sections, stored without
+		embeddings.
+	"""
+	embedded: list[CorpusItem] = []
+	parents: list[CorpusItem] = []
+
+	for item in items:
+		chunks = chunk_item(item)
+		if chunks:
+			embedded.extend(chunks)
+			parents.append(item)
+		else:
+			embedded.append(item)
+
+	return embedded, parents
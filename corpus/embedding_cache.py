@@ -0,0 +1,86 @@
+"""
+This module contains the on-disk embedding
+cache used by corpus ingestion, so sections
+embedded by a previous run are not sent to
+the embeddings API again.
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+
+# --- Constants ---
+
+CACHE_PATH = os.path.join(
+	os.path.dirname(os.path.abspath(__file__)), '.cache', 'embeddings.npz'
+)
+
+# --- Cache ---
+
+
+class DiskEmbeddingCache:
+	"""
+	Embeddings keyed by content address, loaded
+	from and saved to a compressed NumPy archive.
+	"""
+
+	def __init__(self, path: str = CACHE_PATH):
+		self.path = path
+		self._entries: dict[str, np.ndarray] = {}
+		self._dirty = False
+
+		if os.path.exists(path):
+			archive = np.load(path)
+			for name in archive.files:
+				if not name.startswith('keys_'):
+					continue
+				width = name.removeprefix('keys_')
+				self._entries.update(
+					zip(
+						archive[name].tolist(),
+						archive[f'vectors_{width}'],
+						strict=True,
+					)
+				)
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def get(self, key: str) -> Optional[list[float]]:
+		"""
+		Return the cached embedding for a key.
+		"""
+		vector = self._entries.get(key)
+		return None if vector is None else vector.tolist()
+
+	def set(self, key: str, embedding: list[float]):
+		"""
+		Cache an embedding until the next save.
+		"""
+		self._entries[key] = np.asarray(embedding, dtype=np.float32)
+		self._dirty = True
+
+	def save(self):
+		"""
+		Write the cache to disk if it changed,
+		embeddings are grouped by width so each
+		group is stored as one matrix.
+		"""
+		if not self._dirty:
+			return
+
+		groups: dict[int, list[str]] = {}
+		for key, vector in self._entries.items():
+			groups.setdefault(len(vector), []).append(key)
+
+		arrays: dict[str, np.ndarray] = {}
+		for width, keys in groups.items():
+			arrays[f'keys_{width}'] = np.asarray(keys)
+			arrays[f'vectors_{width}'] = np.stack(
+				[self._entries[key] for key in keys]
+			)
+
+		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		np.savez_compressed(self.path, **arrays)
+		self._dirty = False
@@ -0,0 +1,230 @@
+"""
+This module contains the parser for the
+corpus documents, which extracts corpus
+items from the tagged markdown sections.
+
+Files are tokenised in a single streaming
+pass, sections are yielded as they close and
+malformed markup is reported by line and column.
+"""
+
+import glob
+import os
+import re
+from collections.abc import Iterable, Iterator
+from typing import Optional
+
+from corpus.schemas import CorpusItem
+
+# --- Constants ---
+
+CORPUS_PATTERN = 'documents/**/*.md'
+
+_corpus_dir = os.path.dirname(os.path.abspath(__file__))
+
+_fields = ('id', 'header', 'context', 'document')
+_token_pattern = re.compile(
+	r'<!--|-->|<(/?)(section|id|header|context|document)>'
+)
+_newline_pattern = re.compile(r'\s*\n\s*')
+
+# --- Discovery ---
+
+
+def discover_corpus_files(pattern: str = CORPUS_PATTERN) -> list[str]:
+	"""
+	Find corpus files matching a glob pattern
+	relative to the corpus folder, README files
+	are skipped.
+	"""
+	return sorted(
+		os.path.relpath(path, _corpus_dir)
+		for path in glob.glob(
+			os.path.join(_corpus_dir, pattern), recursive=True
+		)
+		if os.path.basename(path).lower() != 'readme.md'
+	)
+
+
+# --- Parser ---
+
+
+class CorpusParseError(ValueError):
+	"""
+	Raised for malformed corpus markup, carrying
+	the source, line and column of the fault.
+	"""
+
+	def __init__(self, message: str, source: str, line: int, column: int):
+		super().__init__(f'{source}:{line}:{column}: {message}')
+		self.source = source
+		self.line = line
+		self.column = column
+
+
+def _clean(value: str) -> str:
+	"""
+	Collapse line breaks and separators in a
+	field into single spaces.
+	"""
+	return _newline_pattern.sub(' ', value).replace('---', ' ').strip()
+
+
+def iter_sections(
+	lines: Iterable[str],
+	source: str = '<string>',
+) -> Iterator[CorpusItem]:
+	"""
+	Stream CorpusItems out of corpus markup in a
+	single pass, each section is yielded as soon
+	as it closes. Text outside fields and inside
+	comments is skipped.
+
+	Args:
+		lines (Iterable[str]): The markup line by line,
+		such as an open file.
+		source (str): The name used in error messages.
+
+	Yields:
+		CorpusItem: Each section without an embedding.
+
+	Raises:
+		CorpusParseError: If the markup is malformed.
+	"""
+	in_comment = False
+	comment_at = (0, 0)
+	section_at: Optional[tuple[int, int]] = None
+	field: Optional[str] = None
+	field_at = (0, 0)
+	values: dict[str, str] = {}
+	parts: list[str] = []
+
+	for line_number, line in enumerate(lines, start=1):
+		position = 0
+
+		while position < len(line):
+			if in_comment:
+				end = line.find('-->', position)
+				if end == -1:
+					break
+				in_comment = False
+				position = end + 3
+				continue
+
+			match = _token_pattern.search(line, position)
+			if match is None:
+				if field is not None:
+					parts.append(line[position:])
+				break
+
+			if field is not None:
+				parts.append(line[position : match.start()])
+			position = match.end()
+			token = match.group(0)
+			token_at = (line_number, match.start() + 1)
+
+			if token == '<!--':
+				in_comment = True
+				comment_at = token_at
+				continue
+			if token == '-->':
+				raise CorpusParseError(
+					'Unexpected comment close', source, *token_at
+				)
+
+			closing, name = match.group(1), match.group(2)
+
+			if field is not None and name != field:
+				raise CorpusParseError(
+					f'{token} inside <{field}>', source, *token_at
+				)
+
+			if name == 'section':
+				if not closing:
+					if section_at is not None:
+						raise CorpusParseError(
+							'Nested <section>', source, *token_at
+						)
+					section_at = token_at
+					values = {}
+					continue
+
+				if section_at is None:
+					raise CorpusParseError(
+						'</section> without <section>', source, *token_at
+					)
+				missing = [name for name in _fields if name not in values]
+				if missing:
+					raise CorpusParseError(
+						f'Section missing {", ".join(missing)}',
+						source,
+						*section_at,
+					)
+				section_at = None
+				yield CorpusItem(**values)
+				continue
+
+			if section_at is None:
+				raise CorpusParseError(
+					f'{token} outside <section>', source, *token_at
+				)
+
+			if not closing:
+				if field is not None:
+					raise CorpusParseError(
+						f'{token} inside <{field}>', source, *token_at
+					)
+				if name in values:
+					raise CorpusParseError(
+						f'Duplicate {token}', source, *token_at
+					)
+				field = name
+				field_at = token_at
+				parts = []
+				continue
+
+			if field is None:
+				raise CorpusParseError(
+					f'{token} without <{name}>', source, *token_at
+				)
+			values[name] = _clean(''.join(parts))
+			field = None
+
+	if in_comment:
+		raise CorpusParseError('Unclosed comment', source, *comment_at)
+	if field is not None:
+		raise CorpusParseError(f'Unclosed <{field}>', source, *field_at)
+	if section_at is not None:
+		raise CorpusParseError('Unclosed <section>', source, *section_at)
+
+
+def parse_corpus_file(file_name: str) -> list[CorpusItem]:
+	"""
+	Parse a corpus file into CorpusItems
+	without embeddings.
+
+	Args:
+		file_name (str): The file path relative
+		to the corpus folder.
+
+	Returns:
+		list[CorpusItem]: The parsed corpus items.
+
+	Raises:
+		CorpusParseError: If the file is malformed.
+	"""
+	file_path = os.path.join(_corpus_dir, file_name)
+
+	with open(file_path, encoding='utf-8') as file:
+		return list(iter_sections(file, source=file_name))
+
+
+def parse_corpus() -> list[CorpusItem]:
+	"""
+	Parse every checked-in corpus file.
+	"""
+	return [
+		item
+		for file in discover_corpus_files()
+		for item in parse_corpus_file(file)
+	]
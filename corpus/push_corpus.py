@@ -1,127 +1,295 @@
 """
 This module is used to push the corpus
-data to the MongoDB collection.
+data to the MongoDB collection. Pushes are
+incremental, only sections whose content
+changed are re-embedded and written, and
+sections removed from the files are deleted.
+Long sections are stored whole without an
+embedding and split into embedded chunks.
+
+Files are discovered by glob and parsed
+concurrently, changed sections are embedded
+in batched requests under a concurrency cap
+and written with unordered bulk operations.
 """
 
 import asyncio
+import hashlib
 import os
-import re
+from collections import Counter
+
+from pymongo import DeleteMany, ReplaceOne
 
-from common.utils import TerminalColors
+from common.utils import TerminalColors, Timer
+from corpus.embedding_cache import DiskEmbeddingCache
+from corpus.parser import discover_corpus_files, parse_corpus_file
 from corpus.schemas import CorpusItem
 from database.mongodb.config import (
 	close_mongo,
 	connect_mongo,
 )
-from database.mongodb.main import get_collection
+from database.mongodb.main import (
+	encode_bit_vector,
+	encode_vector,
+	get_collection,
+)
 
-# --- File Processing ---
+# --- Utils ---
 
 
-async def _load_file(file_name: str) -> list[dict]:
+def _content_hash(corpus_item: CorpusItem, embedding_model: str) -> str:
 	"""
-	Load a file and return a list of CorpusItems.
+	Hash the content of a section together with
+	the embedding model and width, so a change to
+	either marks the section as changed. Parent
+	sections are hashed without a model, as they
+	are stored without an embedding.
+	"""
+	digest = hashlib.sha256()
+	for value in (
+		embedding_model,
+		corpus_item.parent_id or '',
+		corpus_item.header,
+		corpus_item.context,
+		corpus_item.document,
+	):
+		digest.update(value.encode())
+		digest.update(b'\0')
+	return digest.hexdigest()
+
+
+# --- Pipeline ---
+
+
+async def _parse_files(files: list[str]) -> list[list[CorpusItem]]:
+	"""
+	Parse the corpus files concurrently,
+	returning the sections of each file.
+	"""
+	return list(
+		await asyncio.gather(
+			*[asyncio.to_thread(parse_corpus_file, file) for file in files]
+		)
+	)
+
+
+async def _embed_contexts(
+	contexts: list[str],
+	disk_cache: DiskEmbeddingCache,
+	embedding_model: str,
+) -> dict[str, list[float]]:
+	"""
+	Embed section texts in batched requests,
+	texts cached on disk are not sent.
 
 	Args:
-		file_name (str): The name of the file to load.
+		contexts (list[str]): The contexts to embed.
+		disk_cache (DiskEmbeddingCache): Embeddings from
+		previous runs.
+		embedding_model (str): The cache model identifier.
 
 	Returns:
-		list[CorpusItem]: The loaded corpus items.
+		dict[str, list[float]]: The embedding of each context.
 	"""
 	# Import embedding function here to get around
 	# import issues
-	from openai_client.main import get_embedding
+	from openai_client.embedding_cache import make_key
+	from openai_client.main import get_embeddings
 
-	current_dir = os.path.dirname(os.path.abspath(__file__))
-	file_path = os.path.join(current_dir, file_name)
+	# Read ingest settings here so they are
+	# read after the environment is loaded
+	batch_size = int(os.getenv('INGEST_BATCH_SIZE', '64'))
+	concurrency = int(os.getenv('INGEST_CONCURRENCY', '4'))
 
-	with open(file_path, encoding='utf-8') as file:
-		content = file.read()
+	embeddings: dict[str, list[float]] = {}
+	missing: list[str] = []
 
-	# Clean comments
-	cleaned = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-	cleaned = re.sub(r'\n\s*\n', '\n', cleaned)
+	for context in dict.fromkeys(contexts):
+		cached = disk_cache.get(make_key(context, embedding_model))
+		if cached is None:
+			missing.append(context)
+		else:
+			embeddings[context] = cached
 
-	# Clean trailing spaces
-	cleaned = re.sub(r'\s*\n\s*', ' ', cleaned, flags=re.MULTILINE)
+	batches = [
+		missing[i : i + batch_size] for i in range(0, len(missing), batch_size)
+	]
+	semaphore = asyncio.Semaphore(concurrency)
+	embedded = 0
 
-	# Clear separators
-	cleaned = re.sub(r'---', ' ', cleaned, flags=re.DOTALL)
+	async def embed(batch: list[str]):
+		nonlocal embedded
+		async with semaphore:
+			vectors = await get_embeddings(batch)
 
-	# Extract Sections
-	sections = re.findall(r'<section>(.*?)</section>', cleaned, re.DOTALL)
+		for context, vector in zip(batch, vectors, strict=True):
+			embeddings[context] = vector
+			disk_cache.set(make_key(context, embedding_model), vector)
 
-	# Load content within sections into CorpusItems
-	corpus_items: list[CorpusItem] = []
-	for section in sections:
-		id: list[str] = re.findall(r'<id>(.*?)</id>', section, re.DOTALL)
-		header: list[str] = re.findall(
-			r'<header>(.*?)</header>', section, re.DOTALL
-		)
-		context: list[str] = re.findall(
-			r'<context>(.*?)</context>', section, re.DOTALL
-		)
-		document: list[str] = re.findall(
-			r'<document>(.*?)</document>',
-			section,
-			re.DOTALL,
+		embedded += len(batch)
+		print(
+			f'{TerminalColors.cyan}'
+			f'Embedded {embedded}/{len(missing)} sections'
+			f'{TerminalColors.reset}'
 		)
 
-		# Create a CorpusItem from the extracted content
-		context_str: str = context[0].strip()
-		corpus_item = CorpusItem(
-			id=id[0].strip(),
-			header=header[0].strip(),
-			context=context_str,
-			document=document[0].strip(),
-			embedding=await get_embedding(context_str),
-		)
-		corpus_items.append(corpus_item)
+	await asyncio.gather(*[embed(batch) for batch in batches])
 
-	return [c.model_dump() for c in corpus_items]
+	return embeddings
 
 
 # --- Main ---
 
 
 async def main():
+	# Import embedding and chunk settings here so
+	# they are read after the environment is loaded
+	from corpus.chunker import chunk_corpus, embedding_text
+	from openai_client.embedding_cache import embedding_cache
+	from openai_client.main import EMBEDDING_DIMENSIONS, _embedding_cache_model
+
+	timer = Timer(start=True)
+	embedding_model = _embedding_cache_model(EMBEDDING_DIMENSIONS)
+
 	await connect_mongo()
 
 	print(f'{TerminalColors.yellow}Starting Corpus Push{TerminalColors.reset}')
 
 	collection = get_collection('corpus')
+	disk_cache = DiskEmbeddingCache()
 
-	files = [
-		'documents/personal.md',
-		'documents/education.md',
-		'documents/skills.md',
-		'documents/projects.md',
-		'documents/experience.md',
-		'documents/meta_reflection.md',
-	]
+	cursor = collection.find({}, {'_id': 0, 'id': 1, 'content_hash': 1})
+	stored_docs = await cursor.to_list(length=None)
+	stored_hashes = {
+		doc['id']: doc.get('content_hash', '') for doc in stored_docs
+	}
+
+	# Earlier pushes inserted without upserting, so
+	# clear duplicated ids and write them afresh
+	id_counts = Counter(doc['id'] for doc in stored_docs)
+	duplicates = sorted(id for id, count in id_counts.items() if count > 1)
+	if duplicates:
+		await collection.delete_many({'id': {'$in': duplicates}})
+		for id in duplicates:
+			del stored_hashes[id]
+	load_time = timer.elapsed()
+
+	# Parse
+	files = discover_corpus_files()
+	parsed = await _parse_files(files)
+	parse_time = timer.elapsed()
+
+	# Chunk, parents are stored without an embedding
+	changed: list[tuple[CorpusItem, str]] = []
+	changed_parents: list[tuple[CorpusItem, str]] = []
+	section_ids: list[str] = []
+	section_count = 0
+	chunk_count = 0
+
+	for file, corpus_items in zip(files, parsed, strict=True):
+		embedded_items, parent_items = chunk_corpus(corpus_items)
+		section_count += len(corpus_items)
+		file_changed = 0
+
+		for corpus_item in embedded_items:
+			section_ids.append(corpus_item.id)
+			chunk_count += corpus_item.parent_id is not None
+			content_hash = _content_hash(corpus_item, embedding_model)
+			if stored_hashes.get(corpus_item.id) != content_hash:
+				changed.append((corpus_item, content_hash))
+				file_changed += 1
+
+		for corpus_item in parent_items:
+			section_ids.append(corpus_item.id)
+			content_hash = _content_hash(corpus_item, '')
+			if stored_hashes.get(corpus_item.id) != content_hash:
+				changed_parents.append((corpus_item, content_hash))
 
-	for file in files:
 		print(
 			f'{TerminalColors.blue}'
-			f'Processing file: {file}'
+			f'Parsed {file}: '
 			f'{TerminalColors.reset}'
+			f'{len(corpus_items)} sections, {len(parent_items)} chunked, '
+			f'{file_changed} of {len(embedded_items)} embedded items changed'
 		)
-		corpus_items = await _load_file(file)
-		await collection.insert_many(corpus_items)
+
+	# Embed
+	embeddings = await _embed_contexts(
+		contexts=[embedding_text(corpus_item) for corpus_item, _ in changed],
+		disk_cache=disk_cache,
+		embedding_model=embedding_model,
+	)
+	disk_cache.save()
+	embed_time = timer.elapsed()
+
+	# Write, operations touch distinct ids so
+	# they can be applied in any order
+	operations: list[ReplaceOne | DeleteMany] = []
+	for corpus_item, content_hash in changed:
+		embedding = embeddings[embedding_text(corpus_item)]
+		operations.append(
+			ReplaceOne(
+				{'id': corpus_item.id},
+				{
+					**corpus_item.model_dump(),
+					'embedding': encode_vector(embedding),
+					'embedding_bits': encode_bit_vector(embedding),
+					'content_hash': content_hash,
+				},
+				upsert=True,
+			)
+		)
+
+	for corpus_item, content_hash in changed_parents:
+		operations.append(
+			ReplaceOne(
+				{'id': corpus_item.id},
+				{**corpus_item.model_dump(), 'content_hash': content_hash},
+				upsert=True,
+			)
+		)
+
+	# Delete sections no longer in any file
+	removed = set(stored_hashes) - set(section_ids)
+	if removed:
+		operations.append(DeleteMany({'id': {'$in': sorted(removed)}}))
+
+	if operations:
+		result = await collection.bulk_write(operations, ordered=False)
 		print(
 			f'{TerminalColors.magenta}'
-			f'Inserted {len(corpus_items)} items from {file}'
+			f'Upserted {result.upserted_count}, '
+			f'replaced {result.modified_count}, '
+			f'deleted {result.deleted_count} items'
 			f'{TerminalColors.reset}'
 		)
+	write_time = timer.elapsed()
 
+	# Finish pending embedding cache writes
+	# before the connection is closed
+	await embedding_cache.flush()
 	await close_mongo()
 
-	print(f'{TerminalColors.yellow}Finished Corpus Push{TerminalColors.reset}')
+	total_time = timer.stop()
+	print(
+		f'{TerminalColors.yellow}'
+		f'Finished Corpus Push'
+		f'{TerminalColors.reset}'
+		f'\nFiles: {len(files)}'
+		f' Sections: {section_count}'
+		f' Chunks: {chunk_count}'
+		f' Changed: {len(changed) + len(changed_parents)}'
+		f' Deleted: {len(removed)}'
+		f'\nLoad: {load_time:.2f} s'
+		f' Parse: {parse_time:.2f} s'
+		f' Embed: {embed_time:.2f} s'
+		f' Write: {write_time:.2f} s'
+		f' Total: {total_time:.2f} s'
+		f' ({section_count / (total_time or 1.0):.1f} sections/s)'
+	)
 
 
 if __name__ == '__main__':
-	import os
-
 	from dotenv import load_dotenv
 
 	load_dotenv(override=True, dotenv_path=os.path.abspath('.env'))
@@ -1,65 +1,289 @@
 """
-This module is used to create the
-vector search index for the corpus
-data in MongoDB.
+This module manages the vector search index
+for the corpus data in MongoDB. Rebuilds are
+blue/green, a new versioned index is built
+next to the live one, polled until queryable
+and smoke tested before the active index name
+read by the retriever is switched.
+
+Usage:
+	python -m corpus.push_index [build|status|rollback|prune]
 """
 
+import argparse
 import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Optional
 
+from pymongo.asynchronous.collection import AsyncCollection
 from pymongo.operations import SearchIndexModel
 
+from common.utils import TerminalColors
 from database.mongodb.config import (
 	close_mongo,
 	connect_mongo,
 )
-from database.mongodb.main import get_collection
+from database.mongodb.main import decode_vector, get_collection
+from rag.config import VECTOR_INDEX_NAME
+from rag.vector_index import (
+	activate_vector_index,
+	get_index_settings,
+	rollback_vector_index,
+)
+
+# --- Constants ---
+
+INDEX_POLL_SECONDS = 5
+INDEX_READY_TIMEOUT_SECONDS = 15 * 60
 
+# --- Utils ---
 
-async def _push_index():
+
+def _index_definition() -> dict[str, Any]:
 	"""
-	Creates vector search index for corpus
-	collection.
+	Returns the vector search index definition
+	for the configured embedding width.
 	"""
-	index_name = 'corpus_vector_index'
-	collection = get_collection('corpus')
+	# Import embedding settings here so they are
+	# read after the environment is loaded
+	from openai_client.main import EMBEDDING_DIMENSIONS
+
+	return {
+		'fields': [
+			{
+				'type': 'vector',
+				'path': 'embedding',
+				'numDimensions': EMBEDDING_DIMENSIONS,
+				'similarity': 'cosine',
+			}
+		]
+	}
+
+
+def _index_name(definition: dict[str, Any]) -> str:
+	"""
+	Version an index name by its definition, so
+	an unchanged definition maps to the same index.
+	"""
+	digest = hashlib.sha256(
+		json.dumps(definition, sort_keys=True).encode()
+	).hexdigest()
+	return f'{VECTOR_INDEX_NAME}_{digest[:8]}'
+
+
+async def _get_index(
+	collection: AsyncCollection,
+	index_name: str,
+) -> Optional[dict[str, Any]]:
+	"""
+	Returns the search index with a name, or
+	None if it does not exist.
+	"""
+	cursor = await collection.list_search_indexes(index_name)
+	indexes = await cursor.to_list(length=None)
+	return indexes[0] if indexes else None
+
 
-	vector_index = SearchIndexModel(
-		name=index_name,
-		type='vectorSearch',
-		definition={
-			'fields': [
-				{
-					'type': 'vector',
+async def _wait_until_ready(collection: AsyncCollection, index_name: str):
+	"""
+	Poll an index until it is queryable. A newly
+	created index may not be listed yet, so a
+	missing index is polled until the timeout.
+
+	Raises:
+		RuntimeError: If the index fails to build
+		or is not ready within the timeout.
+	"""
+	deadline = time.monotonic() + INDEX_READY_TIMEOUT_SECONDS
+
+	while True:
+		index = await _get_index(collection, index_name)
+		status = index.get('status') if index else 'DOES_NOT_EXIST'
+
+		if status == 'READY' and index.get('queryable'):
+			return
+		if status == 'FAILED':
+			raise RuntimeError(f'Index {index_name} status is {status}.')
+		if time.monotonic() > deadline:
+			raise RuntimeError(
+				f'Index {index_name} not ready after '
+				f'{INDEX_READY_TIMEOUT_SECONDS} s, status is {status}.'
+			)
+
+		print(f'⏳ Index {index_name} status: {status}')
+		await asyncio.sleep(INDEX_POLL_SECONDS)
+
+
+async def _smoke_test(collection: AsyncCollection, index_name: str):
+	"""
+	Query an index with a stored corpus embedding,
+	the document it belongs to should be returned.
+
+	Raises:
+		RuntimeError: If the query returns nothing.
+	"""
+	doc = await collection.find_one(
+		{'embedding': {'$exists': True}},
+		{'_id': 0, 'id': 1, 'embedding': 1},
+	)
+	if doc is None:
+		raise RuntimeError('No embedded corpus documents to query.')
+
+	cursor = await collection.aggregate(
+		[
+			{
+				'$vectorSearch': {
+					'index': index_name,
 					'path': 'embedding',
-					'numDimensions': 3072,
-					'similarity': 'cosine',
+					'queryVector': decode_vector(doc['embedding']).tolist(),
+					'numCandidates': 10,
+					'limit': 1,
 				}
-			]
-		},
+			},
+			{'$project': {'_id': 0, 'id': 1}},
+		]
+	)
+	results = await cursor.to_list(length=None)
+
+	if not results:
+		raise RuntimeError(f'Smoke query on {index_name} returned nothing.')
+	if results[0]['id'] != doc['id']:
+		print(
+			f'{TerminalColors.yellow}'
+			f'Smoke query matched {results[0]["id"]}, expected {doc["id"]}'
+			f'{TerminalColors.reset}'
+		)
+
+
+# --- Commands ---
+
+
+async def build_index():
+	"""
+	Build the index for the current definition
+	alongside the live one, and activate it once
+	it is queryable and passes a smoke query. The
+	live index keeps serving throughout and is
+	kept as the rollback target.
+	"""
+	collection = get_collection('corpus')
+	definition = _index_definition()
+	index_name = _index_name(definition)
+
+	settings = await get_index_settings() or {}
+	if settings.get('active') == index_name:
+		print(f'✅ Vector search index {index_name} is already active.')
+		return
+
+	created = await _get_index(collection, index_name) is None
+	if created:
+		print(f'⏳ Creating vector search index {index_name}...')
+		await collection.create_search_index(
+			SearchIndexModel(
+				name=index_name,
+				type='vectorSearch',
+				definition=definition,
+			)
+		)
+
+	try:
+		await _wait_until_ready(collection, index_name)
+		await _smoke_test(collection, index_name)
+	except Exception:
+		# The live index is untouched, drop a failed
+		# build of this run so it can be retried. An
+		# existing index may be the rollback target
+		if created:
+			await collection.drop_search_index(index_name)
+		raise
+
+	await activate_vector_index(index_name)
+
+	print(
+		f'✅ Vector search index {index_name} is active, '
+		f'running servers switch on their next corpus refresh.'
 	)
 
-	print('⏳ Creating vector search index...')
-	await collection.create_search_index(vector_index)
 
-	# NOTE This does not wait till the index is
-	# queryable but just ensures it is created.
+async def rollback_index():
+	"""
+	Switch back to the previous index, once it
+	is confirmed to still be queryable.
+	"""
+	collection = get_collection('corpus')
+	settings = await get_index_settings() or {}
+
+	previous = settings.get('previous')
+	if not previous:
+		raise RuntimeError('No previous vector index to roll back to.')
+	if await _get_index(collection, previous) is None:
+		raise RuntimeError(f'Previous vector index {previous} was dropped.')
+
+	await _wait_until_ready(collection, previous)
+	await rollback_vector_index()
 
-	waiting = True
-	while waiting:
-		cursor = await collection.list_search_indexes()
-		for i in await cursor.to_list(length=None):
-			if i['name'] == index_name:
-				waiting = False
-				break
-			await asyncio.sleep(5)
 
-	print('✅ Vector search index created successfully.')
+async def index_status():
+	"""
+	Print every corpus search index with its
+	status and role.
+	"""
+	collection = get_collection('corpus')
+	settings = await get_index_settings() or {}
+	roles = {
+		settings.get('active') or VECTOR_INDEX_NAME: 'active',
+		settings.get('previous'): 'previous',
+	}
+
+	cursor = await collection.list_search_indexes()
+	for index in await cursor.to_list(length=None):
+		role = roles.get(index['name'], '')
+		print(
+			f'{TerminalColors.blue}{index["name"]}{TerminalColors.reset}'
+			f' status: {index.get("status")}'
+			f' queryable: {index.get("queryable")}'
+			f'{f" ({role})" if role else ""}'
+		)
+
+
+async def prune_indexes():
+	"""
+	Drop corpus vector indexes other than the
+	active and previous ones.
+	"""
+	collection = get_collection('corpus')
+	settings = await get_index_settings() or {}
+	keep = {
+		settings.get('active') or VECTOR_INDEX_NAME,
+		settings.get('previous'),
+	}
+
+	cursor = await collection.list_search_indexes()
+	for index in await cursor.to_list(length=None):
+		name = index['name']
+		if name.startswith(VECTOR_INDEX_NAME) and name not in keep:
+			await collection.drop_search_index(name)
+			print(f'🗑️ Dropped vector search index {name}')
+
+
+# --- Main ---
 
+_commands = {
+	'build': build_index,
+	'status': index_status,
+	'rollback': rollback_index,
+	'prune': prune_indexes,
+}
 
-async def main():
+
+async def main(command: str = 'build'):
 	await connect_mongo()
-	await _push_index()
-	await close_mongo()
+	try:
+		await _commands[command]()
+	finally:
+		await close_mongo()
 
 
 if __name__ == '__main__':
@@ -69,4 +293,15 @@ if __name__ == '__main__':
 
 	load_dotenv(override=True, dotenv_path=os.path.abspath('.env'))
 
-	asyncio.run(main())
+	parser = argparse.ArgumentParser(
+		description='Manage the corpus vector search index.'
+	)
+	parser.add_argument(
+		'command',
+		nargs='?',
+		default='build',
+		choices=sorted(_commands),
+	)
+	args = parser.parse_args()
+
+	asyncio.run(main(args.command))
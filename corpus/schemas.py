@@ -32,3 +32,8 @@ class CorpusItem(BaseModel):
 		...,
 		description='The document text for the corpus item.',
 	)
+	parent_id: Optional[str] = Field(
+		None,
+		description='The id of the section a chunk was split '
+		'from, None for whole sections.',
+	)
@@ -21,6 +21,8 @@ COLLECTIONS: list[str] = [
 	'messages',
 	'corpus',
 	'monitoring',
+	'embeddings',
+	'settings',
 ]
 database_mappings: dict[str, str] = {
 	# Application Database
@@ -28,6 +30,8 @@ database_mappings: dict[str, str] = {
 	'messages': 'application',
 	'corpus': 'application',
 	'monitoring': 'application',
+	'embeddings': 'application',
+	'settings': 'application',
 }
 
 # --- Connection Management ---
@@ -3,6 +3,8 @@ This module acts as the main
 entry point for MongoDB operations.
 """
 
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
 from pymongo.asynchronous.collection import AsyncCollection
 
 from database.mongodb.config import (
@@ -45,3 +47,53 @@ def get_collection(collection_name: str) -> AsyncCollection:
 		)
 
 	return client[db][collection_name]
+
+
+# --- Vector Encoding ---
+
+
+def encode_vector(vector: list[float] | np.ndarray) -> Binary:
+	"""
+	Pack a vector as a float32 BSON binary
+	vector, which Atlas vector search indexes
+	directly at half the size of BSON doubles.
+	"""
+	return Binary.from_vector(
+		np.asarray(vector, dtype=np.float32).tolist(),
+		BinaryVectorDtype.FLOAT32,
+	)
+
+
+def decode_vector(value: Binary | list[float]) -> np.ndarray:
+	"""
+	Decode a stored vector into a float32 array.
+	Binary vectors are viewed without copying,
+	legacy arrays of doubles are converted.
+
+	Args:
+		value (Binary | list[float]): The stored vector.
+
+	Returns:
+		np.ndarray: The vector as float32.
+	"""
+	if isinstance(value, Binary):
+		# Skip the dtype and padding header bytes
+		return np.frombuffer(value, dtype='<f4', offset=2)
+	return np.asarray(value, dtype=np.float32)
+
+
+def encode_bit_vector(vector: list[float] | np.ndarray) -> Binary:
+	"""
+	Pack the signs of a vector as a packed bit
+	BSON binary vector, one bit per dimension.
+	"""
+	bits = np.packbits(np.asarray(vector) > 0)
+	return Binary.from_vector(bits.tolist(), BinaryVectorDtype.PACKED_BIT)
+
+
+def decode_bit_vector(value: Binary) -> np.ndarray:
+	"""
+	View a packed bit binary vector as its
+	uint8 bytes without copying.
+	"""
+	return np.frombuffer(value, dtype=np.uint8, offset=2)
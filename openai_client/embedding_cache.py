@@ -0,0 +1,430 @@
+"""
+This module contains the embedding cache
+used by the OpenAI client. Embeddings are
+content addressed by normalised text and
+model, held in an in-memory LRU tier and
+optionally persisted to MongoDB so they
+survive restarts. Persisted entries hold
+no input text and expire through a TTL
+index.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Coroutine
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from common.utils import (
+	TerminalColors,
+	get_datetime,
+)
+from database.mongodb.main import get_collection
+
+# --- Configuration ---
+
+EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '2048'))
+# Matches the retention of user data, as cached
+# embeddings are derived from visitor input
+EMBEDDING_CACHE_TTL_DAYS = int(os.getenv('EMBEDDING_CACHE_TTL_DAYS', '10'))
+EMBEDDING_CACHE_PERSIST = os.getenv('EMBEDDING_CACHE_PERSIST', 'true') == 'true'
+EMBEDDING_CACHE_WARM_UP = int(os.getenv('EMBEDDING_CACHE_WARM_UP', '256'))
+# Hits are counted in memory and written to the
+# persistent tier in one batch once this many are
+# pending, so warm up reflects query frequency
+EMBEDDING_CACHE_HIT_BATCH = int(os.getenv('EMBEDDING_CACHE_HIT_BATCH', '32'))
+
+# --- Utils ---
+
+
+def normalise_text(text: str) -> str:
+	"""
+	Normalise whitespace before hashing so inputs
+	differing only in spacing share a cache entry.
+	Case and characters are kept, as they can
+	change the embedding.
+	"""
+	return ' '.join(text.split())
+
+
+def make_key(text: str, model: str) -> str:
+	"""
+	Build the content address for an
+	embedding of `text` under `model`.
+	"""
+	content = f'{model}\n{normalise_text(text)}'
+	return hashlib.sha256(content.encode()).hexdigest()
+
+
+# --- Cache ---
+
+
+class EmbeddingCache:
+	"""
+	Two tier embedding cache, an in-memory
+	LRU with size and TTL based eviction in
+	front of an optional MongoDB collection.
+	"""
+
+	def __init__(
+		self,
+		max_size: int = EMBEDDING_CACHE_SIZE,
+		ttl_seconds: float = EMBEDDING_CACHE_TTL_DAYS * 24 * 60 * 60,
+		persist: bool = EMBEDDING_CACHE_PERSIST,
+	):
+		self.max_size = max_size
+		self.ttl_seconds = ttl_seconds
+		self.persist = persist
+		# key -> (inserted at, embedding)
+		self._entries: OrderedDict[str, tuple[float, list[float]]] = (
+			OrderedDict()
+		)
+		# Stats
+		self.hits = 0
+		self.persistent_hits = 0
+		self.misses = 0
+		# Background persistent writes, kept so they
+		# are not collected and can be drained
+		self._tasks: set[asyncio.Task] = set()
+		self._pending_hits: Counter[str] = Counter()
+
+	def _spawn(self, coroutine: Coroutine[Any, Any, None]):
+		task = asyncio.create_task(coroutine)
+		self._tasks.add(task)
+		task.add_done_callback(self._tasks.discard)
+
+	# --- Memory Tier ---
+
+	def _get_memory(self, key: str) -> Optional[list[float]]:
+		entry = self._entries.get(key)
+		if entry is None:
+			return None
+
+		inserted_at, embedding = entry
+		if time.monotonic() - inserted_at > self.ttl_seconds:
+			del self._entries[key]
+			return None
+
+		self._entries.move_to_end(key)
+		return embedding
+
+	def _set_memory(self, key: str, embedding: list[float]):
+		self._entries[key] = (time.monotonic(), embedding)
+		self._entries.move_to_end(key)
+
+		while len(self._entries) > self.max_size:
+			self._entries.popitem(last=False)
+
+	# --- Persistent Tier ---
+
+	def _ttl_cutoff(self) -> datetime:
+		# The TTL monitor only runs periodically,
+		# so expired entries are filtered on read
+		return get_datetime() - timedelta(seconds=self.ttl_seconds)
+
+	async def _get_persistent(self, key: str) -> Optional[list[float]]:
+		collection = get_collection('embeddings')
+		doc = await collection.find_one(
+			{'key': key, 'created_at': {'$gte': self._ttl_cutoff()}},
+			{'_id': 0, 'embedding': 1},
+		)
+		if not doc:
+			return None
+
+		self._record_hit(key)
+		return doc['embedding']
+
+	async def _get_persistent_many(
+		self,
+		keys: list[str],
+	) -> dict[str, list[float]]:
+		collection = get_collection('embeddings')
+		cursor = collection.find(
+			{'key': {'$in': keys}, 'created_at': {'$gte': self._ttl_cutoff()}},
+			{'_id': 0, 'key': 1, 'embedding': 1},
+		)
+		docs = await cursor.to_list(length=None)
+
+		for doc in docs:
+			self._record_hit(doc['key'])
+		return {doc['key']: doc['embedding'] for doc in docs}
+
+	def _record_hit(self, key: str):
+		"""
+		Count a hit in either tier, the counts are
+		written in batches off the read path.
+		"""
+		if not self.persist:
+			return
+
+		self._pending_hits[key] += 1
+		if self._pending_hits.total() >= EMBEDDING_CACHE_HIT_BATCH:
+			self._spawn(self._flush_hits())
+
+	async def _flush_hits(self):
+		if not self._pending_hits:
+			return
+
+		pending, self._pending_hits = self._pending_hits, Counter()
+		timestamp = get_datetime()
+		try:
+			collection = get_collection('embeddings')
+			await collection.bulk_write(
+				[
+					UpdateOne(
+						{'key': key},
+						{
+							'$inc': {'hits': hits},
+							'$set': {'last_used': timestamp},
+						},
+					)
+					for key, hits in pending.items()
+				],
+				ordered=False,
+			)
+		except Exception as e:
+			print(
+				f'{TerminalColors.yellow}'
+				f'Embedding cache hit count failed: '
+				f'{TerminalColors.reset}'
+				f'{e}'
+			)
+
+	async def _set_persistent(
+		self,
+		key: str,
+		model: str,
+		embedding: list[float],
+	):
+		collection = get_collection('embeddings')
+		timestamp = get_datetime()
+		await collection.update_one(
+			{'key': key},
+			{
+				'$set': {
+					'model': model,
+					'embedding': embedding,
+					'created_at': timestamp,
+					'last_used': timestamp,
+				},
+				'$setOnInsert': {'hits': 0},
+			},
+			upsert=True,
+		)
+
+	# --- Interface ---
+
+	async def get(self, text: str, model: str) -> Optional[list[float]]:
+		"""
+		Look up an embedding, checking the memory
+		tier before the persistent tier.
+		"""
+		key = make_key(text, model)
+
+		embedding = self._get_memory(key)
+		if embedding is not None:
+			self.hits += 1
+			self._record_hit(key)
+			return embedding
+
+		if self.persist:
+			try:
+				embedding = await self._get_persistent(key)
+			except Exception as e:
+				print(
+					f'{TerminalColors.yellow}'
+					f'Embedding cache read failed: '
+					f'{TerminalColors.reset}'
+					f'{e}'
+				)
+
+		if embedding is not None:
+			self.persistent_hits += 1
+			self._set_memory(key, embedding)
+			return embedding
+
+		self.misses += 1
+		return None
+
+	async def get_many(
+		self,
+		texts: list[str],
+		model: str,
+	) -> list[Optional[list[float]]]:
+		"""
+		Look up embeddings for a batch of texts in
+		order, memory tier misses are resolved with
+		a single persistent tier query.
+		"""
+		keys = [make_key(text, model) for text in texts]
+		embeddings = [self._get_memory(key) for key in keys]
+
+		missing = list(
+			dict.fromkeys(
+				key
+				for key, embedding in zip(keys, embeddings, strict=True)
+				if embedding is None
+			)
+		)
+		found: dict[str, list[float]] = {}
+		if missing and self.persist:
+			try:
+				found = await self._get_persistent_many(missing)
+			except Exception as e:
+				print(
+					f'{TerminalColors.yellow}'
+					f'Embedding cache read failed: '
+					f'{TerminalColors.reset}'
+					f'{e}'
+				)
+
+		for key, embedding in found.items():
+			self._set_memory(key, embedding)
+
+		results: list[Optional[list[float]]] = []
+		for key, embedding in zip(keys, embeddings, strict=True):
+			if embedding is not None:
+				self.hits += 1
+				self._record_hit(key)
+			elif key in found:
+				self.persistent_hits += 1
+				embedding = found[key]
+			else:
+				self.misses += 1
+			results.append(embedding)
+
+		return results
+
+	async def set(self, text: str, model: str, embedding: list[float]):
+		"""
+		Store an embedding in both tiers, the
+		persistent write is not awaited.
+		"""
+		key = make_key(text, model)
+		self._set_memory(key, embedding)
+
+		if self.persist:
+			self._spawn(self._safe_set_persistent(key, model, embedding))
+
+	async def _safe_set_persistent(
+		self,
+		key: str,
+		model: str,
+		embedding: list[float],
+	):
+		try:
+			await self._set_persistent(key, model, embedding)
+		except Exception as e:
+			print(
+				f'{TerminalColors.yellow}'
+				f'Embedding cache write failed: '
+				f'{TerminalColors.reset}'
+				f'{e}'
+			)
+
+	async def ensure_indexes(self):
+		"""
+		Create the unique index on the cache key
+		and the TTL index expiring entries. Entries
+		from before dated expiry cannot be expired
+		by the index and are removed.
+		"""
+		if not self.persist:
+			return
+
+		collection = get_collection('embeddings')
+		await collection.delete_many({'created_at': {'$type': 'string'}})
+		await collection.create_index('key', unique=True)
+
+		expire_after = int(self.ttl_seconds)
+		try:
+			await collection.create_index(
+				'created_at', expireAfterSeconds=expire_after
+			)
+		except OperationFailure:
+			# The TTL changed, update the existing index
+			database = collection.database
+			await database.command(
+				'collMod',
+				collection.name,
+				index={
+					'keyPattern': {'created_at': 1},
+					'expireAfterSeconds': expire_after,
+				},
+			)
+
+	async def flush(self):
+		"""
+		Wait for pending persistent writes and
+		write pending hit counts, call before the
+		database connection is closed.
+		"""
+		while self._tasks:
+			await asyncio.gather(*self._tasks, return_exceptions=True)
+
+		await self._flush_hits()
+
+	async def warm_up(self, limit: int = EMBEDDING_CACHE_WARM_UP) -> int:
+		"""
+		Load the most frequently used, unexpired
+		embeddings from the persistent tier into
+		memory.
+
+		Returns:
+			int: The number of embeddings loaded.
+		"""
+		if not self.persist or limit <= 0:
+			return 0
+
+		collection = get_collection('embeddings')
+		cursor = (
+			collection.find(
+				{'created_at': {'$gte': self._ttl_cutoff()}},
+				{'_id': 0, 'key': 1, 'embedding': 1},
+			)
+			.sort([('hits', -1), ('last_used', -1)])
+			.limit(min(limit, self.max_size))
+		)
+		docs = await cursor.to_list(length=None)
+
+		# Insert least used first so the most used
+		# entries are freshest in the LRU order
+		for doc in reversed(docs):
+			self._set_memory(doc['key'], doc['embedding'])
+
+		return len(docs)
+
+	def clear(self):
+		"""
+		Clear the memory tier and reset stats.
+		"""
+		self._entries.clear()
+		self.hits = 0
+		self.persistent_hits = 0
+		self.misses = 0
+
+	def stats(self) -> dict[str, Any]:
+		"""
+		Report cache size and hit rate.
+		"""
+		lookups = self.hits + self.persistent_hits + self.misses
+		hit_rate = (
+			(self.hits + self.persistent_hits) / lookups if lookups else 0.0
+		)
+		return {
+			'size': len(self._entries),
+			'max_size': self.max_size,
+			'hits': self.hits,
+			'persistent_hits': self.persistent_hits,
+			'misses': self.misses,
+			'hit_rate': round(hit_rate, 4),
+		}
+
+
+embedding_cache = EmbeddingCache()
@@ -4,7 +4,8 @@ interacting with the OpenAI API.
 """
 
 import os
-from typing import TypeVar
+from collections.abc import AsyncIterator
+from typing import Optional, TypeVar
 
 from openai import AsyncOpenAI
 from openai.types.responses import (
@@ -13,28 +14,114 @@ from openai.types.responses import (
 )
 from pydantic import BaseModel
 
-from common.utils import handle_exceptions_async
+from common.utils import (
+	handle_exceptions_async,
+	handle_exceptions_async_gen,
+)
+from openai_client.embedding_cache import embedding_cache
 
 # --- Setup and Configuration ---
 
 client = AsyncOpenAI(api_key=os.getenv('OPENAI_KEY'))
 
+_embedding_model = 'text-embedding-3-large'
+
+# Embedding width, text-embedding-3 models are trained
+# so shortened embeddings keep most of their quality.
+# The corpus and its index must use the same width.
+EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', '3072'))
+
 # Generic type for pydantic models
 PYDANTIC = TypeVar('PYDANTIC', bound=BaseModel)
 
+# --- Utils ---
+
+
+def _embedding_cache_model(dimensions: int) -> str:
+	"""
+	Identify the model and width in cache
+	keys, so embeddings of different widths
+	never share an entry.
+	"""
+	return f'{_embedding_model}@{dimensions}'
+
+
 # --- OpenAI Client Functions ---
 
 
 @handle_exceptions_async('OpenAI: Get Embedding')
-async def get_embedding(input: str) -> list[float]:
+async def get_embedding(
+	input: str,
+	dimensions: int = EMBEDDING_DIMENSIONS,
+) -> list[float]:
 	"""
 	Returns the embedding for the given input
-	using OpenAI's text-embedding-3-large model.
+	using OpenAI's text-embedding-3-large model,
+	repeat inputs are served from the cache.
 	"""
+	cache_model = _embedding_cache_model(dimensions)
+	cached = await embedding_cache.get(input, cache_model)
+	if cached is not None:
+		return cached
+
 	response = await client.embeddings.create(
-		model='text-embedding-3-large', input=input
+		model=_embedding_model, input=input, dimensions=dimensions
 	)
-	return response.data[0].embedding
+	embedding = response.data[0].embedding
+
+	await embedding_cache.set(input, cache_model, embedding)
+	return embedding
+
+
+@handle_exceptions_async('OpenAI: Get Embeddings')
+async def get_embeddings(
+	inputs: list[str],
+	dimensions: int = EMBEDDING_DIMENSIONS,
+) -> list[list[float]]:
+	"""
+	Returns embeddings for a batch of inputs in
+	the same order, cached inputs are skipped and
+	the remainder are sent in a single request.
+
+	Args:
+		inputs (list[str]): The inputs to embed.
+		dimensions (int): The embedding width.
+
+	Returns:
+		list[list[float]]: The embeddings, ordered
+		as the inputs.
+	"""
+	cache_model = _embedding_cache_model(dimensions)
+	embeddings: list[Optional[list[float]]] = await embedding_cache.get_many(
+		inputs, cache_model
+	)
+
+	# Deduplicate uncached inputs, preserving order
+	missing = list(
+		dict.fromkeys(
+			input
+			for input, embedding in zip(inputs, embeddings, strict=True)
+			if embedding is None
+		)
+	)
+
+	if missing:
+		response = await client.embeddings.create(
+			model=_embedding_model, input=missing, dimensions=dimensions
+		)
+		fetched = {
+			missing[data.index]: data.embedding for data in response.data
+		}
+
+		for input, embedding in fetched.items():
+			await embedding_cache.set(input, cache_model, embedding)
+
+		embeddings = [
+			embedding if embedding is not None else fetched[input]
+			for input, embedding in zip(inputs, embeddings, strict=True)
+		]
+
+	return embeddings  # type: ignore
 
 
 @handle_exceptions_async('OpenAI: Normal Response')
@@ -62,6 +149,36 @@ async def normal_response(
 	return response.output_text.strip()
 
 
+@handle_exceptions_async_gen('OpenAI: Normal Response Stream')
+async def normal_response_stream(
+	system_prompt: str,
+	user_input: str,
+	model: str = 'gpt-4.1-nano',
+) -> AsyncIterator[str]:
+	"""
+	Streaming variant of normal_response, yields
+	text deltas as they are decoded.
+
+	Args:
+		system_prompt (str): The system prompt to guide the model.
+		user_input (str): The user's input to the model.
+		model (str): The model to use for the response.
+
+	Yields:
+		str: The next text delta from the model.
+	"""
+	stream = await client.responses.create(
+		model=model,
+		instructions=system_prompt,
+		input=user_input,
+		stream=True,
+	)
+
+	async for event in stream:
+		if event.type == 'response.output_text.delta':
+			yield event.delta
+
+
 @handle_exceptions_async('OpenAI: Structured Response')
 async def structured_response(
 	system_prompt: str,
@@ -106,6 +223,41 @@ async def structured_response(
 	return response.output_parsed
 
 
+@handle_exceptions_async_gen('OpenAI: Structured Response Stream')
+async def structured_response_stream(
+	system_prompt: str,
+	user_input: str,
+	response_format: type[PYDANTIC],
+	model: str = 'gpt-4.1-mini',
+) -> AsyncIterator[str]:
+	"""
+	Streaming variant of structured_response,
+	yields raw JSON text deltas conforming to
+	the Pydantic model as they are decoded.
+
+	Args:
+		system_prompt (str): The system prompt to guide the model.
+		user_input (str): The user's input to the model.
+		response_format (Type[PYDANTIC]): The Pydantic model to
+		structure the response.
+		model (str): The model to use for the response.
+
+	Yields:
+		str: The next JSON text delta from the model.
+	"""
+	async with client.responses.stream(
+		model=model,
+		text_format=response_format,
+		input=[
+			{'role': 'system', 'content': system_prompt},
+			{'role': 'user', 'content': user_input},
+		],
+	) as stream:
+		async for event in stream:
+			if event.type == 'response.output_text.delta':
+				yield event.delta
+
+
 @handle_exceptions_async('OpenAI: Agent Response')
 async def agent_response(
 	system_prompt: str,
@@ -140,6 +292,48 @@ async def agent_response(
 	return response.output[0]
 
 
+@handle_exceptions_async_gen('OpenAI: Agent Response Stream')
+async def agent_response_stream(
+	system_prompt: str,
+	user_input: str,
+	tools: list[ToolParam],
+	model: str = 'gpt-4.1-nano',
+) -> AsyncIterator[str | ResponseOutputItem]:
+	"""
+	Streaming variant of agent_response. Text
+	deltas are yielded as they are decoded, the
+	completed output item is yielded last.
+
+	Args:
+		system_prompt (str): The system prompt to guide the model.
+		user_input (str): The user's input to the model.
+		tools (List[ToolParam]): The tools available to the agent.
+		model (str): The model to use for the response.
+
+	Yields:
+		str | ResponseOutputItem: Text deltas, then the
+		completed output item.
+	"""
+	stream = await client.responses.create(
+		model=model,
+		instructions=system_prompt,
+		input=user_input,
+		tools=tools,
+		stream=True,
+	)
+
+	async for event in stream:
+		if event.type == 'response.output_text.delta':
+			yield event.delta
+		elif event.type == 'response.completed':
+			if not event.response.output:
+				raise ValueError(
+					'Agent response is empty. '
+					'Ensure the model is configured correctly.'
+				)
+			yield event.response.output[0]
+
+
 @handle_exceptions_async('OpenAI: Web Search')
 async def agent_search(search_query: str, model: str = 'gpt-4.1-mini') -> str:
 	"""
@@ -0,0 +1,4 @@
+"""
+This package contains the offline quality and
+latency benchmark for the RAG system.
+"""
@@ -0,0 +1,119 @@
+"""
+This module contains the embedders used by
+the benchmark in place of the OpenAI API.
+Stub embeddings are deterministic feature
+hashes of the text, recorded embeddings are
+real model outputs saved to disk once.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from rag.lexical_index import tokenise
+
+# --- Constants ---
+
+RECORDINGS_PATH = os.path.join(
+	os.path.dirname(os.path.abspath(__file__)), 'recordings.npz'
+)
+
+# --- Utils ---
+
+
+def truncate_embeddings(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+	"""
+	Shorten embeddings to their first `dimensions`
+	values and re-normalise, matching the API's
+	`dimensions` parameter for text-embedding-3.
+	"""
+	truncated = vectors[:, :dimensions]
+	norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+	norms[norms == 0] = 1.0
+	return truncated / norms
+
+
+# --- Embedders ---
+
+
+class StubEmbedder:
+	"""
+	Hashes unigrams and bigrams into a fixed
+	width signed vector, so texts sharing terms
+	are close without any network access.
+	"""
+
+	name = 'stub'
+
+	def __init__(self, dimensions: int = 3072):
+		self.dimensions = dimensions
+
+	def _embed(self, text: str) -> np.ndarray:
+		tokens = tokenise(text)
+		features = tokens + [
+			f'{first} {second}'
+			for first, second in zip(tokens, tokens[1:], strict=False)
+		]
+
+		vector = np.zeros(self.dimensions, dtype=np.float32)
+		for feature in features:
+			digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+			value = int.from_bytes(digest, 'little')
+			vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+
+		return vector
+
+	def embed(self, texts: list[str]) -> np.ndarray:
+		"""
+		Embed the texts, one row per text.
+		"""
+		return np.stack([self._embed(text) for text in texts])
+
+
+class RecordedEmbedder:
+	"""
+	Serves embeddings recorded from the live
+	model by `record_embeddings`.
+	"""
+
+	name = 'recorded'
+
+	def __init__(self, path: str = RECORDINGS_PATH):
+		recordings = np.load(path)
+		self._vectors = dict(
+			zip(
+				recordings['texts'].tolist(),
+				recordings['vectors'],
+				strict=True,
+			)
+		)
+
+	def embed(self, texts: list[str]) -> np.ndarray:
+		"""
+		Embed the texts, one row per text.
+		"""
+		missing = [text for text in texts if text not in self._vectors]
+		if missing:
+			raise KeyError(
+				f'No recorded embedding for {len(missing)} texts, '
+				f're-record with --record: {missing[0]!r}'
+			)
+		return np.stack([self._vectors[text] for text in texts])
+
+
+async def record_embeddings(texts: list[str], path: str = RECORDINGS_PATH):
+	"""
+	Embed the texts with the live model and
+	save them for later offline runs.
+	"""
+	from openai_client.main import get_embeddings
+
+	texts = list(dict.fromkeys(texts))
+	vectors = await get_embeddings(texts)
+
+	np.savez_compressed(
+		path,
+		texts=np.asarray(texts),
+		vectors=np.asarray(vectors, dtype=np.float32),
+	)
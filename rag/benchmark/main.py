@@ -0,0 +1,515 @@
+"""
+This module contains the offline benchmark
+for the RAG system. A versioned golden set of
+visitor questions is run through the retrieval
+and packing stages of `fetch_context` against
+the checked-in corpus, with stubbed or recorded
+embeddings and the local vector backend. The
+model calls for refining, planning and context
+refinement are replaced by the golden set's
+recorded plans, so runs are repeatable.
+
+Usage:
+	python -m rag.benchmark.main --runs 5 --output bench.json
+	python -m rag.benchmark.main --dimensions 256 512 1024 3072
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections.abc import Callable
+from typing import Any, Optional
+
+# Settings are read when the modules below are
+# imported, so a script run loads the environment
+# first
+if __name__ == '__main__':
+	from dotenv import load_dotenv
+
+	load_dotenv(override=True, dotenv_path=os.path.abspath('.env'))
+
+import bson
+import numpy as np
+
+from common.utils import TerminalColors, get_timestamp
+from corpus.chunker import (
+	CHUNK_MAX_TOKENS,
+	CHUNK_OVERLAP_TOKENS,
+	chunk_corpus,
+	embedding_text,
+)
+from corpus.parser import parse_corpus
+from database.mongodb.main import encode_vector
+from openai_client.embedding_cache import embedding_cache
+from openai_client.main import EMBEDDING_DIMENSIONS, _embedding_cache_model
+from rag.benchmark.embeddings import (
+	RECORDINGS_PATH,
+	RecordedEmbedder,
+	StubEmbedder,
+	record_embeddings,
+	truncate_embeddings,
+)
+from rag.config import (
+	CONTEXT_TOKEN_BUDGET,
+	HYBRID_RETRIEVAL,
+	LEXICAL_MIN_COVERAGE,
+	PARENT_MAX_TOKENS,
+	QUANTIZED_SHORTLIST_MULTIPLIER,
+	RETRIEVAL_BACKEND,
+	RETRIEVAL_LIMIT,
+)
+from rag.context_packer import pack_context
+from rag.query_executor import retrieve_documents
+from rag.retrieval_params import get_retrieval_params
+from rag.schemas import QueryPlan
+from rag.vector_store import (
+	CorpusStore,
+	_normalise,
+	exact_search,
+	quantize,
+	quantized_search,
+	set_corpus_store,
+)
+
+# --- Constants ---
+
+GOLDEN_SET_PATH = os.path.join(
+	os.path.dirname(os.path.abspath(__file__)), 'golden_set.json'
+)
+
+_benchmark_user_id = 'benchmark_user'
+
+# --- Utils ---
+
+
+def _load_golden_set(path: str) -> dict[str, Any]:
+	with open(path, encoding='utf-8') as file:
+		return json.load(file)
+
+
+def _plan(question: dict[str, Any]) -> QueryPlan:
+	"""
+	Use the recorded plan for a question, or
+	the question itself as a single query.
+	"""
+	return QueryPlan(queries=question.get('queries') or [question['question']])
+
+
+def _latency(samples: list[float]) -> dict[str, float]:
+	"""
+	Summarise latency samples in milliseconds.
+	"""
+	values = np.asarray(samples) * 1000.0
+	return {
+		'p50': round(float(np.percentile(values, 50)), 3),
+		'p95': round(float(np.percentile(values, 95)), 3),
+	}
+
+
+def _rank_metrics(
+	retrieved_ids: list[str],
+	relevant_ids: list[str],
+	k: int,
+) -> tuple[float, float]:
+	"""
+	Return recall@k and the reciprocal rank of
+	the first relevant item.
+	"""
+	relevant = set(relevant_ids)
+	recall = len(relevant.intersection(retrieved_ids[:k])) / len(relevant)
+
+	reciprocal_rank = 0.0
+	for rank, item_id in enumerate(retrieved_ids, start=1):
+		if item_id in relevant:
+			reciprocal_rank = 1.0 / rank
+			break
+
+	return recall, reciprocal_rank
+
+
+def _quantized_report(
+	matrix: np.ndarray,
+	rows: int,
+	runs: int,
+	queries: int = 20,
+	limit: int = RETRIEVAL_LIMIT,
+) -> dict[str, Any]:
+	"""
+	Compare quantized and exact local search on a
+	synthetic corpus of `rows` chunks, each a corpus
+	vector with dense noise. Queries are perturbed
+	chunks, so every query has true neighbours.
+	"""
+	rng = np.random.default_rng(0)
+	dimensions = matrix.shape[1]
+	scale = np.float32(1.0 / np.sqrt(dimensions))
+
+	centres = matrix[rng.integers(len(matrix), size=rows)]
+	noise = rng.standard_normal((rows, dimensions), dtype=np.float32)
+	synthetic = np.ascontiguousarray(_normalise(centres + noise * scale))
+	codes = quantize(synthetic)
+
+	targets = synthetic[rng.choice(rows, size=queries, replace=False)]
+	noise = rng.standard_normal((queries, dimensions), dtype=np.float32)
+	query_matrix = _normalise(targets + noise * scale * np.float32(0.3))
+	shortlist = limit * QUANTIZED_SHORTLIST_MULTIPLIER
+
+	exact_samples: list[float] = []
+	quantized_samples: list[float] = []
+	recalls: list[float] = []
+	top_matches: list[bool] = []
+
+	for query in query_matrix:
+		for _ in range(runs):
+			start = time.perf_counter()
+			exact, _ = exact_search(synthetic, query, limit)
+			exact_samples.append(time.perf_counter() - start)
+
+			start = time.perf_counter()
+			approximate, _ = quantized_search(
+				synthetic, codes, query, limit, shortlist
+			)
+			quantized_samples.append(time.perf_counter() - start)
+
+		recalls.append(len(set(exact) & set(approximate)) / len(exact))
+		top_matches.append(bool(exact[0] == approximate[0]))
+
+	return {
+		'rows': rows,
+		'shortlist': shortlist,
+		'recall_vs_exact': round(sum(recalls) / len(recalls), 4),
+		'top_1_agreement': round(sum(top_matches) / len(top_matches), 4),
+		'matrix_bytes': synthetic.nbytes,
+		'code_bytes': codes.nbytes,
+		'latency_ms': {
+			'exact': _latency(exact_samples),
+			'quantized': _latency(quantized_samples),
+		},
+	}
+
+
+# --- Setup ---
+
+
+def _build_store(
+	embed: Callable[[list[str]], np.ndarray],
+) -> tuple[CorpusStore, list[dict[str, Any]], int]:
+	"""
+	Build the local store from the checked-in
+	corpus, chunked and embedded like ingestion,
+	and serve retrieval from it.
+
+	Returns:
+		tuple[CorpusStore, list[dict[str, Any]], int]:
+		The store, the corpus documents, embedded
+		items first, and the number of embedded items.
+	"""
+	items, parents = chunk_corpus(parse_corpus())
+	corpus_vectors = embed([embedding_text(item) for item in items])
+	docs = [
+		{**item.model_dump(), 'embedding': encode_vector(vector)}
+		for item, vector in zip(items, corpus_vectors, strict=True)
+	] + [parent.model_dump() for parent in parents]
+
+	store = CorpusStore.from_documents(docs)
+	set_corpus_store(store)
+
+	return store, docs, len(items)
+
+
+async def _seed_query_embeddings(
+	questions: list[dict[str, Any]],
+	embed: Callable[[list[str]], np.ndarray],
+) -> np.ndarray:
+	"""
+	Seed the embedding cache so retrieval never
+	reaches the embeddings API, under the key
+	retrieval looks up whatever the benchmark width.
+
+	Returns:
+		np.ndarray: The embeddings of the unique
+		planned queries.
+	"""
+	embedding_cache.persist = False
+	embedding_cache.clear()
+	queries = list(
+		dict.fromkeys(
+			query for question in questions for query in _plan(question).queries
+		)
+	)
+	query_vectors = embed(queries)
+	for query, vector in zip(queries, query_vectors, strict=True):
+		await embedding_cache.set(
+			query,
+			_embedding_cache_model(EMBEDDING_DIMENSIONS),
+			vector.tolist(),
+		)
+
+	return query_vectors
+
+
+# --- Benchmark ---
+
+
+async def run_benchmark(
+	golden_set_path: str = GOLDEN_SET_PATH,
+	embedder: Optional[StubEmbedder | RecordedEmbedder] = None,
+	runs: int = 5,
+	k: int = RETRIEVAL_LIMIT,
+	dimensions: Optional[int] = None,
+	quantized_rows: int = 10000,
+) -> dict[str, Any]:
+	"""
+	Run the golden set through retrieval and
+	packing and report quality and latency.
+
+	Args:
+		golden_set_path (str): Path to the golden set.
+		embedder (StubEmbedder | RecordedEmbedder, optional):
+		The embedder, stub embeddings by default.
+		runs (int): Timed runs per question.
+		k (int): The cut-off for recall@k.
+		dimensions (int, optional): Shorten embeddings
+		to this width, full width by default.
+		quantized_rows (int): Synthetic corpus size for
+		comparing quantized and exact search, 0 skips it.
+
+	Returns:
+		dict[str, Any]: The benchmark report.
+	"""
+	if RETRIEVAL_BACKEND != 'local':
+		raise ValueError('The benchmark requires RETRIEVAL_BACKEND=local.')
+
+	embedder = embedder or StubEmbedder()
+	golden_set = _load_golden_set(golden_set_path)
+	questions = golden_set['questions']
+
+	def embed(texts: list[str]) -> np.ndarray:
+		vectors = embedder.embed(texts)
+		return truncate_embeddings(vectors, dimensions or vectors.shape[1])
+
+	store, docs, embedded_count = _build_store(embed)
+	query_vectors = await _seed_query_embeddings(questions, embed)
+
+	stage_samples: dict[str, list[float]] = {
+		'vector_search': [],
+		'retrieval': [],
+		'packing': [],
+		'total': [],
+	}
+	per_question: list[dict[str, Any]] = []
+
+	# Time the dense search alone, where the
+	# embedding width matters most
+	params = get_retrieval_params()
+	for vector in query_vectors:
+		for _ in range(runs):
+			start = time.perf_counter()
+			store.search(
+				query_vector=vector,
+				limit=params.limit,
+				threshold=params.threshold,
+			)
+			stage_samples['vector_search'].append(time.perf_counter() - start)
+
+	for question in questions:
+		query_plan = _plan(question)
+
+		for _ in range(runs):
+			start = time.perf_counter()
+			retrieval_results = await retrieve_documents(
+				user_id=_benchmark_user_id,
+				query_plan=query_plan,
+				streaming_context='benchmark',
+			)
+			retrieved = time.perf_counter()
+			packed = pack_context(
+				retrieval_results, budget=CONTEXT_TOKEN_BUDGET
+			)
+			end = time.perf_counter()
+
+			stage_samples['retrieval'].append(retrieved - start)
+			stage_samples['packing'].append(end - retrieved)
+			stage_samples['total'].append(end - start)
+
+		# Chunks kept in place of their parent
+		# count towards the parent section
+		retrieved_ids = list(
+			dict.fromkeys(
+				result.item.parent_id or result.item.id
+				for result in retrieval_results
+			)
+		)
+		recall, reciprocal_rank = _rank_metrics(
+			retrieved_ids=retrieved_ids,
+			relevant_ids=question['relevant_ids'],
+			k=k,
+		)
+		per_question.append(
+			{
+				'id': question['id'],
+				'retrieved_ids': retrieved_ids,
+				'recall_at_k': round(recall, 4),
+				'reciprocal_rank': round(reciprocal_rank, 4),
+				'packed_tokens': packed.packed_tokens,
+				'dropped_tokens': packed.dropped_tokens,
+			}
+		)
+
+	count = len(per_question)
+	width = store.matrix.shape[1]
+
+	return {
+		'timestamp': get_timestamp(),
+		'golden_set_version': golden_set['version'],
+		'corpus_version': store.version,
+		'embedder': embedder.name,
+		'dimensions': width,
+		'config': {
+			'k': k,
+			'runs': runs,
+			'hybrid_retrieval': HYBRID_RETRIEVAL,
+			'lexical_min_coverage': LEXICAL_MIN_COVERAGE,
+			'retrieval_params': get_retrieval_params().model_dump(),
+			'context_token_budget': CONTEXT_TOKEN_BUDGET,
+			'chunk_max_tokens': CHUNK_MAX_TOKENS,
+			'chunk_overlap_tokens': CHUNK_OVERLAP_TOKENS,
+			'parent_max_tokens': PARENT_MAX_TOKENS,
+			'chunked_sections': len(docs) - embedded_count,
+		},
+		'quality': {
+			'recall_at_k': round(
+				sum(q['recall_at_k'] for q in per_question) / count, 4
+			),
+			'mrr': round(
+				sum(q['reciprocal_rank'] for q in per_question) / count, 4
+			),
+			'sections_mean': round(
+				sum(len(q['retrieved_ids']) for q in per_question) / count, 2
+			),
+		},
+		'tokens': {
+			'refine_context_mean': round(
+				sum(q['packed_tokens'] for q in per_question) / count, 1
+			),
+			'refine_context_total': sum(
+				q['packed_tokens'] for q in per_question
+			),
+			'dropped_total': sum(q['dropped_tokens'] for q in per_question),
+		},
+		# Corpus vectors are stored as float32 binary
+		# vectors, queries are sent as JSON
+		'size_bytes': {
+			'corpus_document': round(
+				sum(len(bson.encode(doc)) for doc in docs[:embedded_count])
+				/ embedded_count
+			),
+			'index': len(store) * width * 4,
+			'local_matrix': store.matrix.nbytes,
+			'query_payload': round(
+				sum(len(json.dumps(v.tolist())) for v in query_vectors)
+				/ len(query_vectors)
+			),
+		},
+		'latency_ms': {
+			stage: _latency(samples) for stage, samples in stage_samples.items()
+		},
+		'quantized_search': (
+			_quantized_report(
+				matrix=store.matrix,
+				rows=quantized_rows,
+				runs=runs,
+			)
+			if quantized_rows
+			else None
+		),
+		'questions': per_question,
+	}
+
+
+# --- Main ---
+
+
+async def main(args: argparse.Namespace):
+	if args.record:
+		golden_set = _load_golden_set(args.golden_set)
+		items, _ = chunk_corpus(parse_corpus())
+		texts = [embedding_text(item) for item in items] + [
+			query
+			for question in golden_set['questions']
+			for query in _plan(question).queries
+		]
+		await record_embeddings(texts, path=args.recordings)
+		print(
+			f'{TerminalColors.green}'
+			f'Recorded {len(texts)} embeddings to {args.recordings}'
+			f'{TerminalColors.reset}'
+		)
+
+	embedder = (
+		RecordedEmbedder(args.recordings)
+		if args.embedder == 'recorded'
+		else StubEmbedder()
+	)
+
+	# A list of widths runs a Matryoshka sweep
+	# and reports one entry per width
+	reports = [
+		await run_benchmark(
+			golden_set_path=args.golden_set,
+			embedder=embedder,
+			runs=args.runs,
+			k=args.k,
+			dimensions=dimensions,
+			quantized_rows=args.quantized_rows,
+		)
+		for dimensions in args.dimensions or [None]
+	]
+
+	output = json.dumps(
+		reports if args.dimensions else reports[0],
+		indent=2,
+	)
+	if args.output:
+		with open(args.output, 'w', encoding='utf-8') as file:
+			file.write(output)
+		print(
+			f'{TerminalColors.green}'
+			f'Wrote benchmark report to {args.output}'
+			f'{TerminalColors.reset}'
+		)
+	else:
+		print(output)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='RAG benchmark')
+	parser.add_argument('--golden-set', default=GOLDEN_SET_PATH)
+	parser.add_argument(
+		'--embedder', choices=['stub', 'recorded'], default='stub'
+	)
+	parser.add_argument('--recordings', default=RECORDINGS_PATH)
+	parser.add_argument(
+		'--record',
+		action='store_true',
+		help='Record live embeddings before running',
+	)
+	parser.add_argument('--runs', type=int, default=5)
+	parser.add_argument('--k', type=int, default=RETRIEVAL_LIMIT)
+	parser.add_argument(
+		'--quantized-rows',
+		type=int,
+		default=10000,
+		help='Synthetic corpus size for quantized search, 0 to skip',
+	)
+	parser.add_argument(
+		'--dimensions',
+		type=int,
+		nargs='+',
+		help='Embedding widths to sweep, shortened from full width',
+	)
+	parser.add_argument('--output', help='Write the JSON report to a file')
+
+	asyncio.run(main(parser.parse_args()))
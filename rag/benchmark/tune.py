@@ -0,0 +1,430 @@
+"""
+This module contains the retrieval parameter
+tuner. Settings are swept over the golden set,
+against the local store or the live Atlas
+index, and reported with the Pareto frontier
+over recall, latency and retrieved items. The
+chosen setting can be written to the retrieval
+params file the executor reads at runtime.
+
+Usage:
+	python -m rag.benchmark.tune --backend local
+	python -m rag.benchmark.tune --backend atlas --write
+	python -m rag.benchmark.tune --embedder recorded --write
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from typing import Any, Optional
+
+# Settings are read when the modules below are
+# imported, so a script run loads the environment
+# first
+if __name__ == '__main__':
+	from dotenv import load_dotenv
+
+	load_dotenv(override=True, dotenv_path=os.path.abspath('.env'))
+
+import numpy as np
+
+from common.utils import TerminalColors, get_timestamp
+from openai_client.embedding_cache import embedding_cache
+from rag.benchmark.embeddings import (
+	RECORDINGS_PATH,
+	RecordedEmbedder,
+	StubEmbedder,
+	truncate_embeddings,
+)
+from rag.benchmark.main import (
+	GOLDEN_SET_PATH,
+	_benchmark_user_id,
+	_build_store,
+	_latency,
+	_load_golden_set,
+	_plan,
+	_rank_metrics,
+	_seed_query_embeddings,
+)
+from rag.config import RETRIEVAL_BACKEND
+from rag.query_executor import retrieve_documents
+from rag.retrieval_params import (
+	DEFAULT_RETRIEVAL_PARAMS,
+	save_retrieval_params,
+	set_retrieval_params,
+)
+from rag.schemas import RetrievalParams
+from rag.vector_index import load_vector_index_name
+from rag.vector_store import load_corpus_store
+
+# --- Constants ---
+
+DEFAULT_GRID: dict[str, list[Any]] = {
+	'limit': [2, 3, 4, 5],
+	'threshold': [0.5, 0.55, 0.6, 0.65, 0.7],
+	'num_candidates_multiplier': [10, 25, 50],
+	'score_gap': [0.0, 0.05, 0.1],
+	'mmr_lambda': [1.0, 0.7, 0.5],
+}
+
+# --- Utils ---
+
+
+def _settings(
+	grid: dict[str, list[Any]],
+	backend: str,
+) -> list[RetrievalParams]:
+	"""
+	Expand a parameter grid into settings. The
+	candidate multiplier only affects $vectorSearch,
+	so it is held at its default for the local store.
+	"""
+	grid = dict(grid)
+	if backend == 'local':
+		grid['num_candidates_multiplier'] = [
+			DEFAULT_RETRIEVAL_PARAMS.num_candidates_multiplier
+		]
+
+	return [
+		RetrievalParams(**dict(zip(grid, values, strict=True)))
+		for values in itertools.product(*grid.values())
+	]
+
+
+def _dominates(first: dict[str, Any], second: dict[str, Any]) -> bool:
+	"""
+	Whether a result is at least as good as another
+	on recall, latency and items, and better on one.
+	"""
+	at_least = (
+		first['recall'] >= second['recall']
+		and first['latency_ms']['p50'] <= second['latency_ms']['p50']
+		and first['mean_items'] <= second['mean_items']
+	)
+	better = (
+		first['recall'] > second['recall']
+		or first['latency_ms']['p50'] < second['latency_ms']['p50']
+		or first['mean_items'] < second['mean_items']
+	)
+	return at_least and better
+
+
+def pareto_frontier(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+	"""
+	Return the results no other result dominates,
+	by ascending latency.
+	"""
+	frontier = [
+		result
+		for result in results
+		if not any(_dominates(other, result) for other in results)
+	]
+	return sorted(frontier, key=lambda r: r['latency_ms']['p50'])
+
+
+def choose_setting(
+	frontier: list[dict[str, Any]],
+	max_latency_ms: Optional[float] = None,
+) -> dict[str, Any]:
+	"""
+	Choose the frontier result with the best recall
+	within the latency bound, then the best MRR,
+	fewest items and lowest latency. The fastest
+	result is chosen if none meets the bound.
+	"""
+	candidates = [
+		result
+		for result in frontier
+		if max_latency_ms is None
+		or result['latency_ms']['p50'] <= max_latency_ms
+	] or frontier[:1]
+
+	return max(
+		candidates,
+		key=lambda r: (
+			r['recall'],
+			r['mrr'],
+			-r['mean_items'],
+			-r['latency_ms']['p50'],
+		),
+	)
+
+
+# --- Tuner ---
+
+
+async def _evaluate(
+	questions: list[dict[str, Any]],
+	params: RetrievalParams,
+	runs: int,
+) -> dict[str, Any]:
+	"""
+	Run the golden set through retrieval with a
+	setting. Recall is measured over every item
+	returned, as all of them reach the refiner.
+	"""
+	set_retrieval_params(params)
+
+	samples: list[float] = []
+	recalls: list[float] = []
+	reciprocal_ranks: list[float] = []
+	item_counts: list[int] = []
+
+	for question in questions:
+		query_plan = _plan(question)
+
+		for _ in range(runs):
+			start = time.perf_counter()
+			retrieval_results = await retrieve_documents(
+				user_id=_benchmark_user_id,
+				query_plan=query_plan,
+				streaming_context='benchmark',
+			)
+			samples.append(time.perf_counter() - start)
+
+		retrieved_ids = list(
+			dict.fromkeys(
+				result.item.parent_id or result.item.id
+				for result in retrieval_results
+			)
+		)
+		recall, reciprocal_rank = _rank_metrics(
+			retrieved_ids=retrieved_ids,
+			relevant_ids=question['relevant_ids'],
+			k=len(retrieved_ids),
+		)
+		recalls.append(recall)
+		reciprocal_ranks.append(reciprocal_rank)
+		item_counts.append(len(retrieval_results))
+
+	return {
+		'params': params.model_dump(),
+		'recall': round(float(np.mean(recalls)), 4),
+		'mrr': round(float(np.mean(reciprocal_ranks)), 4),
+		'mean_items': round(float(np.mean(item_counts)), 2),
+		'latency_ms': _latency(samples),
+	}
+
+
+async def tune_retrieval(
+	golden_set_path: str = GOLDEN_SET_PATH,
+	backend: str = 'local',
+	embedder: Optional[StubEmbedder | RecordedEmbedder] = None,
+	grid: Optional[dict[str, list[Any]]] = None,
+	runs: int = 3,
+	max_latency_ms: Optional[float] = None,
+) -> dict[str, Any]:
+	"""
+	Sweep retrieval parameters over the golden set
+	and report the Pareto frontier and the chosen
+	setting.
+
+	Args:
+		golden_set_path (str): Path to the golden set.
+		backend (str): 'local' to tune against a local
+		store built with `embedder`, or 'atlas' to tune
+		against the live index with live embeddings.
+		embedder (StubEmbedder | RecordedEmbedder, optional):
+		The local embedder, stub embeddings by default.
+		grid (dict[str, list[Any]], optional): Values to
+		sweep per parameter, the default grid otherwise.
+		runs (int): Timed runs per question and setting.
+		max_latency_ms (float, optional): The p50 latency
+		bound for the chosen setting.
+
+	Returns:
+		dict[str, Any]: The tuning report.
+	"""
+	if RETRIEVAL_BACKEND != backend:
+		raise ValueError(
+			f'Tuning the {backend} backend requires '
+			f'RETRIEVAL_BACKEND={backend}.'
+		)
+
+	golden_set = _load_golden_set(golden_set_path)
+	questions = golden_set['questions']
+
+	if backend == 'local':
+		embedder = embedder or StubEmbedder()
+
+		def embed(texts: list[str]) -> np.ndarray:
+			vectors = embedder.embed(texts)
+			return truncate_embeddings(vectors, vectors.shape[1])
+
+		_build_store(embed)
+		await _seed_query_embeddings(questions, embed)
+	else:
+		await load_corpus_store()
+		await load_vector_index_name()
+
+	settings = _settings(grid or DEFAULT_GRID, backend)
+
+	try:
+		# Warm up, so live query embeddings are
+		# cached before any setting is timed
+		await _evaluate(questions, DEFAULT_RETRIEVAL_PARAMS, runs=1)
+
+		results = []
+		for params in settings:
+			results.append(await _evaluate(questions, params, runs))
+	finally:
+		set_retrieval_params(None)
+
+	frontier = pareto_frontier(results)
+	chosen = choose_setting(frontier, max_latency_ms)
+
+	return {
+		'timestamp': get_timestamp(),
+		'golden_set_version': golden_set['version'],
+		'backend': backend,
+		'embedder': embedder.name if embedder else 'live',
+		'runs': runs,
+		'max_latency_ms': max_latency_ms,
+		'settings': len(results),
+		'chosen': chosen,
+		'frontier': frontier,
+		'results': sorted(
+			results, key=lambda r: (-r['recall'], r['latency_ms']['p50'])
+		),
+	}
+
+
+# --- Main ---
+
+
+async def main(args: argparse.Namespace):
+	grid = {
+		'limit': args.limits,
+		'threshold': args.thresholds,
+		'num_candidates_multiplier': args.num_candidates,
+		'score_gap': args.score_gaps,
+		'mmr_lambda': args.mmr_lambdas,
+	}
+
+	embedder = None
+	if args.backend == 'local':
+		embedder = (
+			RecordedEmbedder(args.recordings)
+			if args.embedder == 'recorded'
+			else StubEmbedder()
+		)
+	else:
+		from database.mongodb.config import close_mongo, connect_mongo
+
+		await connect_mongo()
+
+	try:
+		report = await tune_retrieval(
+			golden_set_path=args.golden_set,
+			backend=args.backend,
+			embedder=embedder,
+			grid=grid,
+			runs=args.runs,
+			max_latency_ms=args.max_latency_ms,
+		)
+	finally:
+		if args.backend == 'atlas':
+			await embedding_cache.flush()
+			await close_mongo()
+
+	for result in report['frontier']:
+		print(
+			f'{TerminalColors.cyan}{result["params"]}{TerminalColors.reset}'
+			f' recall: {result["recall"]}'
+			f' mrr: {result["mrr"]}'
+			f' items: {result["mean_items"]}'
+			f' p50: {result["latency_ms"]["p50"]} ms'
+		)
+
+	chosen = report['chosen']
+	print(
+		f'{TerminalColors.green}'
+		f'Chosen: {chosen["params"]}'
+		f'{TerminalColors.reset}'
+		f' recall: {chosen["recall"]} p50: {chosen["latency_ms"]["p50"]} ms'
+	)
+
+	if args.write:
+		save_retrieval_params(
+			RetrievalParams(**chosen['params']),
+			metadata={
+				'backend': report['backend'],
+				'embedder': report['embedder'],
+				'golden_set_version': report['golden_set_version'],
+				'recall': chosen['recall'],
+				'mrr': chosen['mrr'],
+				'latency_ms': chosen['latency_ms'],
+			},
+		)
+		print(
+			f'{TerminalColors.green}'
+			f'Wrote retrieval params'
+			f'{TerminalColors.reset}'
+		)
+
+	if args.output:
+		with open(args.output, 'w', encoding='utf-8') as file:
+			json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Retrieval parameter tuner')
+	parser.add_argument('--golden-set', default=GOLDEN_SET_PATH)
+	parser.add_argument(
+		'--backend', choices=['local', 'atlas'], default='local'
+	)
+	parser.add_argument(
+		'--embedder', choices=['stub', 'recorded'], default='stub'
+	)
+	parser.add_argument('--recordings', default=RECORDINGS_PATH)
+	parser.add_argument('--runs', type=int, default=3)
+	parser.add_argument(
+		'--limits', type=int, nargs='+', default=DEFAULT_GRID['limit']
+	)
+	parser.add_argument(
+		'--thresholds',
+		type=float,
+		nargs='+',
+		default=DEFAULT_GRID['threshold'],
+	)
+	parser.add_argument(
+		'--num-candidates',
+		type=int,
+		nargs='+',
+		default=DEFAULT_GRID['num_candidates_multiplier'],
+	)
+	parser.add_argument(
+		'--score-gaps',
+		type=float,
+		nargs='+',
+		default=DEFAULT_GRID['score_gap'],
+	)
+	parser.add_argument(
+		'--mmr-lambdas',
+		type=float,
+		nargs='+',
+		default=DEFAULT_GRID['mmr_lambda'],
+	)
+	parser.add_argument(
+		'--max-latency-ms',
+		type=float,
+		help='p50 latency bound for the chosen setting',
+	)
+	parser.add_argument(
+		'--write',
+		action='store_true',
+		help='Write the chosen setting to the runtime retrieval params',
+	)
+	parser.add_argument('--output', help='Write the JSON report to a file')
+
+	args = parser.parse_args()
+
+	# Stub scores say nothing about the live embedding
+	# model, so only live or recorded runs are written
+	if args.write and args.backend == 'local' and args.embedder != 'recorded':
+		parser.error('--write requires --backend atlas or --embedder recorded')
+
+	asyncio.run(main(args))
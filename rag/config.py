@@ -0,0 +1,118 @@
+"""
+This module contains configuration settings
+for the RAG system.
+"""
+
+import os
+
+# --- Retrieval ---
+
+# Backend used for dense retrieval, either 'local'
+# (in-process NumPy search) or 'atlas' ($vectorSearch).
+# The atlas backend is used as a fallback whenever the
+# local store is unavailable.
+RETRIEVAL_BACKEND = os.getenv('RETRIEVAL_BACKEND', 'local')
+
+# Default Atlas index name, rebuilds create versioned
+# indexes and switch the active name in MongoDB
+VECTOR_INDEX_NAME = 'corpus_vector_index'
+
+# Shortlist local search candidates by Hamming distance
+# over 1-bit sign codes, then rescore the shortlist with
+# exact cosine. Only worthwhile for large corpora. This
+# is approximate: on the benchmark's 10k row synthetic
+# corpus the top 3 recall against exact search is about
+# 0.68 at a multiplier of 10, 0.88 at 50 and 0.92 at
+# 100, and it drops further when many rows are near
+# duplicates of each other
+QUANTIZED_SEARCH = os.getenv('QUANTIZED_SEARCH', 'false') == 'true'
+QUANTIZED_SHORTLIST_MULTIPLIER = int(
+	os.getenv('QUANTIZED_SHORTLIST_MULTIPLIER', '50')
+)
+MAX_SUB_QUERIES = 3
+RETRIEVAL_CONCURRENCY = 10
+
+# Defaults for the retrieval parameters, overridden
+# by the values written by the tuner when present
+RETRIEVAL_LIMIT = 3
+RETRIEVAL_THRESHOLD = 0.6
+NUM_CANDIDATES_MULTIPLIER = 25
+RETRIEVAL_SCORE_GAP = 0.0
+RETRIEVAL_MMR_LAMBDA = float(os.getenv('RETRIEVAL_MMR_LAMBDA', '1.0'))
+RETRIEVAL_PARAMS_PATH = os.getenv(
+	'RETRIEVAL_PARAMS_PATH',
+	os.path.join(
+		os.path.dirname(os.path.abspath(__file__)), 'retrieval_params.json'
+	),
+)
+
+# Fuse BM25 results with vector results by reciprocal
+# rank fusion, the lexical path alone is used when the
+# embedding API is slow or unavailable
+HYBRID_RETRIEVAL = os.getenv('HYBRID_RETRIEVAL', 'true') == 'true'
+RRF_K = 60
+# Relevance floor for fused BM25 hits, the share of
+# a query's IDF weight an item must match, so an item
+# matching one common term does not take a slot the
+# vector threshold would have left empty. Not applied
+# when the lexical path is the only one available
+LEXICAL_MIN_COVERAGE = float(os.getenv('LEXICAL_MIN_COVERAGE', '0.3'))
+
+# Candidates fetched per hit for maximal marginal
+# relevance re-ranking, so near-duplicate sections
+# do not take every slot of a sub-query. Enabled by
+# a RETRIEVAL_MMR_LAMBDA below 1, or by the tuner
+MMR_CANDIDATE_MULTIPLIER = 3
+EMBEDDING_TIMEOUT_SECONDS = 5.0
+
+# --- Routing ---
+
+# Skip the refiner when there is no conversation
+# summary, and the planner for short inputs whose
+# embedding clearly matches a single corpus header
+ROUTER_ENABLED = os.getenv('ROUTER_ENABLED', 'true') == 'true'
+ROUTER_MAX_WORDS = 12
+ROUTER_MIN_HEADER_SIMILARITY = 0.45
+ROUTER_MIN_HEADER_MARGIN = 0.08
+
+# Refine the input and plan sub-queries in a single
+# structured call instead of two serial calls
+FUSED_PLANNING = os.getenv('FUSED_PLANNING', 'false') == 'true'
+
+# Stream the planner output and retrieve each
+# sub-query as soon as it is complete
+STREAMING_PLANNING = os.getenv('STREAMING_PLANNING', 'false') == 'true'
+
+# Vector search the raw input while the refiner and
+# planner run, the speculative hits stand in for the
+# planned results when the top score clears the bar
+# and are merged into them otherwise
+SPECULATIVE_RETRIEVAL = os.getenv('SPECULATIVE_RETRIEVAL', 'true') == 'true'
+SPECULATIVE_SCORE_BAR = float(os.getenv('SPECULATIVE_SCORE_BAR', '0.8'))
+
+# --- Context Packing ---
+
+# Token budget for retrieved entries sent to the
+# context refiner, counted with o200k_base
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '4000'))
+CONTEXT_MIN_TRIM_TOKENS = 100
+
+# A matched chunk is replaced by its whole parent
+# section when the parent fits in this many tokens
+# and in the remaining budget, and kept otherwise
+PARENT_MAX_TOKENS = int(os.getenv('PARENT_MAX_TOKENS', '600'))
+
+# --- Semantic Cache ---
+
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'true') == 'true'
+SEMANTIC_CACHE_MAX_DISTANCE = float(
+	os.getenv('SEMANTIC_CACHE_MAX_DISTANCE', '0.08')
+)
+SEMANTIC_CACHE_SIZE = 512
+SEMANTIC_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# --- Corpus Store ---
+
+# Interval for reloading the corpus store, the
+# semantic cache is invalidated when it changes
+CORPUS_REFRESH_MINUTES = 10
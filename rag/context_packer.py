@@ -0,0 +1,181 @@
+"""
+This module contains the context packer
+for the RAG system, which fits retrieved
+items into a token budget before they are
+sent to the context refiner.
+"""
+
+import json
+from functools import cache
+
+import tiktoken
+
+from corpus.schemas import CorpusItem
+from rag.config import (
+	CONTEXT_MIN_TRIM_TOKENS,
+	CONTEXT_TOKEN_BUDGET,
+	PARENT_MAX_TOKENS,
+)
+from rag.schemas import PackedContext, RetrievedItem
+
+# --- Utils ---
+
+
+@cache
+def _get_encoding() -> tiktoken.Encoding:
+	"""
+	Load the tokeniser on first use, the
+	encoding is downloaded if not cached.
+	"""
+	return tiktoken.get_encoding('o200k_base')
+
+
+def count_tokens(text: str) -> int:
+	"""
+	Get the number of tokens in a text string.
+	"""
+	return len(_get_encoding().encode(text))
+
+
+def package_item(item: CorpusItem) -> str:
+	"""
+	Package a CorpusItem into a JSON string
+	with relevant information.
+	"""
+	return json.dumps(
+		{
+			'context': item.context,
+			'document': item.document,
+		},
+		indent=2,
+	)
+
+
+def _trim_item(item: CorpusItem, max_tokens: int) -> str:
+	"""
+	Package an item with its document cut down
+	so the packaged entry fits in `max_tokens`.
+	"""
+	overhead = count_tokens(package_item(item)) - count_tokens(item.document)
+	document_tokens = _get_encoding().encode(item.document)
+	keep = max(max_tokens - overhead, 0)
+	trimmed = _get_encoding().decode(document_tokens[:keep]).rstrip() + '...'
+	return package_item(item.model_copy(update={'document': trimmed}))
+
+
+# --- Parent Resolution ---
+
+
+def resolve_parents(
+	retrieval_results: list[RetrievedItem],
+	parents: dict[str, CorpusItem],
+	budget: int = CONTEXT_TOKEN_BUDGET,
+	max_parent_tokens: int = PARENT_MAX_TOKENS,
+) -> list[RetrievedItem]:
+	"""
+	Replace matched chunks by their parent
+	section in relevance order, while the parent
+	fits in `max_parent_tokens` and the remaining
+	budget. Further chunks of a returned parent
+	are dropped, and chunks whose parent does not
+	fit are kept as they are.
+
+	Args:
+		retrieval_results (list[RetrievedItem]): The
+		retrieved items, most relevant first.
+		parents (dict[str, CorpusItem]): Parent sections
+		by id.
+		budget (int): The context token budget.
+		max_parent_tokens (int): The largest parent to
+		return in place of a chunk.
+
+	Returns:
+		list[RetrievedItem]: The resolved items, most
+		relevant first.
+	"""
+	resolved: list[RetrievedItem] = []
+	returned_parents: set[str] = set()
+	chunked_parents: set[str] = set()
+	used_tokens = 0
+
+	for result in retrieval_results:
+		parent_id = result.item.parent_id
+
+		if parent_id in returned_parents:
+			continue
+
+		parent = parents.get(parent_id) if parent_id else None
+		if parent is not None and parent_id not in chunked_parents:
+			tokens = count_tokens(package_item(parent))
+			if tokens <= max_parent_tokens and used_tokens + tokens <= budget:
+				resolved.append(result.model_copy(update={'item': parent}))
+				returned_parents.add(parent_id)
+				used_tokens += tokens
+				continue
+
+		if parent_id is not None:
+			chunked_parents.add(parent_id)
+		resolved.append(result)
+		used_tokens += count_tokens(package_item(result.item))
+
+	return resolved
+
+
+# --- Packer ---
+
+
+def pack_context(
+	retrieval_results: list[RetrievedItem],
+	budget: int = CONTEXT_TOKEN_BUDGET,
+) -> PackedContext:
+	"""
+	Pack retrieved items into the token budget
+	in relevance order. Items that do not fit
+	are trimmed if enough budget remains, and
+	dropped otherwise.
+
+	Args:
+		retrieval_results (list[RetrievedItem]): The
+		retrieved items, most relevant first.
+		budget (int): The maximum number of tokens.
+
+	Returns:
+		PackedContext: The packed entries and token
+		accounting.
+	"""
+	entries: list[str] = []
+	packed_tokens = 0
+	dropped_tokens = 0
+	trimmed_items = 0
+	dropped_items = 0
+
+	for result in retrieval_results:
+		entry = package_item(result.item)
+		tokens = count_tokens(entry)
+		remaining = budget - packed_tokens
+
+		if tokens <= remaining:
+			entries.append(entry)
+			packed_tokens += tokens
+			continue
+
+		if remaining >= CONTEXT_MIN_TRIM_TOKENS:
+			entry = _trim_item(result.item, remaining)
+			trimmed_tokens = count_tokens(entry)
+			entries.append(entry)
+			packed_tokens += trimmed_tokens
+			dropped_tokens += max(tokens - trimmed_tokens, 0)
+			trimmed_items += 1
+			continue
+
+		dropped_tokens += tokens
+		dropped_items += 1
+
+	return PackedContext(
+		text='\n'.join(entries),
+		packed_items=len(entries),
+		trimmed_items=trimmed_items,
+		dropped_items=dropped_items,
+		packed_tokens=packed_tokens,
+		dropped_tokens=dropped_tokens,
+	)
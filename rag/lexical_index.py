@@ -0,0 +1,135 @@
+"""
+This module contains the in-process BM25
+index for the corpus. Lexical matching
+complements dense retrieval for exact
+terms such as technology names and module
+codes, which embeddings often rank poorly.
+"""
+
+import math
+import re
+from collections import Counter
+
+from corpus.schemas import CorpusItem
+
+# --- Constants ---
+
+_token_pattern = re.compile(r'[a-z0-9]+(?:[+#]+|\.[a-z0-9]+)*')
+
+_stop_words = frozenset(
+	'a an and are as at be by did do does for from had has have how i if '
+	'in is it its me my of on or so than that the their them then there '
+	'these they this to was were what when where which who why will with '
+	'you your'.split()
+)
+
+# --- Utils ---
+
+
+def tokenise(text: str) -> list[str]:
+	"""
+	Split text into lowercase terms, keeping
+	terms like 'c++', 'c#' and 'node.js' whole
+	and dropping common stop words.
+	"""
+	return [
+		token
+		for token in _token_pattern.findall(text.lower())
+		if token not in _stop_words
+	]
+
+
+# --- Index ---
+
+
+class BM25Index:
+	"""
+	Okapi BM25 index over corpus items. The
+	header is counted twice as a light field
+	boost over the context and document.
+	"""
+
+	def __init__(
+		self,
+		items: list[CorpusItem],
+		k1: float = 1.5,
+		b: float = 0.75,
+	):
+		self.k1 = k1
+		self.b = b
+		self._term_freqs: list[Counter[str]] = []
+		self._lengths: list[int] = []
+
+		document_freqs: Counter[str] = Counter()
+		for item in items:
+			terms = tokenise(
+				f'{item.header} {item.header} {item.context} {item.document}'
+			)
+			term_freqs = Counter(terms)
+			self._term_freqs.append(term_freqs)
+			self._lengths.append(len(terms))
+			document_freqs.update(term_freqs.keys())
+
+		count = len(items)
+		self._average_length = sum(self._lengths) / count if count else 0.0
+		self._idf = {
+			term: math.log(1.0 + (count - freq + 0.5) / (freq + 0.5))
+			for term, freq in document_freqs.items()
+		}
+
+	def search(
+		self,
+		query: str,
+		limit: int,
+		min_coverage: float = 0.0,
+	) -> list[tuple[int, float]]:
+		"""
+		Score every item against the query.
+
+		Args:
+			query (str): The query text.
+			limit (int): The maximum number of results.
+			min_coverage (float): The share of the query's
+			IDF weight an item must match to be returned.
+			Terms missing from the corpus count with the
+			highest IDF, so items cannot match them.
+
+		Returns:
+			list[tuple[int, float]]: Item positions and
+			BM25 scores for matching items, best first.
+		"""
+		query_terms = set(tokenise(query))
+		terms = [term for term in query_terms if term in self._idf]
+		if not terms:
+			return []
+
+		unseen_idf = math.log(1.0 + (len(self._lengths) + 0.5) / 0.5)
+		query_weight = sum(
+			self._idf.get(term, unseen_idf) for term in query_terms
+		)
+
+		scores: list[tuple[int, float]] = []
+		for position, term_freqs in enumerate(self._term_freqs):
+			length_norm = (
+				1.0
+				- self.b
+				+ self.b
+				* (self._lengths[position] / (self._average_length or 1.0))
+			)
+			score = 0.0
+			matched_weight = 0.0
+			for term in terms:
+				freq = term_freqs.get(term, 0)
+				if freq:
+					matched_weight += self._idf[term]
+					score += (
+						self._idf[term]
+						* freq
+						* (self.k1 + 1.0)
+						/ (freq + self.k1 * length_norm)
+					)
+			if score > 0 and matched_weight >= min_coverage * query_weight:
+				scores.append((position, score))
+
+		scores.sort(key=lambda s: s[1], reverse=True)
+		return scores[:limit]
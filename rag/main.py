@@ -4,16 +4,142 @@ for the RAG system, orchestrating the overall
 process.
 """
 
+import asyncio
+from typing import Optional
+
 from common.utils import (
 	TerminalColors,
 	Timer,
 	handle_exceptions_async,
 )
+from corpus.schemas import CorpusItem
+from rag.config import (
+	FUSED_PLANNING,
+	SEMANTIC_CACHE_ENABLED,
+	SPECULATIVE_RETRIEVAL,
+	SPECULATIVE_SCORE_BAR,
+	STREAMING_PLANNING,
+)
 from rag.query_executor import (
+	embed_or_none,
 	refine_context,
-	retrieve_documents_sequential,
+	retrieve_documents,
+	retrieve_documents_stream,
+	speculative_retrieve,
 )
-from rag.query_planner import input_refiner, query_planner
+from rag.query_planner import (
+	input_refiner,
+	query_planner,
+	query_planner_stream,
+	refine_and_plan,
+)
+from rag.router import route_input
+from rag.schemas import PreparedInput, QueryPlan, Route
+from rag.semantic_cache import semantic_cache
+from rag.vector_store import get_corpus_version
+
+# --- Utils ---
+
+
+async def _refine_input(
+	user_id: str,
+	user_input: str,
+	route: Route,
+	verbose: bool = False,
+) -> tuple[str, Optional[QueryPlan]]:
+	"""
+	Refine the user input as directed by the route.
+	A plan is produced here only when the refiner
+	and planner are fused.
+	"""
+	if route.skip_refiner:
+		return user_input, None
+
+	if FUSED_PLANNING and not route.skip_planner:
+		refined_plan = await refine_and_plan(
+			user_id=user_id,
+			user_input=user_input,
+			summary=route.summary,
+			verbose=verbose,
+		)
+		return refined_plan.refined_input, QueryPlan(
+			queries=refined_plan.queries
+		)
+
+	refined_input = await input_refiner(
+		user_id=user_id,
+		user_input=user_input,
+		summary=route.summary,
+		verbose=verbose,
+	)
+	return refined_input, None
+
+
+async def _prepare_input(
+	user_id: str,
+	user_input: str,
+	route: Route,
+	verbose: bool = False,
+) -> PreparedInput:
+	"""
+	Refine the user input, look it up in the
+	semantic cache and plan its sub-queries,
+	as directed by the route. Planning is left
+	to retrieval when the plan is streamed.
+	"""
+	refined_input, query_plan = await _refine_input(
+		user_id=user_id,
+		user_input=user_input,
+		route=route,
+		verbose=verbose,
+	)
+
+	# Reuse retrieval for semantically similar
+	# requests on the same corpus version, the
+	# context is still refined for this input
+	corpus_version = get_corpus_version()
+	input_embedding: list[float] = []
+
+	if SEMANTIC_CACHE_ENABLED and corpus_version is not None:
+		# A failed or slow embedding is a cache miss,
+		# the empty embedding also skips the store
+		input_embedding = (
+			await embed_or_none(refined_input, 'skipping semantic cache') or []
+		)
+
+	if input_embedding:
+		cached_results = semantic_cache.lookup(
+			embedding=input_embedding,
+			corpus_version=str(corpus_version),
+		)
+
+		if cached_results is not None:
+			return PreparedInput(
+				refined_input=refined_input,
+				input_embedding=input_embedding,
+				cached_results=cached_results,
+			)
+
+	if query_plan is None and route.skip_planner:
+		query_plan = QueryPlan(queries=[refined_input])
+	elif query_plan is None and not STREAMING_PLANNING:
+		query_plan = await query_planner(refined_input=refined_input)
+
+	return PreparedInput(
+		refined_input=refined_input,
+		query_plan=query_plan,
+		input_embedding=input_embedding,
+	)
+
+
+def _prepares_with_model(route: Route) -> bool:
+	"""
+	Whether preparing the input calls a model,
+	the only work speculative retrieval can hide.
+	"""
+	plans_ahead = not route.skip_planner and not STREAMING_PLANNING
+	return not route.skip_refiner or plans_ahead
+
 
 # --- Main Orchestrator ---
 
@@ -34,45 +160,111 @@ async def fetch_context(
 		str: The augmented context for generation.
 	"""
 	timer = Timer(start=True)
-	refined_input = await input_refiner(
-		user_id=user_id,
-		user_input=user_input,
-		verbose=verbose,
+	route = await route_input(user_id=user_id, user_input=user_input)
+	routing_time = timer.elapsed()
+
+	# Overlap retrieval on the raw input with refining
+	# and planning, when the route leaves a model call
+	# for it to hide behind
+	preparation = asyncio.create_task(
+		_prepare_input(
+			user_id=user_id,
+			user_input=user_input,
+			route=route,
+			verbose=verbose,
+		)
 	)
-	refinement_time = timer.elapsed()
+	speculative_hits: list[tuple[CorpusItem, float]] = []
 
-	query_plan = await query_planner(refined_input=refined_input)
-	planning_time = timer.elapsed()
+	# Speculative failures are ignored so the
+	# planned pipeline continues
+	if SPECULATIVE_RETRIEVAL and _prepares_with_model(route):
+		try:
+			speculative_hits = await speculative_retrieve(user_input=user_input)
+		except Exception:
+			speculative_hits = []
 
-	retrieval_results = await retrieve_documents_sequential(
-		user_id=user_id,
-		query_plan=query_plan,
-		streaming_context='agent_thinking',
-		verbose=verbose,
+	speculative_hit = bool(
+		speculative_hits and speculative_hits[0][1] >= SPECULATIVE_SCORE_BAR
 	)
+
+	if speculative_hit:
+		# Confident hits stand in for the planned results
+		preparation.cancel()
+		prepared = PreparedInput(
+			refined_input=user_input,
+			query_plan=QueryPlan(queries=[]),
+		)
+	else:
+		try:
+			prepared = await preparation
+		except BaseException:
+			preparation.cancel()
+			raise
+	preparation_time = timer.elapsed()
+
+	refined_input = prepared.refined_input
+	query_plan = prepared.query_plan
+	retrieval_results = prepared.cached_results
+	cache_hit = retrieval_results is not None
+
+	if retrieval_results is None:
+		# When streaming, planning overlaps retrieval
+		if query_plan is None:
+			query_plan, retrieval_results = await retrieve_documents_stream(
+				user_id=user_id,
+				query_stream=query_planner_stream(refined_input=refined_input),
+				streaming_context='agent_thinking',
+				prior_hits=speculative_hits,
+				verbose=verbose,
+			)
+		else:
+			retrieval_results = await retrieve_documents(
+				user_id=user_id,
+				query_plan=query_plan,
+				streaming_context='agent_thinking',
+				prior_hits=speculative_hits,
+				verbose=verbose,
+			)
+
+		if prepared.input_embedding:
+			semantic_cache.store(
+				embedding=prepared.input_embedding,
+				corpus_version=str(get_corpus_version()),
+				results=retrieval_results,
+			)
 	retrieval_time = timer.elapsed()
 
 	augmented_context = await refine_context(
 		user_input=user_input,
 		retrieval_results=retrieval_results,
+		verbose=verbose,
 	)
 	augmentation_time = timer.elapsed()
 
 	total_time = (
-		refinement_time + planning_time + retrieval_time + augmentation_time
+		routing_time + preparation_time + retrieval_time + augmentation_time
 	)
 
 	if verbose:
 		print('\n--- RAG Pipeline Statistics ---\n')
 		print(f'{TerminalColors.yellow}Pipeline Timing\n{TerminalColors.reset}')
-		print(f'Refinement Time: {refinement_time:.4f} seconds')
-		print(f'Planning Time: {planning_time:.4f} seconds')
+		print(f'Routing Time: {routing_time:.4f} seconds')
+		print(f'Speculative Hit: {speculative_hit}')
+		print(f'Semantic Cache Hit: {cache_hit}')
+		print(f'Refinement and Planning Time: {preparation_time:.4f} seconds')
 		print(f'Retrieval Time: {retrieval_time:.4f} seconds')
 		print(f'Augmentation Time: {augmentation_time:.4f} seconds')
 		print(f'Total Pipeline Time: {total_time:.4f} seconds')
 		print(
 			f'{TerminalColors.yellow}\nPipeline Results\n{TerminalColors.reset}'
 		)
+		print(
+			f'{TerminalColors.magenta}'
+			f'Route\n'
+			f'{TerminalColors.reset}'
+			f'{route.reason}'
+		)
 		print(
 			f'{TerminalColors.magenta}'
 			f'Refined Input\n'
@@ -89,7 +281,10 @@ async def fetch_context(
 			f'{TerminalColors.magenta}'
 			f'Retrieval Results\n'
 			f'{TerminalColors.reset}'
-			f'{retrieval_results}'
+			+ '\n'.join(
+				f'{result.item.id}: {result.relevance:.4f}'
+				for result in retrieval_results
+			)
 		)
 		print(
 			f'{TerminalColors.magenta}'
@@ -6,8 +6,11 @@ documents from the corpus.
 """
 
 import asyncio
-import json
 import textwrap
+from collections.abc import AsyncIterator
+from typing import Optional
+
+import numpy as np
 
 from api.common.socket_registry import send_message_ws
 from common.utils import (
@@ -15,12 +18,27 @@ from common.utils import (
 	handle_exceptions_async,
 )
 from corpus.schemas import CorpusItem
-from database.mongodb.main import get_collection
+from database.mongodb.main import decode_vector, get_collection
 from openai_client.main import (
 	get_embedding,
+	get_embeddings,
 	normal_response,
 )
-from rag.schemas import QueryPlan
+from rag.config import (
+	EMBEDDING_TIMEOUT_SECONDS,
+	HYBRID_RETRIEVAL,
+	LEXICAL_MIN_COVERAGE,
+	MAX_SUB_QUERIES,
+	MMR_CANDIDATE_MULTIPLIER,
+	RETRIEVAL_BACKEND,
+	RETRIEVAL_CONCURRENCY,
+	RRF_K,
+)
+from rag.context_packer import pack_context, resolve_parents
+from rag.retrieval_params import get_retrieval_params
+from rag.schemas import QueryPlan, RetrievedItem
+from rag.vector_index import get_vector_index_name
+from rag.vector_store import get_corpus_store, mmr_rerank
 
 # --- Constants ---
 
@@ -29,198 +47,613 @@ _refiner_model = 'gpt-4.1-mini'
 # --- Utils ---
 
 
-def _package_item(item: CorpusItem) -> str:
+def _reciprocal_rank_fusion(
+	rankings: list[list[tuple[CorpusItem, float]]],
+	k: int = RRF_K,
+) -> list[tuple[CorpusItem, float]]:
+	"""
+	Fuse ranked result lists by reciprocal rank
+	fusion, an item scores 1 / (k + rank) for
+	every list it appears in.
+
+	Returns:
+		list[tuple[CorpusItem, float]]: The fused
+		items and their RRF scores, best first.
+	"""
+	items: dict[str, CorpusItem] = {}
+	scores: dict[str, float] = {}
+
+	for ranking in rankings:
+		for rank, (item, _) in enumerate(ranking, start=1):
+			items.setdefault(item.id, item)
+			scores[item.id] = scores.get(item.id, 0.0) + 1.0 / (k + rank)
+
+	ordered = sorted(scores, key=lambda id: scores[id], reverse=True)
+	return [(items[id], scores[id]) for id in ordered]
+
+
+def _merge_hits(
+	rankings: list[list[tuple[CorpusItem, float]]],
+) -> list[RetrievedItem]:
 	"""
-	Package a CorpusItem into a JSON string
-	with relevant information.
+	Merge per sub-query hits by corpus item id,
+	keeping the best score for each item and
+	ordering by relevance fused across rankings.
 	"""
-	return json.dumps(
+	best_scores: dict[str, float] = {}
+	for ranking in rankings:
+		for item, score in ranking:
+			best_scores[item.id] = max(score, best_scores.get(item.id, score))
+
+	return [
+		RetrievedItem(
+			item=item,
+			score=best_scores[item.id],
+			relevance=relevance,
+		)
+		for item, relevance in _reciprocal_rank_fusion(rankings)
+	]
+
+
+def _score_gap_cutoff(
+	hits: list[tuple[CorpusItem, float]],
+	score_gap: float,
+) -> list[tuple[CorpusItem, float]]:
+	"""
+	Cut ranked hits after the first drop in
+	score larger than `score_gap`, so weaker
+	hits well behind a clear match are dropped.
+	A gap of 0 keeps every hit.
+	"""
+	if score_gap <= 0:
+		return hits
+
+	for position in range(1, len(hits)):
+		if hits[position - 1][1] - hits[position][1] > score_gap:
+			return hits[:position]
+
+	return hits
+
+
+# --- Vector Search ---
+
+
+async def _atlas_search(
+	query_vector: list[float],
+	limit: int,
+	threshold: float,
+	num_candidates_multiplier: Optional[int] = None,
+	with_embeddings: bool = False,
+) -> list[tuple[CorpusItem, float]]:
+	"""
+	Search the corpus with an Atlas
+	$vectorSearch aggregation on the
+	active index, optionally returning
+	the embeddings of the hits.
+	"""
+	num_candidates_multiplier = (
+		num_candidates_multiplier
+		or get_retrieval_params().num_candidates_multiplier
+	)
+	collection = get_collection('corpus')
+	pipeline = [
 		{
-			'context': item.context,
-			'document': item.document,
+			'$vectorSearch': {
+				'index': get_vector_index_name(),
+				'path': 'embedding',
+				'queryVector': query_vector,
+				'numCandidates': limit * num_candidates_multiplier,
+				'limit': limit,
+			}
 		},
-		indent=2,
-	)
+		{
+			'$project': {
+				'_id': 0,
+				**({} if with_embeddings else {'embedding': 0}),
+				'embedding_bits': 0,
+				'content_hash': 0,
+				'score': {'$meta': 'vectorSearchScore'},
+			}
+		},
+		{'$match': {'score': {'$gt': threshold}}},
+	]
 
+	cursor = await collection.aggregate(pipeline)
+	docs = await cursor.to_list(length=None)
 
-# --- Retriever ---
+	for doc in docs:
+		if doc.get('embedding') is not None:
+			doc['embedding'] = decode_vector(doc['embedding']).tolist()
 
+	return [(CorpusItem(**doc), doc['score']) for doc in docs]
 
-@handle_exceptions_async('rag.query_executor: Retrieve Documents Sequential')
-async def retrieve_documents_sequential(
-	user_id: str,
-	query_plan: QueryPlan,
-	streaming_context: str,
-	verbose: bool = False,
-) -> str:
-	"""
-	Retrieve docs from corpus in sequential
-	manner:
 
-	Args:
-		user_id (str): The ID of the user making the request.
-		query_plan (QueryPlan): The query plan to execute.
-		verbose (bool): Whether to print verbose output.
+async def _vector_search(
+	query_vector: list[float],
+	limit: Optional[int] = None,
+	threshold: Optional[float] = None,
+	with_embeddings: bool = False,
+) -> list[tuple[CorpusItem, float]]:
+	"""
+	Search the corpus with the configured
+	backend, falling back to $vectorSearch
+	when the local store is not loaded. Unset
+	parameters are read from the runtime
+	retrieval parameters.
 
 	Returns:
-		str: The concatenated string of retrieved
-		document texts.
+		list[tuple[CorpusItem, float]]: The matched
+		items and their scores, best first.
+	"""
+	params = get_retrieval_params()
+	limit = limit or params.limit
+	threshold = params.threshold if threshold is None else threshold
+	store = get_corpus_store()
+
+	if RETRIEVAL_BACKEND == 'local' and store is not None:
+		hits = store.search(
+			query_vector=query_vector,
+			limit=limit,
+			threshold=threshold,
+		)
+	else:
+		hits = await _atlas_search(
+			query_vector=query_vector,
+			limit=limit,
+			threshold=threshold,
+			num_candidates_multiplier=params.num_candidates_multiplier,
+			with_embeddings=with_embeddings,
+		)
+
+	return _score_gap_cutoff(hits, params.score_gap)
+
+
+async def _get_parents(parent_ids: list[str]) -> dict[str, CorpusItem]:
 	"""
-	retrieval_limit = 3
-	retrieval_threshold = 0.6
+	Look up parent sections by id, from the
+	local store when loaded and MongoDB otherwise.
+	"""
+	store = get_corpus_store()
+	if store is not None:
+		return {
+			id: store.parents[id] for id in parent_ids if id in store.parents
+		}
+
 	collection = get_collection('corpus')
-	queries = query_plan.queries
-
-	if len(queries) > 3:
-		queries = queries[:3]
-
-	results: list[str] = []
-	for query in queries:
-		pipeline = [
-			{
-				'$vectorSearch': {
-					'index': 'corpus_vector_index',
-					'path': 'embedding',
-					'queryVector': await get_embedding(query),
-					'numCandidates': retrieval_limit * 25,
-					'limit': retrieval_limit,
-				}
-			},
-			{
-				'$project': {
-					'_id': 0,
-					'embedding': 0,
-					'score': {'$meta': 'vectorSearchScore'},
-				}
-			},
-			{'$match': {'score': {'$gt': retrieval_threshold}}},
-			{'$project': {'score': 0}},
-		]
+	cursor = collection.find(
+		{'id': {'$in': parent_ids}},
+		{'_id': 0, 'embedding': 0, 'embedding_bits': 0, 'content_hash': 0},
+	)
+	docs = await cursor.to_list(length=None)
+
+	return {doc['id']: CorpusItem(**doc) for doc in docs}
+
+
+async def _resolve_hits(
+	rankings: list[list[tuple[CorpusItem, float]]],
+) -> list[RetrievedItem]:
+	"""
+	Merge hits across rankings and resolve
+	matched chunks to their parent sections.
+	"""
+	merged = _merge_hits(rankings)
+	parent_ids = list(
+		dict.fromkeys(
+			result.item.parent_id
+			for result in merged
+			if result.item.parent_id is not None
+		)
+	)
+	if not parent_ids:
+		return merged
+
+	return resolve_parents(merged, await _get_parents(parent_ids))
+
+
+def _diversify(
+	hits: list[tuple[CorpusItem, float]],
+	limit: int,
+	mmr_lambda: float,
+) -> list[tuple[CorpusItem, float]]:
+	"""
+	Re-rank candidate hits by maximal marginal
+	relevance, with relevance taken from the hit
+	scores relative to the top hit. Embeddings
+	come from the local store, or from the hits
+	when searched with their embeddings.
+	"""
+	if len(hits) <= limit or mmr_lambda >= 1.0:
+		return hits[:limit]
+
+	store = get_corpus_store()
+	vectors = store.vectors([item.id for item, _ in hits]) if store else None
+	if vectors is None:
+		if any(item.embedding is None for item, _ in hits):
+			return hits[:limit]
+		vectors = np.asarray([item.embedding for item, _ in hits])
+
+	scores = np.asarray([score for _, score in hits], dtype=np.float32)
+	selected = mmr_rerank(
+		vectors=vectors,
+		relevance=scores / (scores.max() or 1.0),
+		limit=limit,
+		mmr_lambda=mmr_lambda,
+	)
+	return [hits[i] for i in selected]
+
+
+# --- Hybrid Search ---
+
+
+async def embed_or_none(
+	text: str,
+	fallback: str,
+) -> Optional[list[float]]:
+	"""
+	Embed a text on the chat path, bounded by the
+	embedding timeout. A slow or failed call is
+	reported with the `fallback` taken and gives
+	None, so callers degrade instead of failing.
+	"""
+	try:
+		return await asyncio.wait_for(
+			get_embedding(text),
+			timeout=EMBEDDING_TIMEOUT_SECONDS,
+		)
+	except Exception as e:
+		print(
+			f'{TerminalColors.yellow}'
+			f'Embedding unavailable, {fallback}: '
+			f'{TerminalColors.reset}'
+			f'{e!r}'
+		)
+		return None
+
+
+async def _embed_queries(queries: list[str]) -> list[Optional[list[float]]]:
+	"""
+	Embed the queries in one request. When hybrid
+	retrieval can serve lexical results, a slow or
+	failed embedding call degrades to no vectors
+	instead of failing the retrieval.
+	"""
+	store = get_corpus_store()
+
+	if not HYBRID_RETRIEVAL or store is None:
+		return list(await get_embeddings(queries))
 
-		cursor = await collection.aggregate(pipeline)
-		docs = await cursor.to_list(length=None)
+	try:
+		return list(
+			await asyncio.wait_for(
+				get_embeddings(queries),
+				timeout=EMBEDDING_TIMEOUT_SECONDS,
+			)
+		)
+	except Exception as e:
+		print(
+			f'{TerminalColors.yellow}'
+			f'Embedding unavailable, using lexical retrieval: '
+			f'{TerminalColors.reset}'
+			f'{e!r}'
+		)
+		return [None] * len(queries)
 
-		if not docs:
-			continue
 
-		items = [CorpusItem(**doc) for doc in docs]
-		headers = [item.header for item in items]
-		items_str = '\n'.join(item.model_dump_json(indent=2) for item in items)
+async def _search(
+	query: str,
+	query_vector: Optional[list[float]],
+	limit: Optional[int] = None,
+) -> list[tuple[CorpusItem, float]]:
+	"""
+	Search the corpus for a single query, fusing
+	vector and BM25 results when hybrid retrieval
+	is enabled. When diversification is on, extra
+	candidates are fetched and re-ranked by
+	maximal marginal relevance.
+	"""
+	params = get_retrieval_params()
+	limit = limit or params.limit
+	diversify = params.mmr_lambda < 1.0
+	candidates = limit * MMR_CANDIDATE_MULTIPLIER if diversify else limit
+	store = get_corpus_store()
+
+	vector_hits: list[tuple[CorpusItem, float]] = []
+	if query_vector is not None:
+		vector_hits = await _vector_search(
+			query_vector,
+			limit=candidates,
+			with_embeddings=diversify and store is None,
+		)
 
-		# Send headers to client
+	if not HYBRID_RETRIEVAL or store is None:
+		hits = vector_hits
+	else:
+		# Weak lexical hits are only kept when
+		# there are no vector hits to fuse with
+		min_coverage = LEXICAL_MIN_COVERAGE if query_vector is not None else 0.0
+		lexical_hits = store.lexical_search(
+			query=query,
+			limit=candidates,
+			min_coverage=min_coverage,
+		)
+		hits = _reciprocal_rank_fusion([vector_hits, lexical_hits])
+
+	if diversify:
+		hits = _diversify(hits, limit=limit, mmr_lambda=params.mmr_lambda)
+
+	# Embeddings are only needed for re-ranking
+	return [
+		(item.model_copy(update={'embedding': None}), score)
+		if item.embedding is not None
+		else (item, score)
+		for item, score in hits[:limit]
+	]
+
+
+# --- Retriever ---
+
+
+async def _stream_headers(
+	user_id: str,
+	streaming_context: str,
+	hits: list[tuple[CorpusItem, float]],
+	streamed_ids: set[str],
+):
+	"""
+	Send the headers of hits not already
+	streamed to the client, chunks share the
+	header of their parent section.
+	"""
+	new_items: dict[str, CorpusItem] = {}
+	for item, _ in hits:
+		key = item.parent_id or item.id
+		if key not in streamed_ids:
+			new_items.setdefault(key, item)
+	streamed_ids.update(new_items)
+
+	if new_items:
 		await send_message_ws(
 			user_id=user_id,
 			type=streaming_context,
-			data=headers,
+			data=[item.header for item in new_items.values()],
 		)
 
-		item_results = [_package_item(item) for item in items]
 
-		if verbose:
-			print(
-				f'{TerminalColors.cyan}'
-				f'Retrieved document for query: {query}'
-				f'{TerminalColors.reset}'
-			)
-			print(items_str)
+async def _retrieve_query(
+	user_id: str,
+	query: str,
+	query_vector: Optional[list[float]],
+	semaphore: asyncio.Semaphore,
+	streaming_context: str,
+	streamed_ids: set[str],
+	verbose: bool = False,
+) -> list[tuple[CorpusItem, float]]:
+	"""
+	Search the corpus for one sub-query and
+	stream headers not already sent by another
+	sub-query.
+	"""
+	async with semaphore:
+		hits = await _search(query, query_vector)
+
+	await _stream_headers(
+		user_id=user_id,
+		streaming_context=streaming_context,
+		hits=hits,
+		streamed_ids=streamed_ids,
+	)
 
-		results.append('\n'.join(item_results))
+	if verbose and hits:
+		print(
+			f'{TerminalColors.cyan}'
+			f'Retrieved document for query: {query}'
+			f'{TerminalColors.reset}'
+		)
+		for item, score in hits:
+			print(f'{item.id}: {score:.4f}')
 
-	return '\n'.join(results)
+	return hits
 
 
-# TODO parallel approach has race condition on result
-# implement a locking mechanism or use a more robust data structure
+@handle_exceptions_async('rag.query_executor: Speculative Retrieve')
+async def speculative_retrieve(
+	user_input: str,
+) -> list[tuple[CorpusItem, float]]:
+	"""
+	Vector search the raw user input, used to
+	overlap retrieval with refining and planning.
+	Hits keep their vector scores so they can be
+	judged against the speculative score bar.
 
+	Args:
+		user_input (str): The raw user input.
 
-@handle_exceptions_async('rag.query_executor: Retrieve Documents Parallel')
-async def _retrieve_documents_parallel(
+	Returns:
+		list[tuple[CorpusItem, float]]: The matched
+		items and their scores, best first.
+	"""
+	return await _vector_search(await get_embedding(user_input))
+
+
+@handle_exceptions_async('rag.query_executor: Retrieve Documents')
+async def retrieve_documents(
+	user_id: str,
 	query_plan: QueryPlan,
-) -> str:
+	streaming_context: str,
+	prior_hits: Optional[list[tuple[CorpusItem, float]]] = None,
+	verbose: bool = False,
+) -> list[RetrievedItem]:
 	"""
-	Retrieve docs from the corpus in parallel
-	based on the query plan. Returns a single
-	concatenated string.
+	Retrieve docs from the corpus for every
+	sub-query concurrently. Hits are merged
+	across sub-queries so each item, and its
+	header, appears once, and matched chunks
+	are resolved to their parent sections.
 
 	Args:
+		user_id (str): The ID of the user making the request.
 		query_plan (QueryPlan): The query plan to execute.
+		streaming_context (str): The socket message type
+		used to stream retrieved headers.
+		prior_hits (list[tuple[CorpusItem, float]], optional):
+		Hits retrieved ahead of the plan, such as from
+		speculative retrieval, merged into the results.
+		verbose (bool): Whether to print verbose output.
 
 	Returns:
-		str: The concatenated string of retrieved
-		document texts.
+		list[RetrievedItem]: The retrieved items, most
+		relevant first.
 	"""
+	queries = query_plan.queries[:MAX_SUB_QUERIES]
+	semaphore = asyncio.Semaphore(RETRIEVAL_CONCURRENCY)
+	streamed_ids: set[str] = set()
 
-	retrieval_limit = 1
-	collection = get_collection('corpus')
-	sem_docs = asyncio.Semaphore(10)
-	sem_emb = asyncio.Semaphore(10)
-	queries = query_plan.queries
-
-	# Parallel fetch embeddings
-	async def embed(query: str) -> list[float]:
-		async with sem_emb:
-			return await get_embedding(query)
-
-	embeddings = await asyncio.gather(*[embed(q) for q in queries])
-
-	# Parallel fetch documents
-	async def fetch(query_vector):
-		async with sem_docs:
-			pipeline = [
-				{
-					'$vectorSearch': {
-						'index': 'corpus_vector_index',
-						'path': 'embedding',
-						'queryVector': query_vector,
-						'numCandidates': retrieval_limit * 25,
-						'limit': retrieval_limit,
-					}
-				},
-				{
-					'$project': {
-						'_id': 0,
-						'embedding': 0,
-					}
-				},
-			]
-			cursor = await collection.aggregate(pipeline)
-			docs = await cursor.to_list(length=None)
-
-			if not docs:
-				return ''
-
-			item = CorpusItem(**docs[0])
-			return json.dumps(
-				{
-					'context': item.context,
-					'document': item.document,
-				},
-				indent=2,
+	if prior_hits:
+		await _stream_headers(
+			user_id=user_id,
+			streaming_context=streaming_context,
+			hits=prior_hits,
+			streamed_ids=streamed_ids,
+		)
+
+	# Embed the whole plan in one request
+	query_vectors = await _embed_queries(queries)
+
+	# Gather preserves plan order
+	rankings = await asyncio.gather(
+		*[
+			_retrieve_query(
+				user_id=user_id,
+				query=query,
+				query_vector=query_vector,
+				semaphore=semaphore,
+				streaming_context=streaming_context,
+				streamed_ids=streamed_ids,
+				verbose=verbose,
 			)
+			for query, query_vector in zip(queries, query_vectors, strict=True)
+		]
+	)
+
+	return await _resolve_hits(
+		[*rankings, *([prior_hits] if prior_hits else [])]
+	)
+
+
+@handle_exceptions_async('rag.query_executor: Retrieve Documents Stream')
+async def retrieve_documents_stream(
+	user_id: str,
+	query_stream: AsyncIterator[str],
+	streaming_context: str,
+	prior_hits: Optional[list[tuple[CorpusItem, float]]] = None,
+	verbose: bool = False,
+) -> tuple[QueryPlan, list[RetrievedItem]]:
+	"""
+	Retrieve docs for sub-queries as they are
+	streamed from the planner. Each sub-query
+	is embedded and searched as soon as it is
+	complete, overlapping retrieval with the
+	generation of the remaining sub-queries.
 
-	parts = await asyncio.gather(*[fetch(vec) for vec in embeddings])
+	Args:
+		user_id (str): The ID of the user making the request.
+		query_stream (AsyncIterator[str]): The streamed
+		sub-queries.
+		streaming_context (str): The socket message type
+		used to stream retrieved headers.
+		prior_hits (list[tuple[CorpusItem, float]], optional):
+		Hits retrieved ahead of the plan, merged into
+		the results.
+		verbose (bool): Whether to print verbose output.
+
+	Returns:
+		tuple[QueryPlan, list[RetrievedItem]]: The
+		streamed query plan and the retrieved items,
+		most relevant first.
+	"""
+	semaphore = asyncio.Semaphore(RETRIEVAL_CONCURRENCY)
+	streamed_ids: set[str] = set()
+	queries: list[str] = []
+	tasks: list[asyncio.Task] = []
+
+	if prior_hits:
+		await _stream_headers(
+			user_id=user_id,
+			streaming_context=streaming_context,
+			hits=prior_hits,
+			streamed_ids=streamed_ids,
+		)
 
-	return '\n'.join(parts)
+	async def retrieve(query: str) -> list[tuple[CorpusItem, float]]:
+		[query_vector] = await _embed_queries([query])
+		return await _retrieve_query(
+			user_id=user_id,
+			query=query,
+			query_vector=query_vector,
+			semaphore=semaphore,
+			streaming_context=streaming_context,
+			streamed_ids=streamed_ids,
+			verbose=verbose,
+		)
+
+	try:
+		async for query in query_stream:
+			if len(queries) >= MAX_SUB_QUERIES:
+				break
+			queries.append(query)
+			tasks.append(asyncio.create_task(retrieve(query)))
+
+		# Gather preserves plan order
+		rankings = await asyncio.gather(*tasks)
+	except BaseException:
+		for task in tasks:
+			task.cancel()
+		raise
+
+	return QueryPlan(queries=queries), await _resolve_hits(
+		[*rankings, *([prior_hits] if prior_hits else [])]
+	)
 
 
 # --- Augmenter: Context Refiner ---
 
 
 @handle_exceptions_async('rag.query_executor: Refine Context')
-async def refine_context(user_input: str, retrieval_results: str) -> str:
+async def refine_context(
+	user_input: str,
+	retrieval_results: list[RetrievedItem],
+	verbose: bool = False,
+) -> str:
 	"""
 	Refines the context of the retrieved documents
 	using the context of the refined user input to
 	synthesise coherent context before generation.
+	Retrieved items are packed into the context
+	token budget in relevance order.
 
 	Args:
 		refined_input (str): The refined user input.
-		retrieval_results (str): The retrieved document
-		contexts.
+		retrieval_results (list[RetrievedItem]): The
+		retrieved items, most relevant first.
+		verbose (bool): Whether to print verbose output.
 
 	Returns:
 		str: The refined context.
 	"""
+	packed = pack_context(retrieval_results)
+
+	# Reported on every call to track how much
+	# retrieved context the budget drops
+	print(
+		f'{TerminalColors.cyan}'
+		f'Packed context: '
+		f'{TerminalColors.reset}'
+		f'{packed.packed_tokens} tokens packed '
+		f'({packed.packed_items} items, {packed.trimmed_items} trimmed), '
+		f'{packed.dropped_tokens} tokens dropped '
+		f'({packed.dropped_items} items)'
+	)
+
 	system_prompt = textwrap.dedent(f"""
         You are an expert context augmenter for a portfolio
         site with a Retrieval-Augmented Generation (RAG)
@@ -262,7 +695,7 @@ async def refine_context(user_input: str, retrieval_results: str) -> str:
         Inputs:
         - Original user input: provided in the user message.
         - Retrieved entries:
-        {retrieval_results}
+        {packed.text}
     """)
 
 	return await normal_response(
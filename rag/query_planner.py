@@ -3,36 +3,81 @@ This module contains the Input Refiner
 and Query Planner for the RAG system.
 """
 
+import json
+import re
 import textwrap
+from collections.abc import AsyncIterator
+from typing import Optional
 
 from agent.memory.compressor import get_user_summarisation
 from common.utils import (
 	TerminalColors,
 	handle_exceptions_async,
+	handle_exceptions_async_gen,
 )
 from openai_client.main import (
 	normal_response,
 	structured_response,
+	structured_response_stream,
 )
-from rag.schemas import QueryPlan
+from rag.schemas import QueryPlan, RefinedQueryPlan
 
 # --- Constants ---
 
 _refiner_model = 'gpt-4.1-mini'
 _planner_model = 'gpt-4.1'
 
+_queries_pattern = re.compile(r'"queries"\s*:\s*\[')
+
+_planner_prompt = textwrap.dedent("""
+        You are an expert query planner for a portfolio site
+        with a Retrieval-Augmented Generation (RAG) agent.
+        It interacts with visitors, recruiters, and
+        collaborators.
+
+        Your role is to break the refined user input into a
+        set of focused sub-queries that, together, enable
+        comprehensive, context-aware retrieval.
+
+        Goals:
+        - Each sub-query must explore a distinct aspect or
+        related idea, DO NOT REPEAT SEMANTIC SEARCH SPACES.
+        - Only include a sub-query if it adds new information
+        not covered by others.
+        - Ensure related concepts are explored to maximise
+        semantic coverage.
+        - Avoid redundancy; no two sub-queries should overlap.
+        - Include clarifying sub-queries if the request is
+        ambiguous.
+        - Sub-queries must be succinct and use wording that is
+        more likely to get a strong semantic match.
+        - Limit to a maximum of 3 sub-queries.
+        - Base all queries strictly on provided input and
+        context — never invent facts.
+
+        The output will be structured separately; focus only
+        on producing the most effective sub-queries for
+        retrieval.
+    """)
+
+
 # --- Input Refiner ---
 
 
 @handle_exceptions_async('rag.query_planner: Input Refiner')
 async def input_refiner(
-	user_id: str, user_input: str, verbose: bool = False
+	user_id: str,
+	user_input: str,
+	summary: Optional[str] = None,
+	verbose: bool = False,
 ) -> str:
 	"""
 	Refine the user input by reformating the
-	original prompt with relevant context.
+	original prompt with relevant context. The
+	conversation summary is fetched if not given.
 	"""
-	summary = await get_user_summarisation(user_id)
+	if summary is None:
+		summary = await get_user_summarisation(user_id)
 
 	system_prompt = textwrap.dedent(f"""
         You are an expert input refiner for a portfolio site
@@ -96,42 +141,147 @@ async def query_planner(refined_input: str) -> QueryPlan:
 	Plan the query by breaking it down
 	into sub-queries.
 	"""
-	system_prompt = textwrap.dedent("""
-        You are an expert query planner for a portfolio site
-        with a Retrieval-Augmented Generation (RAG) agent.
-        It interacts with visitors, recruiters, and
-        collaborators.
+	query_plan = await structured_response(
+		system_prompt=_planner_prompt,
+		user_input=refined_input,
+		response_format=QueryPlan,
+		model=_planner_model,
+	)
 
-        Your role is to break the refined user input into a
-        set of focused sub-queries that, together, enable
-        comprehensive, context-aware retrieval.
+	return query_plan
 
-        Goals:
-        - Each sub-query must explore a distinct aspect or
-        related idea, DO NOT REPEAT SEMANTIC SEARCH SPACES.
-        - Only include a sub-query if it adds new information
-        not covered by others.
-        - Ensure related concepts are explored to maximise
-        semantic coverage.
-        - Avoid redundancy; no two sub-queries should overlap.
-        - Include clarifying sub-queries if the request is
-        ambiguous.
-        - Sub-queries must be succinct and use wording that is
-        more likely to get a strong semantic match.
+
+class _QueryStreamParser:
+	"""
+	Incrementally parses the JSON stream of a
+	QueryPlan, returning each query string as
+	soon as its closing quote arrives.
+	"""
+
+	def __init__(self):
+		self._buffer = ''
+		self._position: Optional[int] = None
+		self._done = False
+
+	def feed(self, delta: str) -> list[str]:
+		"""
+		Add a delta to the buffer and return the
+		query strings completed by it.
+		"""
+		self._buffer += delta
+
+		if self._position is None:
+			match = _queries_pattern.search(self._buffer)
+			if match is None:
+				return []
+			self._position = match.end()
+
+		queries: list[str] = []
+		while not self._done:
+			start = self._buffer.find('"', self._position)
+			close = self._buffer.find(']', self._position)
+
+			if close != -1 and (start == -1 or close < start):
+				self._done = True
+				break
+			if start == -1:
+				break
+
+			# Find the closing quote, skipping escapes
+			end = start + 1
+			while end < len(self._buffer) and self._buffer[end] != '"':
+				end += 2 if self._buffer[end] == '\\' else 1
+			if end >= len(self._buffer):
+				break
+
+			queries.append(json.loads(self._buffer[start : end + 1]))
+			self._position = end + 1
+
+		return queries
+
+
+@handle_exceptions_async_gen('rag.query_planner: Query Planner Stream')
+async def query_planner_stream(refined_input: str) -> AsyncIterator[str]:
+	"""
+	Streaming variant of query_planner, yields
+	each sub-query as soon as it is complete so
+	retrieval can start before the plan is.
+	"""
+	parser = _QueryStreamParser()
+
+	async for delta in structured_response_stream(
+		system_prompt=_planner_prompt,
+		user_input=refined_input,
+		response_format=QueryPlan,
+		model=_planner_model,
+	):
+		for query in parser.feed(delta):
+			yield query
+
+
+# --- Fused Refiner and Planner ---
+
+
+@handle_exceptions_async('rag.query_planner: Refine and Plan')
+async def refine_and_plan(
+	user_id: str,
+	user_input: str,
+	summary: Optional[str] = None,
+	verbose: bool = False,
+) -> RefinedQueryPlan:
+	"""
+	Refine the user input and plan sub-queries
+	in a single structured call, removing the
+	serial round-trip between the refiner and
+	the planner.
+	"""
+	if summary is None:
+		summary = await get_user_summarisation(user_id)
+
+	system_prompt = textwrap.dedent(f"""
+        You are an expert input refiner and query planner
+        for a portfolio site with a Retrieval-Augmented
+        Generation (RAG) agent. It interacts with visitors,
+        recruiters, and collaborators.
+
+        Step 1 - Refined input:
+        - Refine the user input by blending in only relevant
+        context from the conversation summary, making the
+        request clearer and more specific for retrieval.
+        - Preserve the user's original intent, meaning, and
+        tone exactly; never override or replace it.
+        - Fix grammar, structure, and clarity where needed.
+        - Do not introduce new ideas, assumptions, or
+        speculative context.
+        - Output a single refined version of the input, no
+        alternatives or meta comments.
+
+        Step 2 - Sub-queries:
+        - Break the refined input into focused sub-queries
+        that, together, enable comprehensive retrieval.
+        - Each sub-query must explore a distinct aspect,
+        DO NOT REPEAT SEMANTIC SEARCH SPACES.
+        - Sub-queries must be succinct and use wording that
+        is more likely to get a strong semantic match.
         - Limit to a maximum of 3 sub-queries.
-        - Base all queries strictly on provided input and
+        - Base all queries strictly on the refined input and
         context — never invent facts.
 
-        The output will be structured separately; focus only
-        on producing the most effective sub-queries for
-        retrieval.
+        Conversation summary:
+        {summary}
     """)
 
-	query_plan = await structured_response(
+	if verbose:
+		print(
+			f'{TerminalColors.cyan}'
+			f'Refining and planning input with context:\n'
+			f'{TerminalColors.reset}'
+			f'{summary}\n'
+		)
+
+	return await structured_response(
 		system_prompt=system_prompt,
-		user_input=refined_input,
-		response_format=QueryPlan,
+		user_input=user_input,
+		response_format=RefinedQueryPlan,
 		model=_planner_model,
 	)
-
-	return query_plan
@@ -0,0 +1,104 @@
+"""
+This module holds the retrieval parameters
+read by the executor at runtime. Parameters
+chosen by the tuner are loaded from a JSON
+file, the config defaults are used otherwise.
+"""
+
+import json
+import os
+from typing import Any, Optional
+
+from common.utils import TerminalColors, get_timestamp
+from rag.config import (
+	NUM_CANDIDATES_MULTIPLIER,
+	RETRIEVAL_LIMIT,
+	RETRIEVAL_MMR_LAMBDA,
+	RETRIEVAL_PARAMS_PATH,
+	RETRIEVAL_SCORE_GAP,
+	RETRIEVAL_THRESHOLD,
+)
+from rag.schemas import RetrievalParams
+
+# --- Constants ---
+
+DEFAULT_RETRIEVAL_PARAMS = RetrievalParams(
+	limit=RETRIEVAL_LIMIT,
+	threshold=RETRIEVAL_THRESHOLD,
+	num_candidates_multiplier=NUM_CANDIDATES_MULTIPLIER,
+	score_gap=RETRIEVAL_SCORE_GAP,
+	mmr_lambda=RETRIEVAL_MMR_LAMBDA,
+)
+
+# --- State ---
+
+_retrieval_params: Optional[RetrievalParams] = None
+
+
+def load_retrieval_params(path: str = RETRIEVAL_PARAMS_PATH) -> RetrievalParams:
+	"""
+	Load tuned parameters from `path`, falling
+	back to the defaults for parameters it does
+	not set, or if it is missing or invalid.
+	"""
+	global _retrieval_params
+
+	_retrieval_params = DEFAULT_RETRIEVAL_PARAMS
+	if os.path.exists(path):
+		try:
+			with open(path, encoding='utf-8') as file:
+				_retrieval_params = RetrievalParams(
+					**{
+						**DEFAULT_RETRIEVAL_PARAMS.model_dump(),
+						**json.load(file)['params'],
+					}
+				)
+		except Exception as e:
+			print(
+				f'{TerminalColors.yellow}'
+				f'Invalid retrieval params, using defaults: '
+				f'{TerminalColors.reset}'
+				f'{e}'
+			)
+
+	return _retrieval_params
+
+
+def get_retrieval_params() -> RetrievalParams:
+	"""
+	Returns the retrieval parameters, loaded
+	on first use.
+	"""
+	if _retrieval_params is None:
+		return load_retrieval_params()
+	return _retrieval_params
+
+
+def set_retrieval_params(params: Optional[RetrievalParams]):
+	"""
+	Replace the retrieval parameters in process,
+	None reloads them on next use.
+	"""
+	global _retrieval_params
+	_retrieval_params = params
+
+
+def save_retrieval_params(
+	params: RetrievalParams,
+	metadata: dict[str, Any],
+	path: str = RETRIEVAL_PARAMS_PATH,
+):
+	"""
+	Write retrieval parameters with the tuning
+	metadata they were chosen from.
+	"""
+	with open(path, 'w', encoding='utf-8') as file:
+		json.dump(
+			{
+				'updated_at': get_timestamp(),
+				'params': params.model_dump(),
+				**metadata,
+			},
+			file,
+			indent=2,
+		)
@@ -0,0 +1,85 @@
+"""
+This module contains the fast-path router
+for the RAG system. Cheap local signals are
+used to decide whether the input refiner and
+query planner can be skipped for a request.
+"""
+
+from agent.memory.compressor import get_user_summarisation
+from common.utils import handle_exceptions_async
+from rag.config import (
+	ROUTER_ENABLED,
+	ROUTER_MAX_WORDS,
+	ROUTER_MIN_HEADER_MARGIN,
+	ROUTER_MIN_HEADER_SIMILARITY,
+)
+from rag.query_executor import embed_or_none
+from rag.schemas import Route
+from rag.vector_store import get_corpus_store
+
+# --- Router ---
+
+
+@handle_exceptions_async('rag.router: Route Input')
+async def route_input(user_id: str, user_input: str) -> Route:
+	"""
+	Route the user input through the pipeline:
+
+	- The refiner is skipped when the user has
+	no conversation summary to blend in.
+	- The planner is skipped for short inputs
+	that clearly match a single corpus header.
+
+	Args:
+		user_id (str): The ID of the user.
+		user_input (str): The input provided by the user.
+
+	Returns:
+		Route: The stages to skip and the fetched
+		conversation summary.
+	"""
+	summary = await get_user_summarisation(user_id)
+
+	if not ROUTER_ENABLED:
+		return Route(
+			skip_refiner=False,
+			skip_planner=False,
+			summary=summary,
+			reason='Router disabled',
+		)
+
+	skip_refiner = not summary.strip()
+	reasons = ['No conversation summary'] if skip_refiner else []
+
+	skip_planner = False
+	store = get_corpus_store()
+	short_input = len(user_input.split()) <= ROUTER_MAX_WORDS
+
+	if short_input and store is not None and store.has_header_embeddings:
+		input_embedding = await embed_or_none(
+			user_input, 'routing through full pipeline'
+		)
+		if input_embedding is None:
+			return Route(
+				skip_refiner=False,
+				skip_planner=False,
+				summary=summary,
+				reason='Embedding unavailable',
+			)
+
+		similarities = store.header_similarities(input_embedding)
+		top, second = similarities[0], similarities[1]
+
+		if (
+			top >= ROUTER_MIN_HEADER_SIMILARITY
+			and top - second >= ROUTER_MIN_HEADER_MARGIN
+		):
+			skip_planner = True
+			reasons.append(f'Single topic input ({top:.2f} vs {second:.2f})')
+
+	return Route(
+		skip_refiner=skip_refiner,
+		skip_planner=skip_planner,
+		summary=summary,
+		reason=', '.join(reasons) or 'Full pipeline',
+	)
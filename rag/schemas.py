@@ -3,8 +3,12 @@ This module contains schemas for
 RAG operations.
 """
 
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
+from corpus.schemas import CorpusItem
+
 
 class QueryPlan(BaseModel):
 	"""
@@ -18,3 +22,137 @@ class QueryPlan(BaseModel):
 		'as part of the plan, max 3',
 		max_length=3,
 	)
+
+
+class RefinedQueryPlan(BaseModel):
+	"""
+	Represents a query plan produced together
+	with the refined user input it was
+	planned from. The refined input is declared
+	first so it is generated before the queries.
+	"""
+
+	refined_input: str = Field(
+		...,
+		description='The refined version of the user input',
+	)
+	queries: list[str] = Field(
+		...,
+		description='A list of queries to be executed '
+		'as part of the plan, max 3',
+		max_length=3,
+	)
+
+
+class RetrievedItem(BaseModel):
+	"""
+	Represents a corpus item retrieved for
+	a query plan, merged across sub-queries.
+	"""
+
+	item: CorpusItem = Field(..., description='The retrieved corpus item.')
+	score: float = Field(
+		...,
+		description='The best score for the item across sub-queries.',
+	)
+	relevance: float = Field(
+		...,
+		description='The relevance of the item fused across '
+		'sub-queries, used to order results.',
+	)
+
+
+class RetrievalParams(BaseModel):
+	"""
+	Represents the retrieval parameters read by
+	the executor, tuned against the golden set.
+	"""
+
+	limit: int = Field(..., description='Hits per sub-query.', ge=1)
+	threshold: float = Field(
+		...,
+		description='The minimum vector score to keep a hit.',
+	)
+	num_candidates_multiplier: int = Field(
+		...,
+		description='$vectorSearch candidates per hit.',
+		ge=1,
+	)
+	score_gap: float = Field(
+		...,
+		description='Cut vector hits after the first drop in '
+		'score larger than this, 0 disables the cutoff.',
+		ge=0.0,
+	)
+	mmr_lambda: float = Field(
+		...,
+		description='The relevance weight for maximal marginal '
+		'relevance re-ranking, 1 disables diversification.',
+		ge=0.0,
+		le=1.0,
+	)
+
+
+class PackedContext(BaseModel):
+	"""
+	Represents retrieved items packed into
+	a token budget for the context refiner.
+	"""
+
+	text: str = Field(..., description='The packed retrieved entries.')
+	packed_items: int = Field(..., description='Number of items packed.')
+	trimmed_items: int = Field(
+		...,
+		description='Number of packed items trimmed to fit.',
+	)
+	dropped_items: int = Field(..., description='Number of items dropped.')
+	packed_tokens: int = Field(..., description='Number of tokens packed.')
+	dropped_tokens: int = Field(
+		...,
+		description='Number of tokens dropped, including trimmed tokens.',
+	)
+
+
+class PreparedInput(BaseModel):
+	"""
+	Represents the user input prepared for
+	retrieval, refined, looked up in the
+	semantic cache and planned.
+	"""
+
+	refined_input: str = Field(..., description='The refined user input.')
+	query_plan: Optional[QueryPlan] = Field(
+		None,
+		description='The query plan, None when it is streamed '
+		'during retrieval or retrieval is cached.',
+	)
+	input_embedding: list[float] = Field(
+		default_factory=list,
+		description='The refined input embedding used as the '
+		'semantic cache key, empty when the cache is unused.',
+	)
+	cached_results: Optional[list[RetrievedItem]] = Field(
+		None,
+		description='Retrieved items served from the semantic cache.',
+	)
+
+
+class Route(BaseModel):
+	"""
+	Represents the stages of the RAG
+	pipeline to skip for a request.
+	"""
+
+	skip_refiner: bool = Field(
+		...,
+		description='Whether the input refiner is skipped.',
+	)
+	skip_planner: bool = Field(
+		...,
+		description='Whether the query planner is skipped.',
+	)
+	summary: str = Field(
+		...,
+		description='The conversation summary for the user.',
+	)
+	reason: str = Field(..., description='The reason for the route.')
@@ -0,0 +1,154 @@
+"""
+This module contains the semantic cache
+placed in front of retrieval. The retrieved
+items for a refined input are reused for any
+later input whose embedding is close enough,
+for the same corpus version. Only corpus
+content is cached, the context is always
+refined against the current user's input.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+from rag.config import (
+	SEMANTIC_CACHE_MAX_DISTANCE,
+	SEMANTIC_CACHE_SIZE,
+	SEMANTIC_CACHE_TTL_SECONDS,
+)
+from rag.schemas import RetrievedItem
+
+
+class SemanticCache:
+	"""
+	Size bounded, TTL based cache of retrieved
+	items keyed by input embedding. Lookups
+	return the closest entry within the maximum
+	cosine distance.
+	"""
+
+	def __init__(
+		self,
+		max_size: int = SEMANTIC_CACHE_SIZE,
+		ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+		max_distance: float = SEMANTIC_CACHE_MAX_DISTANCE,
+	):
+		self.max_size = max_size
+		self.ttl_seconds = ttl_seconds
+		self.max_distance = max_distance
+		# id -> (inserted at, corpus version, unit embedding, results)
+		self._entries: OrderedDict[
+			int, tuple[float, str, np.ndarray, list[RetrievedItem]]
+		] = OrderedDict()
+		self._next_id = 0
+		# Stats
+		self.hits = 0
+		self.misses = 0
+
+	def _evict_expired(self):
+		now = time.monotonic()
+		expired = [
+			entry_id
+			for entry_id, (inserted_at, *_) in self._entries.items()
+			if now - inserted_at > self.ttl_seconds
+		]
+		for entry_id in expired:
+			del self._entries[entry_id]
+
+	def lookup(
+		self,
+		embedding: list[float],
+		corpus_version: str,
+	) -> Optional[list[RetrievedItem]]:
+		"""
+		Return the cached retrieved items closest
+		to `embedding`, or None if nothing is within
+		the maximum cosine distance.
+		"""
+		self._evict_expired()
+
+		candidates = [
+			(entry_id, vector)
+			for entry_id, (_, version, vector, _) in self._entries.items()
+			if version == corpus_version
+		]
+
+		if not candidates:
+			self.misses += 1
+			return None
+
+		query = np.asarray(embedding, dtype=np.float32)
+		query /= np.linalg.norm(query) or 1.0
+		matrix = np.stack([vector for _, vector in candidates])
+		distances = 1.0 - matrix @ query
+		best = int(np.argmin(distances))
+
+		if distances[best] > self.max_distance:
+			self.misses += 1
+			return None
+
+		entry_id = candidates[best][0]
+		self._entries.move_to_end(entry_id)
+		self.hits += 1
+		return list(self._entries[entry_id][3])
+
+	def store(
+		self,
+		embedding: list[float],
+		corpus_version: str,
+		results: list[RetrievedItem],
+	):
+		"""
+		Cache retrieved items, evicting the least
+		recently used entry when full.
+		"""
+		vector = np.asarray(embedding, dtype=np.float32)
+		vector /= np.linalg.norm(vector) or 1.0
+
+		self._entries[self._next_id] = (
+			time.monotonic(),
+			corpus_version,
+			vector,
+			list(results),
+		)
+		self._next_id += 1
+
+		while len(self._entries) > self.max_size:
+			self._entries.popitem(last=False)
+
+	def invalidate(self, corpus_version: Optional[str] = None):
+		"""
+		Drop entries built from any corpus version
+		other than `corpus_version`, or every entry
+		if no version is given.
+		"""
+		if corpus_version is None:
+			self._entries.clear()
+			return
+
+		stale = [
+			entry_id
+			for entry_id, (_, version, *_) in self._entries.items()
+			if version != corpus_version
+		]
+		for entry_id in stale:
+			del self._entries[entry_id]
+
+	def stats(self) -> dict[str, Any]:
+		"""
+		Report cache size and hit rate.
+		"""
+		lookups = self.hits + self.misses
+		return {
+			'size': len(self._entries),
+			'max_size': self.max_size,
+			'hits': self.hits,
+			'misses': self.misses,
+			'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+		}
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,144 @@
+"""
+This module contains the registry for the
+active Atlas vector search index. Index
+rebuilds create a new versioned index next
+to the live one, and the name read by the
+retriever is switched in a single document
+update once the new index is queryable.
+"""
+
+from typing import Any, Optional
+
+from pymongo import ReturnDocument
+
+from common.utils import (
+	TerminalColors,
+	get_timestamp,
+	handle_exceptions_async,
+)
+from database.mongodb.main import get_collection
+from rag.config import VECTOR_INDEX_NAME
+
+# --- Constants ---
+
+_settings_key = 'vector_index'
+
+# --- State ---
+
+_active_index_name: str = VECTOR_INDEX_NAME
+
+
+def get_vector_index_name() -> str:
+	"""
+	Returns the active vector search index
+	name, as of the last load.
+	"""
+	return _active_index_name
+
+
+@handle_exceptions_async('rag.vector_index: Load Vector Index Name')
+async def load_vector_index_name() -> str:
+	"""
+	Load the active vector search index name
+	from MongoDB, falling back to the default
+	index when none has been activated.
+	"""
+	global _active_index_name
+
+	settings = await get_index_settings()
+	_active_index_name = (settings or {}).get('active') or VECTOR_INDEX_NAME
+
+	return _active_index_name
+
+
+async def get_index_settings() -> Optional[dict[str, Any]]:
+	"""
+	Returns the vector index settings document,
+	or None if no index has been activated.
+	"""
+	collection = get_collection('settings')
+	return await collection.find_one({'key': _settings_key}, {'_id': 0})
+
+
+@handle_exceptions_async('rag.vector_index: Activate Vector Index')
+async def activate_vector_index(index_name: str) -> dict[str, Any]:
+	"""
+	Switch the active index, keeping the current
+	one as the rollback target. The switch is one
+	atomic document update.
+
+	Args:
+		index_name (str): The index to activate.
+
+	Returns:
+		dict[str, Any]: The updated settings.
+	"""
+	global _active_index_name
+
+	collection = get_collection('settings')
+	settings = await collection.find_one_and_update(
+		{'key': _settings_key},
+		[
+			{
+				'$set': {
+					'previous': {'$ifNull': ['$active', VECTOR_INDEX_NAME]},
+					'active': index_name,
+					'updated_at': get_timestamp(),
+				}
+			}
+		],
+		projection={'_id': 0},
+		upsert=True,
+		return_document=ReturnDocument.AFTER,
+	)
+	_active_index_name = settings['active']
+
+	print(
+		f'{TerminalColors.green}'
+		f'Activated vector index'
+		f'{TerminalColors.reset}'
+		f' {settings["previous"]} -> {settings["active"]}'
+	)
+
+	return settings
+
+
+@handle_exceptions_async('rag.vector_index: Rollback Vector Index')
+async def rollback_vector_index() -> dict[str, Any]:
+	"""
+	Swap the active index with the previous one,
+	fails if no index has been activated yet.
+
+	Returns:
+		dict[str, Any]: The updated settings.
+	"""
+	global _active_index_name
+
+	collection = get_collection('settings')
+	settings = await collection.find_one_and_update(
+		{'key': _settings_key, 'previous': {'$type': 'string'}},
+		[
+			{
+				'$set': {
+					'active': '$previous',
+					'previous': '$active',
+					'updated_at': get_timestamp(),
+				}
+			}
+		],
+		projection={'_id': 0},
+		return_document=ReturnDocument.AFTER,
+	)
+	if settings is None:
+		raise ValueError('No previous vector index to roll back to.')
+
+	_active_index_name = settings['active']
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'Rolled back vector index'
+		f'{TerminalColors.reset}'
+		f' {settings["previous"]} -> {settings["active"]}'
+	)
+
+	return settings
@@ -0,0 +1,431 @@
+"""
+This module contains the in-process vector
+store for the corpus. The corpus is small
+enough to be held in memory, so every
+embedding is packed into one contiguous
+float32 matrix and searched locally.
+"""
+
+import hashlib
+from typing import Optional
+
+import numpy as np
+
+from common.utils import (
+	TerminalColors,
+	handle_exceptions_async,
+)
+from corpus.schemas import CorpusItem
+from database.mongodb.main import (
+	decode_bit_vector,
+	decode_vector,
+	get_collection,
+)
+from openai_client.main import EMBEDDING_DIMENSIONS, get_embeddings
+from rag.config import QUANTIZED_SEARCH, QUANTIZED_SHORTLIST_MULTIPLIER
+from rag.lexical_index import BM25Index
+
+# --- Utils ---
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+	"""
+	L2 normalise a vector or the rows of
+	a matrix, zero vectors are left as is.
+	"""
+	norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+	norms[norms == 0] = 1.0
+	return vectors / norms
+
+
+def _corpus_version(docs: list[dict]) -> str:
+	"""
+	Hash the content of the corpus so changes
+	to any item produce a new version.
+	"""
+	digest = hashlib.sha256()
+	for doc in sorted(docs, key=lambda d: d['id']):
+		for field in ('id', 'header', 'context', 'document'):
+			digest.update(str(doc.get(field, '')).encode())
+			digest.update(b'\0')
+	return digest.hexdigest()[:16]
+
+
+def quantize(vectors: np.ndarray) -> np.ndarray:
+	"""
+	Pack the signs of a vector or the rows of
+	a matrix into 1-bit codes.
+	"""
+	return np.packbits(vectors > 0, axis=-1)
+
+
+def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+	"""
+	Return the positions of the `limit`
+	highest scores, best first.
+	"""
+	if limit < len(scores):
+		top = np.argpartition(-scores, limit - 1)[:limit]
+		return top[np.argsort(-scores[top])]
+	return np.argsort(-scores)
+
+
+def exact_search(
+	matrix: np.ndarray,
+	query: np.ndarray,
+	limit: int,
+) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Scan every row of a normalised matrix.
+
+	Returns:
+		tuple[np.ndarray, np.ndarray]: The top row
+		positions and their cosine similarities.
+	"""
+	similarities = matrix @ query
+	top = _top_k(similarities, limit)
+	return top, similarities[top]
+
+
+def quantized_search(
+	matrix: np.ndarray,
+	codes: np.ndarray,
+	query: np.ndarray,
+	limit: int,
+	shortlist: int,
+) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Shortlist rows by Hamming distance between
+	sign codes, then rescore the shortlist with
+	exact cosine on the full vectors.
+
+	Returns:
+		tuple[np.ndarray, np.ndarray]: The top row
+		positions and their cosine similarities.
+	"""
+	if shortlist >= len(codes):
+		return exact_search(matrix, query, limit)
+
+	distances = np.bitwise_count(codes ^ quantize(query)).sum(
+		axis=1, dtype=np.int32
+	)
+	candidates = np.argpartition(distances, shortlist - 1)[:shortlist]
+
+	similarities = matrix[candidates] @ query
+	top = _top_k(similarities, limit)
+	return candidates[top], similarities[top]
+
+
+def mmr_rerank(
+	vectors: np.ndarray,
+	relevance: np.ndarray,
+	limit: int,
+	mmr_lambda: float,
+) -> list[int]:
+	"""
+	Select candidates by maximal marginal relevance,
+	each pick maximises `mmr_lambda` times its
+	relevance minus `1 - mmr_lambda` times its
+	highest cosine similarity to the earlier picks.
+
+	Args:
+		vectors (np.ndarray): The candidate embeddings.
+		relevance (np.ndarray): The candidate relevance,
+		scaled to at most 1.
+		limit (int): The number of candidates to select.
+		mmr_lambda (float): The relevance weight, 1 keeps
+		the relevance order.
+
+	Returns:
+		list[int]: The selected candidate positions,
+		in selection order.
+	"""
+	similarities = _normalise(vectors) @ _normalise(vectors).T
+	redundancy = np.zeros(len(relevance), dtype=np.float32)
+	remaining = list(range(len(relevance)))
+	selected: list[int] = []
+
+	while remaining and len(selected) < limit:
+		scores = (
+			mmr_lambda * relevance[remaining]
+			- (1.0 - mmr_lambda) * redundancy[remaining]
+		)
+		best = remaining.pop(int(np.argmax(scores)))
+		selected.append(best)
+		redundancy = np.maximum(redundancy, similarities[best])
+
+	return selected
+
+
+# --- Vector Store ---
+
+
+class CorpusStore:
+	"""
+	Holds the corpus items alongside a
+	row-normalised embedding matrix used
+	for local top-k cosine search, and a
+	BM25 index for lexical search. Chunked
+	sections are held apart as parents, so a
+	matched chunk can be resolved to its section.
+
+	Scores follow the Atlas convention for
+	cosine similarity, (1 + cosine) / 2, so
+	thresholds are interchangeable between
+	the local and $vectorSearch backends.
+	"""
+
+	def __init__(
+		self,
+		items: list[CorpusItem],
+		embeddings: np.ndarray,
+		version: str = '',
+		codes: Optional[np.ndarray] = None,
+		parents: Optional[dict[str, CorpusItem]] = None,
+	):
+		if len(items) != embeddings.shape[0]:
+			raise ValueError(
+				'Corpus items and embeddings must have the same length.'
+			)
+
+		self.items = items
+		self.positions = {item.id: i for i, item in enumerate(items)}
+		self.parents = parents or {}
+		self.version = version
+		self.matrix = np.ascontiguousarray(
+			_normalise(embeddings.astype(np.float32, copy=False))
+		)
+		self.codes = quantize(self.matrix) if codes is None else codes
+		self.lexical = BM25Index(items)
+		self.header_matrix: Optional[np.ndarray] = None
+
+	@classmethod
+	def from_documents(cls, docs: list[dict]) -> 'CorpusStore':
+		"""
+		Build a store from raw corpus documents,
+		documents without an embedding are kept as
+		parents of the chunks split from them.
+		Embeddings may be binary vectors or arrays,
+		sign codes are used when every document
+		has them and are computed otherwise.
+		"""
+		items: list[CorpusItem] = []
+		parents: dict[str, CorpusItem] = {}
+		vectors: list[np.ndarray] = []
+		codes: list[np.ndarray] = []
+
+		for doc in docs:
+			item = CorpusItem(
+				**{
+					key: value
+					for key, value in doc.items()
+					if key not in ('embedding', 'embedding_bits')
+				}
+			)
+			embedding = doc.get('embedding')
+			if embedding is None or len(embedding) == 0:
+				parents[item.id] = item
+				continue
+			vectors.append(decode_vector(embedding))
+			if doc.get('embedding_bits') is not None:
+				codes.append(decode_bit_vector(doc['embedding_bits']))
+			items.append(item)
+
+		if not vectors:
+			raise ValueError('No embedded corpus documents found.')
+
+		return cls(
+			items=items,
+			embeddings=np.stack(vectors),
+			version=_corpus_version(docs),
+			codes=np.stack(codes) if len(codes) == len(vectors) else None,
+			parents=parents,
+		)
+
+	def __len__(self) -> int:
+		return len(self.items)
+
+	def search(
+		self,
+		query_vector: list[float],
+		limit: int,
+		threshold: float,
+		quantized: bool = QUANTIZED_SEARCH,
+	) -> list[tuple[CorpusItem, float]]:
+		"""
+		Return the top `limit` items scoring
+		above `threshold`, best first.
+
+		Args:
+			query_vector (list[float]): The query embedding.
+			limit (int): The maximum number of items.
+			threshold (float): The minimum score to keep.
+			quantized (bool): Whether to shortlist with
+			sign codes before exact rescoring.
+
+		Returns:
+			list[tuple[CorpusItem, float]]: The matched
+			items and their scores.
+		"""
+		query = _normalise(np.asarray(query_vector, dtype=np.float32))
+
+		if quantized:
+			top, similarities = quantized_search(
+				matrix=self.matrix,
+				codes=self.codes,
+				query=query,
+				limit=limit,
+				shortlist=limit * QUANTIZED_SHORTLIST_MULTIPLIER,
+			)
+		else:
+			top, similarities = exact_search(self.matrix, query, limit)
+
+		scores = (1.0 + similarities) / 2.0
+
+		return [
+			(self.items[i], float(score))
+			for i, score in zip(top, scores, strict=True)
+			if score > threshold
+		]
+
+	def vectors(self, ids: list[str]) -> Optional[np.ndarray]:
+		"""
+		Return the normalised embeddings of items
+		by id, or None if any item is not stored.
+		"""
+		if any(id not in self.positions for id in ids):
+			return None
+		return self.matrix[[self.positions[id] for id in ids]]
+
+	@property
+	def has_header_embeddings(self) -> bool:
+		return self.header_matrix is not None and len(self.header_matrix) > 1
+
+	def set_header_embeddings(self, embeddings: list[list[float]]):
+		"""
+		Set embeddings for the unique corpus
+		headers, used to route inputs.
+		"""
+		self.header_matrix = np.ascontiguousarray(
+			_normalise(np.asarray(embeddings, dtype=np.float32))
+		)
+
+	def header_similarities(self, query_vector: list[float]) -> list[float]:
+		"""
+		Return the cosine similarity between the
+		query and every corpus header, best first.
+		"""
+		if self.header_matrix is None:
+			return []
+
+		query = _normalise(np.asarray(query_vector, dtype=np.float32))
+		similarities = self.header_matrix @ query
+		return sorted(similarities.tolist(), reverse=True)
+
+	def headers(self) -> list[str]:
+		"""
+		Return the unique corpus headers in
+		corpus order.
+		"""
+		return list(dict.fromkeys(item.header for item in self.items))
+
+	def lexical_search(
+		self,
+		query: str,
+		limit: int,
+		min_coverage: float = 0.0,
+	) -> list[tuple[CorpusItem, float]]:
+		"""
+		Return the top `limit` items by BM25
+		score, best first, that match at least
+		`min_coverage` of the query's IDF weight.
+		"""
+		return [
+			(self.items[i], score)
+			for i, score in self.lexical.search(
+				query=query,
+				limit=limit,
+				min_coverage=min_coverage,
+			)
+		]
+
+
+# --- Lifecycle ---
+
+_corpus_store: Optional[CorpusStore] = None
+
+
+@handle_exceptions_async('rag.vector_store: Load Corpus Store')
+async def load_corpus_store() -> CorpusStore:
+	"""
+	Load every corpus embedding from MongoDB
+	into the in-process store, replacing any
+	previously loaded store.
+	"""
+	global _corpus_store
+
+	collection = get_collection('corpus')
+	cursor = collection.find({}, {'_id': 0})
+	docs = await cursor.to_list(length=None)
+
+	store = CorpusStore.from_documents(docs)
+
+	# Query embeddings must match the corpus width
+	if store.matrix.shape[1] != EMBEDDING_DIMENSIONS:
+		raise ValueError(
+			f'Corpus embeddings have {store.matrix.shape[1]} dimensions, '
+			f'expected EMBEDDING_DIMENSIONS={EMBEDDING_DIMENSIONS}. '
+			f'Re-run corpus ingestion at the configured width.'
+		)
+
+	# Header embeddings are only used for routing,
+	# the store is still usable without them
+	try:
+		store.set_header_embeddings(await get_embeddings(store.headers()))
+	except Exception as e:
+		print(
+			f'{TerminalColors.yellow}'
+			f'Corpus header embeddings unavailable: '
+			f'{TerminalColors.reset}'
+			f'{e}'
+		)
+
+	_corpus_store = store
+
+	print(
+		f'{TerminalColors.green}'
+		f'Loaded corpus store'
+		f'{TerminalColors.reset}'
+		f' items: {len(_corpus_store)}'
+		f' dimensions: {_corpus_store.matrix.shape[1]}'
+		f' version: {_corpus_store.version}'
+	)
+
+	return _corpus_store
+
+
+def set_corpus_store(store: Optional[CorpusStore]):
+	"""
+	Replace the loaded corpus store, used to
+	serve retrieval from a store built offline.
+	"""
+	global _corpus_store
+	_corpus_store = store
+
+
+def get_corpus_store() -> Optional[CorpusStore]:
+	"""
+	Returns the loaded corpus store, or
+	None if it has not been loaded.
+	"""
+	return _corpus_store
+
+
+def get_corpus_version() -> Optional[str]:
+	"""
+	Returns the version of the loaded corpus,
+	or None if the store has not been loaded.
+	"""
+	if _corpus_store is None:
+		return None
+	return _corpus_store.version
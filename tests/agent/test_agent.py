@@ -5,10 +5,17 @@ mainly functional tests and not
 logical tests.
 """
 
+import asyncio
+
 import pytest
 
 from agent.main import chat
-from agent.memory.main import delete_memory, retrieve_memory
+from agent.memory.cache import (
+	close_conversation_cache,
+	get_conversation_cache,
+	open_conversation_cache,
+)
+from agent.memory.main import delete_memory, push_memory, retrieve_memory
 from agent.memory.schemas import AgentMemory
 from common.utils import TerminalColors
 from database.mongodb.config import (
@@ -20,6 +27,7 @@ from database.mongodb.config import (
 
 TEST_DATA = {
 	'user_id': 'test_user',
+	'cache_user_id': 'test_cache_user',
 }
 
 # --- Config ---
@@ -77,6 +85,49 @@ async def test_memory_retrieval():
 	)
 
 
+async def test_conversation_cache():
+	"""
+	Test the conversation cache of a session.
+	Writes should reach the cache and the database,
+	and reads should match the database until the
+	session closes.
+	"""
+	user_id = TEST_DATA['cache_user_id']
+	await delete_memory(user_id=user_id)
+
+	cache = await open_conversation_cache(user_id)
+	try:
+		await push_memory(user_id=user_id, source='user', content='Hello')
+		await push_memory(user_id=user_id, source='agent', content='Hi')
+
+		cached: list[AgentMemory] = await retrieve_memory(
+			user_id=user_id, to_str=False
+		)
+		assert [m.content for m in cached] == ['Hello', 'Hi'], (
+			'Cached memory should hold writes in order'
+		)
+
+		# Deletion should invalidate the cache
+		await delete_memory(user_id=user_id)
+		assert not cache.loaded, 'Deletion should invalidate the cache'
+
+		# A load overlapping an invalidation is discarded
+		load = asyncio.create_task(cache.load())
+		await asyncio.sleep(0)
+		cache.invalidate()
+		await load
+		assert not cache.loaded, 'Stale loads should not be cached'
+		assert await retrieve_memory(user_id=user_id, to_str=False) == [], (
+			'Memory should be empty after deletion'
+		)
+	finally:
+		close_conversation_cache(user_id)
+
+	assert get_conversation_cache(user_id) is None, (
+		'Cache should be dropped when the session closes'
+	)
+
+
 async def test_memory_deletion():
 	"""
 	Test the memory deletion functionality of the agent.
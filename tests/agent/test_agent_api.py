@@ -119,6 +119,48 @@ async def test_agent_chat():
 	assert response.data is not None, 'Expected response data to be present'
 
 
+async def test_agent_chat_stream():
+	"""
+	Test streamed answers end with a done event
+	carrying the id the message is stored with.
+	"""
+	body = {
+		'type': 'agent_message',
+		'data': 'Hello again, what do you do?',
+	}
+
+	url = f'ws://127.0.0.1:9001/api/agent/ws/chat?ft={create_frontend_token()}'
+	headers = {'Cookie': f'JWT={JWT};UUID={UUID}'}
+
+	deltas: list[str] = []
+	async with websockets.connect(url, additional_headers=headers) as websocket:
+		await websocket.send(json.dumps(body))
+		while True:
+			response = SocketResponse(**json.loads(await websocket.recv()))
+			assert response.type != 'agent_memory', (
+				'Streamed answers should not be sent again in full'
+			)
+			if response.type != 'agent_stream':
+				continue
+			if response.data.get('done'):
+				message_id = response.data['id']
+				break
+			deltas.append(response.data['delta'])
+
+	memory: APIResponse = await server_fetch(
+		endpoint='/api/agent/memory',
+		method='GET',
+		user_id=UUID,
+		jwt=JWT,
+		parsed=True,
+	)
+	stored = next(m for m in memory.data if m['id'] == message_id)
+
+	assert stored['content'] == ''.join(deltas).strip(), (
+		'Expected the stored message to match the streamed deltas'
+	)
+
+
 async def test_agent_memory_retrieval():
 	"""
 	Test the agent memory retrieval API endpoint.
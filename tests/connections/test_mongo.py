@@ -3,10 +3,20 @@ This module tests the connection to
 the MongoDB database.
 """
 
+import bson
+import numpy as np
+
 from database.mongodb.config import (
 	close_mongo,
 	connect_mongo,
 )
+from database.mongodb.main import decode_vector, encode_vector
+from rag.vector_index import (
+	activate_vector_index,
+	get_vector_index_name,
+	load_vector_index_name,
+	rollback_vector_index,
+)
 
 # --- Tests ---
 
@@ -19,3 +29,40 @@ async def test_connect_mongo():
 	assert await connect_mongo(), 'Failed to connect to MongoDB.'
 
 	assert await close_mongo(), 'Failed to close MongoDB connection.'
+
+
+async def test_binary_vector_round_trip():
+	"""
+	Test embeddings packed as binary vectors
+	decode to the same float32 values and are
+	smaller than arrays of doubles.
+	"""
+	vector = np.random.rand(3072).astype(np.float32)
+
+	doc = bson.decode(bson.encode({'embedding': encode_vector(vector)}))
+
+	assert np.array_equal(decode_vector(doc['embedding']), vector)
+	assert len(bson.encode(doc)) * 2 < len(
+		bson.encode({'embedding': vector.tolist()})
+	), 'Expected binary vectors to be under half the size'
+
+
+async def test_vector_index_activation_rollback():
+	"""
+	Test activating a vector index switches the
+	active name and rolling back restores it.
+	"""
+	assert await connect_mongo(), 'Failed to connect to MongoDB.'
+
+	original = await load_vector_index_name()
+
+	settings = await activate_vector_index('test_vector_index')
+	assert settings['active'] == 'test_vector_index'
+	assert settings['previous'] == original
+	assert get_vector_index_name() == 'test_vector_index'
+
+	settings = await rollback_vector_index()
+	assert settings['active'] == original
+	assert await load_vector_index_name() == original
+
+	assert await close_mongo(), 'Failed to close MongoDB connection.'
@@ -6,11 +6,20 @@ OpenAI API.
 from openai.types.responses import ToolParam
 from pydantic import BaseModel, Field
 
+from openai_client.embedding_cache import (
+	EmbeddingCache,
+	embedding_cache,
+	make_key,
+)
 from openai_client.main import (
+	_embedding_cache_model,
 	agent_response,
+	agent_response_stream,
 	agent_search,
 	get_embedding,
+	get_embeddings,
 	normal_response,
+	normal_response_stream,
 	structured_response,
 )
 
@@ -26,6 +35,97 @@ async def test_get_embedding():
 	assert len(embedding) > 0
 
 
+async def test_get_embeddings():
+	"""
+	Tests batched embeddings are returned in
+	input order and match single embeddings.
+	"""
+	inputs = ['Hello, world!', 'What are your skills?', 'Hello, world!']
+	embeddings = await get_embeddings(inputs)
+
+	assert len(embeddings) == len(inputs)
+	assert embeddings[0] == embeddings[2]
+	assert embeddings[1] == await get_embedding(inputs[1])
+
+
+async def test_get_embedding_dimensions():
+	"""
+	Tests shortened embeddings have the requested
+	width and are cached apart from full width.
+	"""
+	text = 'What are your skills?'
+	short_model = _embedding_cache_model(256)
+	full_model = _embedding_cache_model(3072)
+
+	short = await get_embedding(text, dimensions=256)
+	full = await get_embedding(text, dimensions=3072)
+
+	assert len(short) == 256
+	assert len(full) == 3072
+
+	assert make_key(text, short_model) != make_key(text, full_model)
+	assert await embedding_cache.get(text, short_model) == short
+	assert await embedding_cache.get(text, full_model) == full
+
+
+async def test_get_embedding_cached():
+	"""
+	Tests repeat embedding calls are served
+	from the embedding cache.
+	"""
+	persist = embedding_cache.persist
+	embedding_cache.persist = False
+	embedding_cache.clear()
+
+	try:
+		first = await get_embedding('What projects have you worked on?')
+		second = await get_embedding('  What projects  have you worked on?')
+
+		assert first == second
+		assert embedding_cache.stats()['hits'] == 1
+		assert embedding_cache.stats()['misses'] == 1
+	finally:
+		embedding_cache.persist = persist
+
+
+async def test_embedding_cache_eviction():
+	"""
+	Tests the embedding cache evicts the least
+	recently used entry once full.
+	"""
+	cache = EmbeddingCache(max_size=2, persist=False)
+
+	await cache.set('a', 'model', [0.1])
+	await cache.set('b', 'model', [0.2])
+	assert await cache.get('a', 'model') == [0.1]
+
+	await cache.set('c', 'model', [0.3])
+
+	assert await cache.get('b', 'model') is None
+	assert await cache.get('a', 'model') == [0.1]
+	assert await cache.get('c', 'model') == [0.3]
+
+
+async def test_embedding_cache_get_many():
+	"""
+	Tests batch lookups return embeddings in
+	input order, with None for misses.
+	"""
+	cache = EmbeddingCache(persist=False)
+
+	await cache.set('a', 'model', [0.1])
+	await cache.set('b', 'model', [0.2])
+
+	assert await cache.get_many(['b', 'c', 'a', 'b'], 'model') == [
+		[0.2],
+		None,
+		[0.1],
+		[0.2],
+	]
+	assert cache.stats()['hits'] == 3
+	assert cache.stats()['misses'] == 1
+
+
 async def test_normal_response():
 	"""
 	Tests the OpenAI normal response functionality.
@@ -38,6 +138,23 @@ async def test_normal_response():
 	assert 'Paris' in response
 
 
+async def test_normal_response_stream():
+	"""
+	Tests the OpenAI streamed normal response
+	functionality.
+	"""
+	deltas = [
+		delta
+		async for delta in normal_response_stream(
+			system_prompt='You are a helpful assistant.',
+			user_input='What is the capital of France?',
+		)
+	]
+
+	assert len(deltas) > 1, 'Expected the response to arrive in deltas'
+	assert 'Paris' in ''.join(deltas)
+
+
 async def test_structured_response():
 	"""
 	Tests the OpenAI structured response functionality.
@@ -106,6 +223,27 @@ async def test_agent_response():
 	)
 
 
+async def test_agent_response_stream():
+	"""
+	Tests the OpenAI streamed agent response
+	functionality.
+	"""
+	events = [
+		event
+		async for event in agent_response_stream(
+			system_prompt='You are a helpful assistant.',
+			user_input='How are you',
+			tools=[],
+		)
+	]
+	deltas = [event for event in events if isinstance(event, str)]
+	response = events[-1]
+
+	assert deltas, 'Expected text deltas before the output item'
+	assert response.type == 'message', "Response type should be 'message'."
+	assert response.content[0].text == ''.join(deltas)  # type: ignore
+
+
 async def test_agent_search():
 	"""
 	Tests the OpenAI agent search functionality.
@@ -0,0 +1,3 @@
+"""
+This package contains tests for the corpus tools.
+"""
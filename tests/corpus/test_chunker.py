@@ -0,0 +1,79 @@
+"""
+This module contains tests for the
+corpus section chunker.
+"""
+
+from corpus.chunker import (
+	_get_encoding,
+	chunk_corpus,
+	chunk_item,
+	embedding_text,
+	split_document,
+)
+from corpus.parser import parse_corpus
+from corpus.schemas import CorpusItem
+
+# --- Tests ---
+
+
+def test_split_document_bounded_and_overlapping():
+	"""
+	Test chunks fit the token bound, overlap
+	their neighbours and cover the document.
+	"""
+	document = ' '.join(f'word{i}' for i in range(400))
+
+	chunks = split_document(document, max_tokens=64, overlap_tokens=16)
+
+	assert len(chunks) > 1
+	for chunk in chunks:
+		assert (
+			sum(len(_get_encoding().encode(f' {w}')) for w in chunk.split())
+			<= 64
+		), 'Expected chunk within token bound'
+
+	for previous, chunk in zip(chunks, chunks[1:], strict=False):
+		assert chunk.split()[0] in previous.split(), 'Expected overlap'
+
+	assert chunks[0].split()[0] == 'word0'
+	assert chunks[-1].split()[-1] == 'word399'
+
+
+def test_chunk_item():
+	"""
+	Test short sections are left whole and long
+	sections become chunks linked to the section.
+	"""
+	item = CorpusItem(
+		id='section',
+		header='Header',
+		context='Context',
+		document='A short document.',
+	)
+	assert chunk_item(item, max_tokens=64) == []
+	assert embedding_text(item) == 'Context'
+
+	long_item = item.model_copy(
+		update={'document': ' '.join(['sentence'] * 200)}
+	)
+	chunks = chunk_item(long_item, max_tokens=64, overlap_tokens=8)
+
+	assert [chunk.id for chunk in chunks[:2]] == ['section#0', 'section#1']
+	assert {chunk.parent_id for chunk in chunks} == {'section'}
+	assert embedding_text(chunks[0]).startswith('Context\n')
+
+
+def test_chunk_corpus():
+	"""
+	Test every section of the corpus is either
+	embedded whole or kept as a parent.
+	"""
+	items = parse_corpus()
+
+	embedded, parents = chunk_corpus(items)
+	parent_ids = {parent.id for parent in parents}
+	whole_ids = {item.id for item in embedded if item.parent_id is None}
+
+	assert parent_ids | whole_ids == {item.id for item in items}
+	assert not parent_ids & whole_ids
+	assert {item.parent_id for item in embedded} - {None} == parent_ids
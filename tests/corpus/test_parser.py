@@ -0,0 +1,136 @@
+"""
+This module contains tests for the
+streaming corpus section parser.
+"""
+
+import io
+import os
+import re
+
+import pytest
+
+from common.utils import TerminalColors, Timer
+from corpus.parser import (
+	CorpusParseError,
+	_corpus_dir,
+	discover_corpus_files,
+	iter_sections,
+	parse_corpus_file,
+)
+
+# --- Utils ---
+
+
+def _regex_parse(content: str) -> list[tuple[str, str, str, str]]:
+	"""
+	The whole-document regex pipeline the
+	streaming parser replaced, kept as a
+	baseline for output and timing.
+	"""
+	cleaned = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
+	cleaned = re.sub(r'\n\s*\n', '\n', cleaned)
+	cleaned = re.sub(r'\s*\n\s*', ' ', cleaned, flags=re.MULTILINE)
+	cleaned = re.sub(r'---', ' ', cleaned, flags=re.DOTALL)
+
+	return [
+		tuple(
+			re.findall(rf'<{tag}>(.*?)</{tag}>', section, re.DOTALL)[0].strip()
+			for tag in ('id', 'header', 'context', 'document')
+		)
+		for section in re.findall(
+			r'<section>(.*?)</section>', cleaned, re.DOTALL
+		)
+	]
+
+
+def _read_corpus() -> str:
+	"""
+	Concatenate the checked-in corpus files.
+	"""
+	contents = []
+	for file in discover_corpus_files():
+		with open(os.path.join(_corpus_dir, file), encoding='utf-8') as f:
+			contents.append(f.read())
+	return '\n'.join(contents)
+
+
+# --- Tests ---
+
+
+def test_parser_matches_regex_baseline():
+	"""
+	Test the streaming parser yields the same
+	sections as the regex pipeline.
+	"""
+	for file in discover_corpus_files():
+		with open(os.path.join(_corpus_dir, file), encoding='utf-8') as f:
+			expected = _regex_parse(f.read())
+
+		parsed = [
+			(item.id, item.header, item.context, item.document)
+			for item in parse_corpus_file(file)
+		]
+
+		assert parsed == expected, f'Parsed sections differ in {file}'
+
+
+def test_parser_reports_line_and_column():
+	"""
+	Test malformed markup raises with the
+	position of the offending tag.
+	"""
+	markup = (
+		'<!-- Header\n'
+		'comment -->\n'
+		'<section>\n'
+		'<id>a</id>\n'
+		'  <header>A</context>\n'
+		'</section>\n'
+	)
+
+	with pytest.raises(CorpusParseError) as error:
+		list(iter_sections(io.StringIO(markup), source='bad.md'))
+
+	assert (error.value.line, error.value.column) == (5, 12)
+	assert str(error.value).startswith('bad.md:5:12:')
+
+	with pytest.raises(CorpusParseError, match='missing document'):
+		list(
+			iter_sections(
+				io.StringIO(
+					'<section><id>a</id><header>A</header>'
+					'<context>c</context></section>'
+				)
+			)
+		)
+
+
+def test_parser_benchmark():
+	"""
+	Benchmark the streaming parser against the
+	regex pipeline on a multi-megabyte corpus.
+	"""
+	corpus = _read_corpus()
+	copies = -(-4 * 1024 * 1024 // len(corpus))
+	content = '\n'.join(
+		corpus.replace('<id>', f'<id>{copy}-') for copy in range(copies)
+	)
+
+	timer = Timer(start=True)
+	expected = _regex_parse(content)
+	regex_time = timer.elapsed()
+	parsed = list(iter_sections(io.StringIO(content)))
+	stream_time = timer.elapsed()
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'Parsed {len(parsed)} sections from '
+		f'{len(content) / 1024 / 1024:.1f} MB'
+		f'\nRegex: {regex_time * 1000:.0f} ms'
+		f' Streaming: {stream_time * 1000:.0f} ms'
+		f'{TerminalColors.reset}'
+	)
+
+	assert [
+		(item.id, item.header, item.context, item.document) for item in parsed
+	] == expected
@@ -0,0 +1,82 @@
+"""
+This module contains tests for the
+offline RAG benchmark.
+"""
+
+from common.utils import TerminalColors
+from rag.benchmark.main import run_benchmark
+from rag.benchmark.tune import tune_retrieval
+
+# --- Tests ---
+
+
+async def test_run_benchmark():
+	"""
+	Test the benchmark reports quality, token
+	and latency metrics with stub embeddings.
+	"""
+	report = await run_benchmark(runs=2)
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'Benchmark quality: {report["quality"]}'
+		f'\nBenchmark latency: {report["latency_ms"]}'
+		f'{TerminalColors.reset}'
+	)
+
+	assert report['quality']['recall_at_k'] > 0, 'Expected some recall'
+	assert report['tokens']['refine_context_total'] > 0, 'Expected tokens'
+	assert set(report['latency_ms']) == {
+		'vector_search',
+		'retrieval',
+		'packing',
+		'total',
+	}
+
+
+async def test_run_benchmark_dimensions():
+	"""
+	Test shortened embeddings shrink the index
+	in the benchmark report.
+	"""
+	short = await run_benchmark(runs=1, dimensions=256)
+	full = await run_benchmark(runs=1)
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'256 dimensions: {short["quality"]} {short["size_bytes"]}'
+		f'\nFull width: {full["quality"]} {full["size_bytes"]}'
+		f'{TerminalColors.reset}'
+	)
+
+	assert short['dimensions'] == 256
+	assert short['size_bytes']['index'] < full['size_bytes']['index']
+
+
+async def test_tune_retrieval():
+	"""
+	Test the tuner reports a Pareto frontier and
+	chooses a setting on it.
+	"""
+	report = await tune_retrieval(
+		grid={
+			'limit': [2, 3],
+			'threshold': [0.55, 0.65],
+			'num_candidates_multiplier': [25],
+			'score_gap': [0.0, 0.05],
+			'mmr_lambda': [0.7],
+		},
+		runs=1,
+	)
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'Chosen setting: {report["chosen"]}'
+		f'{TerminalColors.reset}'
+	)
+
+	assert report['settings'] == 8
+	assert report['chosen'] in report['frontier']
+	assert report['chosen']['recall'] == max(
+		result['recall'] for result in report['results']
+	)
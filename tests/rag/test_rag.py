@@ -3,14 +3,23 @@ This module contains tests for the
 RAG system.
 """
 
+import time
+
 import pytest
 
 from common.utils import TerminalColors
+from corpus.schemas import CorpusItem
 from database.mongodb.config import (
 	close_mongo,
 	connect_mongo,
 )
 from rag.main import fetch_context
+from rag.query_executor import retrieve_documents, speculative_retrieve
+from rag.query_planner import refine_and_plan
+from rag.router import route_input
+from rag.schemas import QueryPlan, RetrievedItem
+from rag.semantic_cache import SemanticCache, semantic_cache
+from rag.vector_store import load_corpus_store
 
 # --- Constants ---
 
@@ -51,3 +60,112 @@ async def test_fetch_context():
 		verbose=True,
 	)
 	assert context is not None, 'Expected non-null context'
+
+
+async def test_fetch_context_semantic_cache():
+	"""
+	Test a similar request from another user
+	reuses cached retrieval, the context is
+	still refined for that user's input.
+	"""
+	await load_corpus_store()
+	semantic_cache.invalidate()
+
+	await fetch_context(user_id=TEST_USER_ID, user_input=TEST_INPUT)
+
+	start = time.perf_counter()
+	context = await fetch_context(
+		user_id='test_user_without_history',
+		user_input=TEST_INPUT.capitalize(),
+	)
+	end = time.perf_counter()
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'Cached context in {end - start:.2f} s'
+		f'{TerminalColors.reset}'
+	)
+
+	assert context is not None, 'Expected non-null context'
+	assert semantic_cache.stats()['hits'] >= 1, 'Expected a cache hit'
+
+
+async def test_semantic_cache_invalidation():
+	"""
+	Test cached retrieval is only served for
+	the corpus version it was built from.
+	"""
+	results = [
+		RetrievedItem(
+			item=CorpusItem(id='a', header='', context='', document=''),
+			score=0.9,
+			relevance=0.9,
+		)
+	]
+	cache = SemanticCache(max_size=2, max_distance=0.1)
+	cache.store(embedding=[1.0, 0.0], corpus_version='v1', results=results)
+
+	assert cache.lookup(embedding=[0.99, 0.05], corpus_version='v1') == results
+	assert cache.lookup(embedding=[0.0, 1.0], corpus_version='v1') is None
+	assert cache.lookup(embedding=[1.0, 0.0], corpus_version='v2') is None
+
+	cache.invalidate('v2')
+
+	assert cache.lookup(embedding=[1.0, 0.0], corpus_version='v1') is None
+
+
+async def test_route_input():
+	"""
+	Test the router skips the refiner for a
+	user without a conversation summary.
+	"""
+	await load_corpus_store()
+
+	route = await route_input(
+		user_id='test_user_without_history',
+		user_input='What are your strengths?',
+	)
+
+	print(route)
+
+	assert route.skip_refiner, 'Expected the refiner to be skipped'
+
+
+async def test_refine_and_plan():
+	"""
+	Test the fused refiner and planner returns
+	both a refined input and sub-queries.
+	"""
+	refined_plan = await refine_and_plan(
+		user_id=TEST_USER_ID,
+		user_input=TEST_INPUT,
+		verbose=True,
+	)
+
+	print(refined_plan)
+
+	assert refined_plan.refined_input, 'Expected a refined input'
+	assert 0 < len(refined_plan.queries) <= 3, 'Expected 1 to 3 sub-queries'
+
+
+async def test_speculative_retrieve():
+	"""
+	Test speculative hits on the raw input are
+	merged into the planned retrieval results.
+	"""
+	await load_corpus_store()
+
+	hits = await speculative_retrieve(user_input=TEST_INPUT)
+
+	print([(item.id, round(score, 4)) for item, score in hits])
+
+	results = await retrieve_documents(
+		user_id=TEST_USER_ID,
+		query_plan=QueryPlan(queries=[]),
+		streaming_context='agent_thinking',
+		prior_hits=hits,
+	)
+
+	assert [result.item.id for result in results] == [
+		item.id for item, _ in hits
+	], 'Expected speculative hits to stand in for planned results'
@@ -6,15 +6,36 @@ the RAG system.
 
 import time
 
+import numpy as np
 import pytest
 
 from common.utils import TerminalColors
+from corpus.chunker import chunk_item
+from corpus.schemas import CorpusItem
 from database.mongodb.config import (
 	close_mongo,
 	connect_mongo,
 )
-from rag.query_executor import retrieve_documents_sequential
-from rag.schemas import QueryPlan
+from openai_client.main import get_embedding
+from rag.config import RETRIEVAL_LIMIT, RETRIEVAL_THRESHOLD
+from rag.context_packer import count_tokens, pack_context, resolve_parents
+from rag.lexical_index import BM25Index
+from rag.query_executor import (
+	_atlas_search,
+	_score_gap_cutoff,
+	retrieve_documents,
+	retrieve_documents_stream,
+)
+from rag.query_planner import query_planner, query_planner_stream
+from rag.schemas import QueryPlan, RetrievedItem
+from rag.vector_store import (
+	_normalise,
+	exact_search,
+	load_corpus_store,
+	mmr_rerank,
+	quantize,
+	quantized_search,
+)
 
 # --- Constants ---
 
@@ -26,6 +47,12 @@ TEST_QUERY = QueryPlan(
 	]
 )
 
+TEST_REFINED_INPUT = (
+	'What programming languages and frameworks do you use, '
+	'and which projects have you built with them?'
+)
+BENCHMARK_RUNS = 3
+
 # --- Config ---
 
 
@@ -54,7 +81,7 @@ async def test_retrieve_documents():
 	Test semantic document retrieval.
 	"""
 	start = time.perf_counter()
-	results = await retrieve_documents_sequential(
+	results = await retrieve_documents(
 		user_id='test_user',
 		query_plan=TEST_QUERY,
 		streaming_context='agent_thinking',
@@ -72,3 +99,300 @@ async def test_retrieve_documents():
 	print(results)
 
 	assert results is not None, 'Expected non-null results'
+
+
+async def test_local_vector_search():
+	"""
+	Test the local vector store returns the
+	same top hit as $vectorSearch.
+	"""
+	store = await load_corpus_store()
+	query_vector = await get_embedding(TEST_QUERY.queries[0])
+
+	start = time.perf_counter()
+	local_hits = store.search(
+		query_vector=query_vector,
+		limit=RETRIEVAL_LIMIT,
+		threshold=RETRIEVAL_THRESHOLD,
+	)
+	end = time.perf_counter()
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'Local search in {(end - start) * 1e6:.0f} us'
+		f'{TerminalColors.reset}'
+	)
+
+	atlas_hits = await _atlas_search(
+		query_vector=query_vector,
+		limit=RETRIEVAL_LIMIT,
+		threshold=RETRIEVAL_THRESHOLD,
+	)
+
+	assert local_hits, 'Expected local search results'
+	assert local_hits[0][0].id == atlas_hits[0][0].id, (
+		'Expected local and atlas search to agree on the top hit'
+	)
+
+
+async def test_lexical_search():
+	"""
+	Test the BM25 index ranks exact
+	technology names.
+	"""
+	store = await load_corpus_store()
+	hits = store.lexical_search(query='FastAPI', limit=RETRIEVAL_LIMIT)
+
+	assert hits, 'Expected lexical search results'
+	assert 'FastAPI' in hits[0][0].document + hits[0][0].context, (
+		'Expected the top lexical hit to mention the term'
+	)
+
+
+async def test_lexical_min_coverage():
+	"""
+	Test the BM25 relevance floor drops items
+	matching only a small share of the query.
+	"""
+	items = [
+		CorpusItem(id='a', header='', context='', document=document)
+		for document in (
+			'kubernetes cluster deployments',
+			'team deployments',
+			'kubernetes operators',
+			'frontend design',
+		)
+	]
+	index = BM25Index(items)
+
+	loose = [i for i, _ in index.search('kubernetes deployments', limit=4)]
+	strict = [
+		i
+		for i, _ in index.search(
+			'kubernetes deployments',
+			limit=4,
+			min_coverage=0.9,
+		)
+	]
+
+	assert sorted(loose) == [0, 1, 2]
+	assert strict == [0], 'Expected only the item matching every term'
+
+
+async def test_retrieve_documents_deduplicated():
+	"""
+	Test items hit by several sub-queries
+	are returned once.
+	"""
+	query = TEST_QUERY.queries[0]
+	results = await retrieve_documents(
+		user_id='test_user',
+		query_plan=QueryPlan(queries=[query, query]),
+		streaming_context='agent_thinking',
+	)
+	ids = [result.item.id for result in results]
+
+	assert len(ids) == len(set(ids)), 'Expected unique retrieved items'
+
+
+async def test_pack_context():
+	"""
+	Test retrieved items are packed within
+	the token budget.
+	"""
+	results = await retrieve_documents(
+		user_id='test_user',
+		query_plan=TEST_QUERY,
+		streaming_context='agent_thinking',
+	)
+	budget = 300
+	packed = pack_context(results, budget=budget)
+
+	print(packed.model_dump(exclude={'text'}))
+
+	assert count_tokens(packed.text) <= budget + len(results), (
+		'Expected packed context within budget'
+	)
+	assert packed.packed_items + packed.dropped_items == len(results)
+
+
+async def test_score_gap_cutoff():
+	"""
+	Test hits after the first large drop in
+	score are cut, and a zero gap keeps all.
+	"""
+	items = [
+		CorpusItem(id=id, header='', context='', document='')
+		for id in ('a', 'b', 'c')
+	]
+	hits = list(zip(items, [0.9, 0.88, 0.7], strict=True))
+
+	assert [item.id for item, _ in _score_gap_cutoff(hits, 0.1)] == ['a', 'b']
+	assert _score_gap_cutoff(hits, 0.0) == hits
+
+
+async def test_mmr_rerank():
+	"""
+	Test maximal marginal relevance skips a near
+	duplicate of the top hit for a distinct one,
+	and keeps the relevance order at lambda 1.
+	"""
+	vectors = np.array(
+		[[1.0, 0.0, 0.0], [0.99, 0.1, 0.0], [0.0, 1.0, 0.0]],
+		dtype=np.float32,
+	)
+	relevance = np.array([1.0, 0.98, 0.9], dtype=np.float32)
+
+	assert mmr_rerank(vectors, relevance, limit=2, mmr_lambda=0.7) == [0, 2]
+	assert mmr_rerank(vectors, relevance, limit=2, mmr_lambda=1.0) == [0, 1]
+
+
+async def test_resolve_parents():
+	"""
+	Test matched chunks are replaced by their
+	deduplicated parent while it fits the budget,
+	and kept as chunks otherwise.
+	"""
+	parent = CorpusItem(
+		id='section',
+		header='Header',
+		context='Context',
+		document=' '.join(['word'] * 300),
+	)
+	chunks = chunk_item(parent, max_tokens=64, overlap_tokens=8)
+	results = [
+		RetrievedItem(item=chunk, score=0.9, relevance=1.0 / (i + 1))
+		for i, chunk in enumerate(chunks[:2])
+	]
+
+	resolved = resolve_parents(results, {'section': parent})
+	assert [result.item.id for result in resolved] == ['section']
+
+	resolved = resolve_parents(results, {'section': parent}, budget=100)
+	assert [result.item.id for result in resolved] == [
+		chunk.id for chunk in chunks[:2]
+	]
+
+
+async def test_streaming_plan_benchmark():
+	"""
+	Benchmark the streamed planner and retrieval
+	stage against the two-phase path.
+	"""
+	await load_corpus_store()
+
+	two_phase: list[float] = []
+	streamed: list[float] = []
+
+	for _ in range(BENCHMARK_RUNS):
+		start = time.perf_counter()
+		query_plan = await query_planner(refined_input=TEST_REFINED_INPUT)
+		await retrieve_documents(
+			user_id='test_user',
+			query_plan=query_plan,
+			streaming_context='agent_thinking',
+		)
+		two_phase.append(time.perf_counter() - start)
+
+		start = time.perf_counter()
+		streamed_plan, results = await retrieve_documents_stream(
+			user_id='test_user',
+			query_stream=query_planner_stream(refined_input=TEST_REFINED_INPUT),
+			streaming_context='agent_thinking',
+		)
+		streamed.append(time.perf_counter() - start)
+
+		assert streamed_plan.queries, 'Expected streamed sub-queries'
+		assert results, 'Expected retrieved documents'
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'Two-phase plan and retrieve: '
+		f'{sorted(two_phase)[len(two_phase) // 2]:.2f} s median'
+		f'\nStreamed plan and retrieve: '
+		f'{sorted(streamed)[len(streamed) // 2]:.2f} s median'
+		f'{TerminalColors.reset}'
+	)
+
+
+def _quantized_recall(
+	matrix: np.ndarray,
+	queries: np.ndarray,
+	shortlist: int,
+	limit: int = 10,
+) -> tuple[float, float]:
+	"""
+	Recall of the quantized top `limit` against
+	exact search, and how often the top row agrees.
+	"""
+	codes = quantize(matrix)
+	recall = 0.0
+	top_matches = 0
+	for query in queries:
+		exact, _ = exact_search(matrix, query, limit=limit)
+		approximate, _ = quantized_search(
+			matrix, codes, query, limit=limit, shortlist=shortlist
+		)
+		recall += len(set(exact) & set(approximate)) / limit / len(queries)
+		top_matches += int(exact[0] == approximate[0])
+
+	return recall, top_matches / len(queries)
+
+
+async def test_quantized_search():
+	"""
+	Test the quantized shortlist ranks rows by
+	similarity within a cluster. Clusters hold
+	500 rows at graded distances from their
+	centre and the shortlist is 50 rows, so the
+	exact neighbours are only found if Hamming
+	distance tracks cosine similarity.
+	"""
+	rng = np.random.default_rng(0)
+	centres = rng.standard_normal((20, 1024), dtype=np.float32)
+	noise = rng.standard_normal((10000, 1024), dtype=np.float32)
+	spread = np.tile(np.linspace(0.01, 0.1, 500, dtype=np.float32), 20)
+	matrix = _normalise(
+		np.repeat(centres, 500, axis=0) + noise * spread[:, None]
+	)
+	queries = _normalise(centres[:10])
+
+	start = time.perf_counter()
+	recall, top_agreement = _quantized_recall(matrix, queries, shortlist=50)
+	elapsed = time.perf_counter() - start
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'Quantized recall: {recall:.2f} '
+		f'top 1 agreement: {top_agreement:.2f} '
+		f'in {elapsed * 1000:.2f} ms'
+		f'{TerminalColors.reset}'
+	)
+
+	assert recall >= 0.9, 'Expected quantized search to match exact search'
+
+
+async def test_quantized_search_unclustered():
+	"""
+	Test the quantized shortlist on unclustered
+	rows, queries are perturbed rows. The nearest
+	row should always be found, recall beyond it
+	is limited as the remaining rows are about
+	equally far from the query.
+	"""
+	rng = np.random.default_rng(0)
+	matrix = _normalise(rng.standard_normal((10000, 1024), dtype=np.float32))
+	targets = matrix[rng.choice(len(matrix), size=10, replace=False)]
+	noise = rng.standard_normal((10, 1024), dtype=np.float32) / 32
+	queries = _normalise(targets + noise * 0.5)
+
+	recall, top_agreement = _quantized_recall(matrix, queries, shortlist=100)
+
+	print(
+		f'{TerminalColors.yellow}'
+		f'Unclustered quantized recall: {recall:.2f} '
+		f'top 1 agreement: {top_agreement:.2f}'
+		f'{TerminalColors.reset}'
+	)
+
+	assert top_agreement == 1.0, 'Expected the nearest row to be found'